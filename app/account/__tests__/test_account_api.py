@@ -71,4 +71,4 @@ class PrivateAccountAPITests(TestCase):
         accounts = Account.objects.all().order_by('-id')
         serializer = AccountSerializer(accounts, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
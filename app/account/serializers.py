@@ -4,6 +4,10 @@ Serializers for account APIs.
 
 from rest_framework import serializers
 
+from media.serializers import (
+    ImageVariantsField,
+    SafeImageFieldsMixin,
+)
 
 from core.models import (
     Account,
@@ -32,10 +36,15 @@ class FriendRequestSerializer(serializers.ModelSerializer):
         fields = ['to_user', 'from_user', 'created_at']
 
 
-class AccountSerializer(serializers.ModelSerializer, MultipleFieldLookupMixin):
+class AccountSerializer(
+    SafeImageFieldsMixin,
+    serializers.ModelSerializer,
+    MultipleFieldLookupMixin,
+):
     """Serializer for account."""
 
     friends = FriendSerializer(many=True, required=False)
+    avatar_variants = ImageVariantsField()
 
     class Meta:
         model = Account
@@ -45,6 +54,8 @@ class AccountSerializer(serializers.ModelSerializer, MultipleFieldLookupMixin):
             'name',
             'pronouns',
             'avatar',
+            'avatar_variants',
+            'avatar_placeholder',
             'bio',
             'friends',
         ]
@@ -52,13 +63,13 @@ class AccountSerializer(serializers.ModelSerializer, MultipleFieldLookupMixin):
 
     def _get_or_create_friends(self, friends, account):
         """Handle getting or creating friends as needed."""
+        if not friends:
+            return
+        # Friend entries carry no writable fields, so every item resolves
+        # to the same row for the authenticated user.
         auth_user = self.context['request'].user
-        for friend in friends:
-            friend_obj, created = Friend.objects.get_or_create(
-                user=auth_user,
-                **friend
-            )
-            account.friends.add(friend_obj)
+        friend_obj, created = Friend.objects.get_or_create(user=auth_user)
+        account.friends.add(friend_obj)
 
     def create(self, validated_data):
         """Create an account."""
@@ -73,7 +84,7 @@ class AccountSerializer(serializers.ModelSerializer, MultipleFieldLookupMixin):
         friends = validated_data.pop('friends', None)
         if friends is not None:
             instance.friends.clear()
-            self._get_or_create_friends(friends, account)
+            self._get_or_create_friends(friends, instance)
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -90,11 +101,17 @@ class AccountDetailSerializer(AccountSerializer):
         read_only_fields = ['id', 'user']
 
 
-class AccountImageSerializer(serializers.ModelSerializer):
+class AccountImageSerializer(
+    SafeImageFieldsMixin,
+    serializers.ModelSerializer,
+):
     """Serializer for uploading image to account."""
+    avatar_variants = ImageVariantsField()
 
     class Meta:
         model = Account
-        fields = ['id', 'avatar']
+        fields = [
+            'id', 'avatar', 'avatar_variants', 'avatar_placeholder',
+        ]
         read_only_fields = ['id', ]
         extra_kwargs = {'image': {'required': True}}
@@ -18,11 +18,12 @@ from rest_framework import (
 from django_filters.rest_framework import DjangoFilterBackend
 
 
+from utils.AutoPrefetchMixin import AutoPrefetchMixin
+from utils.ResponseCacheMixin import ResponseCacheMixin
 from utils.MultipleFieldLookupMixin import MultipleFieldLookupMixin
 
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.request import Request
 
@@ -36,6 +37,11 @@ from core.models import (
 )
 
 from account import serializers
+from media.images import process_upload
+from user.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
 
 
 @extend_schema_view(
@@ -53,12 +59,19 @@ from account import serializers
         ]
     )
 )
-class AccountViewSet(viewsets.ModelViewSet):
+class AccountViewSet(
+    ResponseCacheMixin,
+    AutoPrefetchMixin,
+    viewsets.ModelViewSet,
+):
     """View for managing account APIs."""
 
     serializer_class = serializers.AccountDetailSerializer
     queryset = Account.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['user']
@@ -88,6 +101,7 @@ class AccountViewSet(viewsets.ModelViewSet):
 
         if serializer.is_valid():
             serializer.save()
+            process_upload(account, 'avatar')
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -111,7 +125,10 @@ class BaseAccountAttrViewSet(
     viewsets.GenericViewSet
 ):
     """Base viewset for account attributes"""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
     permission_classes = [IsAuthenticated]
 
 
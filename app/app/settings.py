@@ -83,7 +83,9 @@ INSTALLED_APPS = [
     'recipe',
     'park',
     'post',
-    'feed'
+    'feed',
+    'search',
+    'media',
 
 
 ]
@@ -97,6 +99,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'user.middleware.HashingBusyMiddleware',
 ]
 
 ROOT_URLCONF = 'app.urls'
@@ -135,6 +138,24 @@ DATABASES = {
 }
 
 
+# Caches. "node" is kept in a memory mapped file shared by every process
+# of the node, NODE_CACHE_BUCKETS buckets of NODE_CACHE_BUCKET_SIZE bytes
+# each, which should fit in /dev/shm.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'node': {
+        'BACKEND': 'utils.SharedMemoryCache.SharedMemoryCache',
+        'LOCATION': os.environ.get('NODE_CACHE_PATH', '/dev/shm/app-cache'),
+        'OPTIONS': {
+            'BUCKETS': int(os.environ.get('NODE_CACHE_BUCKETS', 512)),
+            'BUCKET_SIZE': int(os.environ.get('NODE_CACHE_BUCKET_SIZE', 64 * 1024)),
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -153,6 +174,23 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Passwords are hashed on a pool of PASSWORD_HASHING_WORKERS threads per
+# process, 0 hashing them in the request thread. A request thread never
+# queues for the pool: sign-ins are refused with a 503 while every worker is
+# busy, so keep the workers plus the reserved ones below the uwsgi --threads
+# (4 in scripts/run.sh) to leave threads for the other endpoints. Only async
+# sign-ins may queue, up to PASSWORD_HASHING_MAX_PENDING of them. The admin
+# login also gets PASSWORD_HASHING_RESERVED_WORKERS threads of its own.
+PASSWORD_HASHERS = [
+    'user.hashers.BoundedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+PASSWORD_HASHING_WORKERS = int(os.environ.get('PASSWORD_HASHING_WORKERS', 2))
+PASSWORD_HASHING_MAX_PENDING = int(os.environ.get('PASSWORD_HASHING_MAX_PENDING', 16))
+PASSWORD_HASHING_RESERVED_WORKERS = int(os.environ.get('PASSWORD_HASHING_RESERVED_WORKERS', 1))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
@@ -175,6 +213,7 @@ STATIC_URL = '/static/static/'
 MEDIA_URL = '/static/media/'
 
 MEDIA_ROOT = '/vol/web/media'
+DEFAULT_FILE_STORAGE = 'media.storage.ContentAddressedStorage'
 STATIC_ROOT = '/vol/web/static'
 
 # Default primary key field type
@@ -187,8 +226,112 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_PAGINATION_CLASS': 'utils.KeysetPagination.KeysetPagination',
+    'PAGE_SIZE': int(os.environ.get('PAGE_SIZE', 50)),
 }
 
+PAGINATION_MAX_PAGE_SIZE = int(os.environ.get('PAGINATION_MAX_PAGE_SIZE', 200))
+
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True
 }
+
+# Largest batch accepted by the bulk post endpoint
+POST_BULK_MAX_ITEMS = int(os.environ.get('POST_BULK_MAX_ITEMS', 500))
+
+# Nearby park search, distances in meters
+PARK_NEARBY_RADIUS = int(os.environ.get('PARK_NEARBY_RADIUS', 10000))
+PARK_NEARBY_MAX_RADIUS = int(os.environ.get('PARK_NEARBY_MAX_RADIUS', 100000))
+PARK_NEARBY_MAX_RESULTS = int(os.environ.get('PARK_NEARBY_MAX_RESULTS', 100))
+
+# Viewport queries list single parks from this zoom level up, at most
+# PARK_VIEWPORT_MAX_PARKS of them, and clusters below it.
+PARK_CLUSTER_MAX_ZOOM = int(os.environ.get('PARK_CLUSTER_MAX_ZOOM', 15))
+PARK_VIEWPORT_MAX_PARKS = int(os.environ.get('PARK_VIEWPORT_MAX_PARKS', 1000))
+
+# Park vector tiles, for signed in users only, cached on disk
+PARK_TILE_ROOT = os.environ.get('PARK_TILE_ROOT', '/vol/web/tiles')
+PARK_TILE_MAX_ZOOM = int(os.environ.get('PARK_TILE_MAX_ZOOM', 22))
+PARK_TILE_MAX_AGE = int(os.environ.get('PARK_TILE_MAX_AGE', 300))
+
+# Image derivatives are rendered by this many worker processes, with at
+# most IMAGE_PIPELINE_MAX_PENDING images queued; images beyond them, and
+# all of them with 0 workers, are rendered in-process.
+IMAGE_PIPELINE_WORKERS = int(os.environ.get('IMAGE_PIPELINE_WORKERS', 2))
+IMAGE_PIPELINE_MAX_PENDING = int(os.environ.get('IMAGE_PIPELINE_MAX_PENDING', 16))
+
+# Uploaded images may have at most IMAGE_MAX_PIXELS pixels, and decoding
+# one may take IMAGE_DECODE_MAX_BYTES, out of IMAGE_DECODE_BUDGET_BYTES for
+# all the decodes of a process.
+IMAGE_MAX_PIXELS = int(os.environ.get('IMAGE_MAX_PIXELS', 50_000_000))
+IMAGE_DECODE_MAX_BYTES = int(os.environ.get('IMAGE_DECODE_MAX_BYTES', 64 * 1024 ** 2))
+IMAGE_DECODE_BUDGET_BYTES = int(os.environ.get('IMAGE_DECODE_BUDGET_BYTES', 128 * 1024 ** 2))
+
+# On-demand image resizing, widths rounded up to a multiple of the step
+MEDIA_RESIZE_CACHE_ROOT = os.environ.get('MEDIA_RESIZE_CACHE_ROOT', '/vol/web/cache/resize')
+MEDIA_RESIZE_CACHE_MAX_BYTES = int(os.environ.get('MEDIA_RESIZE_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+MEDIA_RESIZE_MAX_WIDTH = int(os.environ.get('MEDIA_RESIZE_MAX_WIDTH', 2048))
+MEDIA_RESIZE_WIDTH_STEP = int(os.environ.get('MEDIA_RESIZE_WIDTH_STEP', 16))
+MEDIA_RESIZE_MAX_AGE = int(os.environ.get('MEDIA_RESIZE_MAX_AGE', 365 * 24 * 3600))
+
+# Resumable uploads. Chunks must fit the proxy's client_max_body_size.
+MEDIA_UPLOAD_CHUNK_SIZE = int(os.environ.get('MEDIA_UPLOAD_CHUNK_SIZE', 4 * 1024 ** 2))
+MEDIA_UPLOAD_MAX_CHUNK_SIZE = int(os.environ.get('MEDIA_UPLOAD_MAX_CHUNK_SIZE', 8 * 1024 ** 2))
+MEDIA_UPLOAD_MAX_BYTES = int(os.environ.get('MEDIA_UPLOAD_MAX_BYTES', 200 * 1024 ** 2))
+
+# Uploads sent straight to storage with presigned URLs, valid this long.
+# S3Backend needs the URL of the bucket and its credentials.
+MEDIA_DIRECT_UPLOAD_BACKEND = os.environ.get('MEDIA_DIRECT_UPLOAD_BACKEND', 'media.direct.FileSystemBackend')
+MEDIA_DIRECT_UPLOAD_EXPIRES = int(os.environ.get('MEDIA_DIRECT_UPLOAD_EXPIRES', 900))
+MEDIA_S3_ENDPOINT = os.environ.get('MEDIA_S3_ENDPOINT', '')
+MEDIA_S3_REGION = os.environ.get('MEDIA_S3_REGION', 'us-east-1')
+MEDIA_S3_ACCESS_KEY = os.environ.get('MEDIA_S3_ACCESS_KEY', '')
+MEDIA_S3_SECRET_KEY = os.environ.get('MEDIA_S3_SECRET_KEY', '')
+
+# Media files are handed to nginx after the access check, through this
+# internal location, unless MEDIA_ACCEL_REDIRECT is 0. Without the proxy,
+# as with runserver, Django sends them itself.
+MEDIA_ACCEL_REDIRECT = bool(int(os.environ.get('MEDIA_ACCEL_REDIRECT', not DEBUG)))
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+
+# Orphaned media collection, sparing files younger than the grace period.
+# Quarantined files are moved out of the media root instead of deleted.
+MEDIA_GC_MIN_AGE = int(os.environ.get('MEDIA_GC_MIN_AGE', 24 * 3600))
+MEDIA_GC_BATCH_SIZE = int(os.environ.get('MEDIA_GC_BATCH_SIZE', 1000))
+MEDIA_GC_QUARANTINE_ROOT = os.environ.get('MEDIA_GC_QUARANTINE_ROOT', '/vol/web/quarantine')
+
+# Full-text search
+SEARCH_RESULTS_PER_TYPE = int(os.environ.get('SEARCH_RESULTS_PER_TYPE', 10))
+SEARCH_MAX_RESULTS_PER_TYPE = int(os.environ.get('SEARCH_MAX_RESULTS_PER_TYPE', 50))
+
+# Home timeline
+FEED_FANOUT_BATCH_SIZE = int(os.environ.get('FEED_FANOUT_BATCH_SIZE', 1000))
+# Authors with more followers than this are merged into timelines at read
+# time instead of being fanned out on write.
+FEED_FANOUT_THRESHOLD = int(os.environ.get('FEED_FANOUT_THRESHOLD', 1000))
+
+# Token lookups are cached per process for AUTH_TOKEN_CACHE_TTL seconds,
+# and in the AUTH_TOKEN_SHARED_CACHE cache alias, if set, for
+# AUTH_TOKEN_SHARED_CACHE_TTL. Deleting a token or saving its user evicts
+# it from the shared cache and the local one of that process; the local
+# caches of other processes keep it until it expires.
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', 10000))
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_TTL', 30))
+AUTH_TOKEN_SHARED_CACHE = os.environ.get('AUTH_TOKEN_SHARED_CACHE', '')
+AUTH_TOKEN_SHARED_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_SHARED_CACHE_TTL', 300))
+
+# Signed access tokens are valid this many seconds, and the refresh tokens
+# issued with them this many. Revoking tokens, changing the password or
+# deactivating the user refuses both right away in the process doing it and
+# through AUTH_TOKEN_SHARED_CACHE; the version and active flag checked for
+# access tokens are cached per process like token lookups, so other
+# processes refuse access tokens within AUTH_TOKEN_CACHE_TTL seconds.
+AUTH_ACCESS_TOKEN_LIFETIME = int(os.environ.get('AUTH_ACCESS_TOKEN_LIFETIME', 300))
+AUTH_REFRESH_TOKEN_LIFETIME = int(os.environ.get('AUTH_REFRESH_TOKEN_LIFETIME', 30 * 24 * 3600))
+
+# List and retrieve responses of the cached viewsets are kept this many
+# seconds in the RESPONSE_CACHE cache alias, none when it is empty. The
+# alias must be shared by every process, or writes in one would not drop
+# the entries of the others.
+RESPONSE_CACHE = os.environ.get('RESPONSE_CACHE', '')
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300))
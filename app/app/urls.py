@@ -19,10 +19,10 @@ from drf_spectacular.views import (
 )
 from django.contrib import admin
 from django.urls import path, include
-from django.conf.urls.static import static
 from django.conf import settings
 
 from core import views as core_views
+from media import views as media_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -37,11 +37,13 @@ urlpatterns = [
     path('api/recipe/', include('recipe.urls')),
     path('api/park/', include('park.urls')),
     path('api/post/', include('post.urls')),
-    path('api/account/', include('account.urls'))
+    path('api/account/', include('account.urls')),
+    path('api/feed/', include('feed.urls')),
+    path('api/search/', include('search.urls')),
+    path('api/media/', include('media.urls')),
+    path(
+        settings.MEDIA_URL.lstrip('/') + '<path:path>',
+        media_views.MediaFileView.as_view(),
+        name='media-file',
+    ),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL,
-        document_root=settings.MEDIA_ROOT
-    )
@@ -45,7 +45,9 @@ class UserAdmin(BaseUserAdmin):
 
 admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Account)
+admin.site.register(models.Blob)
 admin.site.register(models.Feed)
+admin.site.register(models.FeedEntry)
 admin.site.register(models.Friend)
 admin.site.register(models.FriendRequest)
 admin.site.register(models.Ingredient)
@@ -53,4 +55,6 @@ admin.site.register(models.Park)
 admin.site.register(models.Post)
 admin.site.register(models.Tag)
 admin.site.register(models.Recipe)
+admin.site.register(models.RefreshToken)
 admin.site.register(models.Comments)
+admin.site.register(models.UploadSession)
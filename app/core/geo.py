@@ -0,0 +1,176 @@
+"""
+Geohash and great-circle distance helpers.
+"""
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = 111320.0
+
+# Longest geohash stored for a location, about 4cm across.
+MAX_PRECISION = 12
+
+
+def geohash_encode(latitude, longitude, precision=MAX_PRECISION):
+    """Return the geohash of a point."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            value_range, coordinate = lon_range, longitude
+        else:
+            value_range, coordinate = lat_range, latitude
+        mid = (value_range[0] + value_range[1]) / 2
+        if coordinate >= mid:
+            value = value * 2 + 1
+            value_range[0] = mid
+        else:
+            value = value * 2
+            value_range[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """Return the (height, width) in degrees of a geohash cell."""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = math.floor(precision * 5 / 2)
+
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def precision_for_radius(radius, latitude):
+    """
+    Return the longest geohash precision whose cells are at least `radius`
+    meters across at the latitude, or None if even the largest cells are
+    smaller. A circle of that radius then fits in the 3x3 block of cells
+    around its center.
+    """
+    lon_scale = max(math.cos(math.radians(latitude)), 1e-6)
+    for precision in range(MAX_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        if (
+            height * METERS_PER_DEGREE >= radius and
+            width * METERS_PER_DEGREE * lon_scale >= radius
+        ):
+            return precision
+
+    return None
+
+
+def covering_cells(latitude, longitude, precision):
+    """Return the geohash cell holding the point and its neighbours."""
+    height, width = cell_size(precision)
+    center_lat = (math.floor((latitude + 90) / height) + 0.5) * height - 90
+    center_lon = (math.floor((longitude + 180) / width) + 0.5) * width - 180
+
+    cells = set()
+    for d_lat in (-1, 0, 1):
+        lat = center_lat + d_lat * height
+        if not -90 < lat < 90:
+            continue
+        for d_lon in (-1, 0, 1):
+            lon = (center_lon + d_lon * width + 180) % 360 - 180
+            cells.add(geohash_encode(lat, lon, precision))
+
+    return cells
+
+
+def cell_box(latitude, longitude, precision):
+    """Return the (min_lat, min_lon, max_lat, max_lon) of the geohash cell
+    holding a point."""
+    height, width = cell_size(precision)
+    min_lat = math.floor((latitude + 90) / height) * height - 90
+    min_lon = math.floor((longitude + 180) / width) * width - 180
+
+    return min_lat, min_lon, min_lat + height, min_lon + width
+
+
+def _box_spans(min_lat, min_lon, max_lat, max_lon, precision):
+    """Return the range of rows and the ranges of columns of the geohash
+    cells covering a box."""
+    height, width = cell_size(precision)
+
+    def span(low, high, size, origin):
+        last = round(2 * origin / size) - 1
+        first = min(math.floor((low + origin) / size), last)
+
+        return range(first, min(math.floor((high + origin) / size), last) + 1)
+
+    rows = span(min_lat, max_lat, height, 90)
+    if min_lon <= max_lon:
+        columns = [span(min_lon, max_lon, width, 180)]
+    else:
+        columns = [
+            span(min_lon, 180.0, width, 180),
+            span(-180.0, max_lon, width, 180),
+        ]
+
+    return rows, columns
+
+
+def box_cells(min_lat, min_lon, max_lat, max_lon, max_precision, max_cells):
+    """
+    Return the geohash cells covering a box at the longest precision up to
+    `max_precision` needing at most `max_cells` of them. Boxes with min_lon
+    greater than max_lon cross the antimeridian.
+    """
+    for precision in range(max_precision, 0, -1):
+        rows, columns = _box_spans(
+            min_lat, min_lon, max_lat, max_lon, precision)
+        if len(rows) * sum(map(len, columns)) <= max_cells:
+            break
+
+    height, width = cell_size(precision)
+
+    return {
+        geohash_encode(
+            (row + 0.5) * height - 90, (column + 0.5) * width - 180,
+            precision,
+        )
+        for row in rows
+        for span in columns
+        for column in span
+    }
+
+
+def bounding_box(latitude, longitude, radius):
+    """Return (min_lat, max_lat, min_lon, max_lon) around a circle."""
+    d_lat = math.degrees(radius / EARTH_RADIUS_M)
+    min_lat = max(latitude - d_lat, -90.0)
+    max_lat = min(latitude + d_lat, 90.0)
+    if min_lat == -90.0 or max_lat == 90.0:
+        return min_lat, max_lat, -180.0, 180.0
+
+    d_lon = math.degrees(
+        radius / (EARTH_RADIUS_M * math.cos(math.radians(latitude)))
+    )
+    if longitude - d_lon < -180.0 or longitude + d_lon > 180.0:
+        return min_lat, max_lat, -180.0, 180.0
+
+    return min_lat, max_lat, longitude - d_lon, longitude + d_lon
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Return the great-circle distance between two points in meters."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(d_phi / 2) ** 2 +
+        math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    )
+
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
@@ -0,0 +1,70 @@
+# Generated by Django 3.2.25 on 2026-10-18 11:07
+
+from django.db import migrations, models
+
+
+# Models with duplicate (user, name) rows, and the many-to-many fields that
+# point at them.
+DEDUPLICATED = {
+    'Tag': [('Recipe', 'tags'), ('Post', 'tags')],
+    'Ingredient': [('Recipe', 'ingredients')],
+}
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Repoint duplicate tags and ingredients at the oldest row."""
+    for model_name, relations in DEDUPLICATED.items():
+        model = apps.get_model('core', model_name)
+        duplicates = model.objects.values('user_id', 'name').annotate(
+            keep_id=models.Min('id'),
+            count=models.Count('id'),
+        ).filter(count__gt=1)
+
+        for duplicate in duplicates:
+            keep_id = duplicate['keep_id']
+            drop_ids = list(model.objects.filter(
+                user_id=duplicate['user_id'],
+                name=duplicate['name'],
+            ).exclude(id=keep_id).values_list('id', flat=True))
+
+            for owner_name, field_name in relations:
+                owner = apps.get_model('core', owner_name)
+                through = owner._meta.get_field(field_name).remote_field.through
+                target = f'{model_name.lower()}_id'
+                source = f'{owner_name.lower()}_id'
+                rows = through.objects.filter(**{f'{target}__in': drop_ids})
+                through.objects.bulk_create(
+                    [
+                        through(**{source: owner_id, target: keep_id})
+                        for owner_id in set(
+                            rows.values_list(source, flat=True))
+                    ],
+                    ignore_conflicts=True,
+                )
+                rows.delete()
+
+            model.objects.filter(id__in=drop_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    # The merge commits before the constraints are added: PostgreSQL cannot
+    # alter the tables while the trigger events of its deletes are pending.
+    atomic = False
+
+    dependencies = [
+        ('core', '0005_post_fanned_out'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_names, migrations.RunPython.noop, atomic=True),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_ingredient_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_tag_name'),
+        ),
+    ]
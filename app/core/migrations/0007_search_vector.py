@@ -0,0 +1,87 @@
+# Generated by Django 3.2.25 on 2026-10-18 11:11
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Weighted columns feeding each table's search vector.
+SEARCH_COLUMNS = {
+    'core_post': [('title', 'A'), ('description', 'B')],
+    'core_park': [('name', 'A'), ('city', 'B'), ('description', 'C')],
+    'core_account': [('name', 'A'), ('bio', 'B')],
+}
+
+
+def search_vector_sql(columns, row):
+    return ' || '.join(
+        f"setweight(to_tsvector('pg_catalog.english', "
+        f"coalesce({row}{column}, '')), '{weight}')"
+        for column, weight in columns
+    )
+
+
+def create_search_triggers(apps, schema_editor):
+    """Maintain search vectors with triggers and index them with GIN."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for table, columns in SEARCH_COLUMNS.items():
+        column_list = ', '.join(column for column, weight in columns)
+        schema_editor.execute(f"""
+            CREATE FUNCTION {table}_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {search_vector_sql(columns, 'NEW.')};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        schema_editor.execute(f"""
+            CREATE TRIGGER {table}_search_vector_trigger
+            BEFORE INSERT OR UPDATE OF {column_list} ON {table}
+            FOR EACH ROW EXECUTE PROCEDURE {table}_search_vector_update()
+        """)
+        schema_editor.execute(
+            f'UPDATE {table} SET search_vector = '
+            f'{search_vector_sql(columns, "")}'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX {table}_search_vector_idx '
+            f'ON {table} USING gin (search_vector)'
+        )
+
+
+def drop_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for table in SEARCH_COLUMNS:
+        schema_editor.execute(f'DROP INDEX {table}_search_vector_idx')
+        schema_editor.execute(
+            f'DROP TRIGGER {table}_search_vector_trigger ON {table}')
+        schema_editor.execute(f'DROP FUNCTION {table}_search_vector_update()')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_unique_tag_ingredient_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='park',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_triggers, drop_search_triggers),
+    ]
@@ -5,6 +5,11 @@ import uuid
 import os
 
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+from django.core.validators import (
+    MaxValueValidator,
+    MinValueValidator,
+)
 from django.db import models
 from django.contrib.auth.models import (
     AbstractBaseUser,
@@ -15,6 +20,8 @@ from django.utils import timezone
 
 from autoslug import AutoSlugField
 
+from core.geo import geohash_encode
+
 
 def recipe_image_file_path(instance, filename):
     """Generate file path for new recipe image."""
@@ -77,6 +84,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Bumped to revoke every token issued to the user so far.
+    token_version = models.PositiveIntegerField(default=0, editable=False)
 
     objects = UserManager()
 
@@ -106,8 +115,13 @@ class Account(models.Model):
         null=True,
         upload_to=account_image_file_path
     )
+    avatar_variants = models.JSONField(
+        default=dict, blank=True, editable=False)
+    avatar_placeholder = models.CharField(
+        max_length=64, blank=True, editable=False)
     bio = models.TextField(max_length=255)
     friends = models.ManyToManyField('Friend')
+    search_vector = SearchVectorField(null=True, editable=False)
 
     def __string__(self):
         return f'{self.user.name} Account'
@@ -149,6 +163,36 @@ class Park(models.Model):
     description = models.TextField(blank=True)
     image = models.ImageField(
         null=True, upload_to=park_image_file_path)
+    image_variants = models.JSONField(
+        default=dict, blank=True, editable=False)
+    image_placeholder = models.CharField(
+        max_length=64, blank=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    latitude = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+    )
+    longitude = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+    )
+    geohash = models.CharField(
+        max_length=12, blank=True, db_index=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        """Keep the geohash in step with the coordinates."""
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geohash_encode(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and (
+            {'latitude', 'longitude'} & set(update_fields)
+        ):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -167,12 +211,53 @@ class Post(models.Model):
     description = models.TextField(blank=True)
     image = models.ImageField(
         null=True, upload_to=post_image_file_path)
+    image_variants = models.JSONField(
+        default=dict, blank=True, editable=False)
+    image_placeholder = models.CharField(
+        max_length=64, blank=True, editable=False)
     tags = models.ManyToManyField('Tag')
+    created_at = models.DateTimeField(default=timezone.now)
+    fanned_out = models.BooleanField(default=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-created_at', '-id'],
+                condition=models.Q(fanned_out=False),
+                name='post_pull_feed_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
 
+class FeedEntry(models.Model):
+    """Post materialized into a user's home timeline."""
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name='feed_entries',
+        on_delete=models.CASCADE
+    )
+    post = models.ForeignKey(
+        Post, related_name='feed_entries', on_delete=models.CASCADE)
+    created = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['owner', 'post'], name='unique_feed_entry'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['owner', '-created', '-post'],
+                name='feed_owner_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.owner_id}: {self.post_id}'
+
+
 class Comments(models.Model):
     """Comment object."""
     post = models.ForeignKey(
@@ -203,6 +288,10 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(
         null=True, upload_to=recipe_image_file_path)
+    image_variants = models.JSONField(
+        default=dict, blank=True, editable=False)
+    image_placeholder = models.CharField(
+        max_length=64, blank=True, editable=False)
 
     def __str__(self):
         return self.title
@@ -216,6 +305,12 @@ class Tag(models.Model):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'], name='unique_tag_name'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -228,5 +323,83 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'], name='unique_ingredient_name'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class Blob(models.Model):
+    """
+    A stored file named by the hash of its content, with the number of
+    uploads that saved it.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    refcount = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
     def __str__(self):
         return self.name
+
+
+class UploadSession(models.Model):
+    """
+    A resumable upload of an image sent in numbered chunks of `chunk_size`
+    bytes, `received` of which have arrived so far.
+    """
+    TARGET_CHOICES = [
+        ('post', 'Post'),
+        ('park', 'Park'),
+        ('recipe', 'Recipe'),
+        ('account', 'Account'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    target = models.CharField(max_length=20, choices=TARGET_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    received = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def chunk_count(self):
+        """Number of chunks the whole file is sent in."""
+        return max(1, -(-self.size // self.chunk_size))
+
+    def chunk_length(self, index):
+        """Return the length in bytes of chunk `index`."""
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    def __str__(self):
+        return f'{self.filename} ({self.received}/{self.chunk_count})'
+
+
+class RefreshToken(models.Model):
+    """
+    A long lived token a client trades for new signed access tokens. Only
+    the SHA-256 of the token is stored, along with the token version of
+    the user it was issued at.
+    """
+    key_hash = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    version = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.user} ({self.created_at})'
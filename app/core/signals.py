@@ -0,0 +1,51 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+)
+
+from django.dispatch import receiver
+
+from core.models import (
+    Account,
+    Friend,
+    Ingredient,
+    Park,
+    Post,
+    Recipe,
+    Tag,
+)
+
+from utils.ResponseCacheMixin import invalidate
+
+
+@receiver(post_save, sender=Account)
+@receiver(post_save, sender=Friend)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Park)
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Account)
+@receiver(post_delete, sender=Friend)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Park)
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+def invalidate_changed_instance(sender, instance, **kwargs):
+
+    invalidate(sender, [instance.pk])
+
+
+@receiver(m2m_changed, sender=Account.friends.through)
+@receiver(m2m_changed, sender=Post.tags.through)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_related_instances(
+    sender, instance, action, model, pk_set, **kwargs
+):
+
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate(type(instance), [instance.pk])
+        invalidate(model, pk_set or ())
@@ -0,0 +1,99 @@
+"""
+Tests for serializer-driven prefetching.
+"""
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Prefetch
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from utils.AutoPrefetchMixin import get_related_lookups
+from utils.create_test_user import create_user
+
+from core.models import (
+    Post,
+    Recipe,
+)
+from feed.serializers import FeedEntrySerializer
+from recipe.serializers import RecipeSerializer
+
+RECIPES_URL = reverse('recipe:recipe-list')
+POSTS_URL = reverse('post:post-list')
+
+
+class RelatedLookupTests(TestCase):
+    """Test inferring related lookups from serializers."""
+
+    def test_nested_many_serializers_are_prefetched(self):
+        """Test nested many serializers become Prefetch objects."""
+        select, prefetch = get_related_lookups(RecipeSerializer)
+
+        self.assertEqual(select, ())
+        self.assertEqual(
+            [lookup.prefetch_through for lookup in prefetch],
+            ['tags', 'ingredients'],
+        )
+
+    def test_nested_foreign_key_serializers_are_joined(self):
+        """Test nested foreign key serializers become select_related."""
+        select, prefetch = get_related_lookups(FeedEntrySerializer)
+
+        self.assertEqual(select, ('post',))
+        self.assertIsInstance(prefetch[0], Prefetch)
+        self.assertEqual(prefetch[0].prefetch_through, 'post__tags')
+
+
+class ListQueryCountTests(TestCase):
+    """Test list endpoints run a constant number of queries."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, url):
+        """Return the number of queries run by a GET request."""
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+
+        return len(context.captured_queries)
+
+    def create_recipes(self, count):
+        start = Recipe.objects.count()
+        for i in range(start, start + count):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=5,
+                price=Decimal('1.00'),
+            )
+            recipe.tags.create(user=self.user, name=f'Tag {i}')
+            recipe.ingredients.create(user=self.user, name=f'Salt {i}')
+
+    def create_posts(self, count):
+        start = Post.objects.count()
+        for i in range(start, start + count):
+            post = Post.objects.create(user=self.user, title=f'Post {i}')
+            post.tags.create(user=self.user, name=f'Tag {i}')
+
+    def test_recipe_list_query_count_is_constant(self):
+        """Test listing recipes does not query per recipe."""
+        self.create_recipes(2)
+        few = self.count_queries(RECIPES_URL)
+        self.create_recipes(5)
+        many = self.count_queries(RECIPES_URL)
+
+        self.assertEqual(few, many)
+
+    def test_post_list_query_count_is_constant(self):
+        """Test listing posts does not query per post."""
+        self.create_posts(2)
+        few = self.count_queries(POSTS_URL)
+        self.create_posts(5)
+        many = self.count_queries(POSTS_URL)
+
+        self.assertEqual(few, many)
@@ -0,0 +1,99 @@
+"""
+Tests for the disk LRU cache.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from utils.DiskLRUCache import DiskLRUCache
+
+
+def writer(data):
+    """Return a create callback writing `data`."""
+    def create(path):
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    return create
+
+
+class DiskLRUCacheTests(SimpleTestCase):
+    """Tests for DiskLRUCache."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cache = DiskLRUCache(self.root, max_bytes=1000, low_water=0.7)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_miss_then_hit(self):
+        """Test an entry is created once and then read back."""
+        calls = []
+
+        def create(path):
+            calls.append(path)
+            writer(b'abc')(path)
+
+        with self.cache.get_or_create('aa11', create, ext='.jpg') as entry:
+            self.assertEqual(entry.read(), b'abc')
+        with self.cache.get_or_create('aa11', create, ext='.jpg') as entry:
+            self.assertEqual(entry.read(), b'abc')
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(os.path.exists(self.cache.path('aa11', '.jpg')))
+
+    def test_failed_create_leaves_nothing(self):
+        """Test an entry whose creation fails is not stored."""
+
+        def create(path):
+            raise ValueError()
+
+        with self.assertRaises(ValueError):
+            self.cache.get_or_create('bb22', create)
+
+        self.assertIsNone(self.cache.open('bb22'))
+        self.assertEqual(os.listdir(os.path.join(self.root, 'bb')), [])
+
+    def test_evicts_least_recently_used(self):
+        """Test going over budget removes the oldest entries first."""
+        now = time.time()
+        for index, key in enumerate(('k1', 'k2', 'k3')):
+            self.cache.get_or_create(key, writer(b'x' * 300)).close()
+            os.utime(self.cache.path(key), (now - 100 + index,) * 2)
+        # Reading k1 long after it was written marks it recently used.
+        self.cache.touch_interval = 0
+        self.cache.open('k1').close()
+
+        self.cache.get_or_create('k4', writer(b'x' * 300)).close()
+
+        self.assertIsNotNone(self.cache.open('k1'))
+        self.assertIsNone(self.cache.open('k2'))
+        self.assertIsNone(self.cache.open('k3'))
+        self.assertIsNotNone(self.cache.open('k4'))
+
+    def test_concurrent_misses_create_once(self):
+        """Test concurrent misses on one key render it a single time."""
+        calls = []
+        started = threading.Barrier(4)
+
+        def create(path):
+            calls.append(path)
+            time.sleep(0.05)
+            writer(b'abc')(path)
+
+        def fetch():
+            started.wait()
+            self.cache.get_or_create('cc33', create).close()
+
+        threads = [threading.Thread(target=fetch) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
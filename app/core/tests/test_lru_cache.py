@@ -0,0 +1,64 @@
+"""
+Tests for the in-memory LRU cache.
+"""
+from django.test import SimpleTestCase
+
+from utils.LRUCache import LRUCache
+
+
+class Clock:
+    """A clock moved by hand."""
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class LRUCacheTests(SimpleTestCase):
+    """Tests for LRUCache."""
+
+    def setUp(self):
+        self.clock = Clock()
+        self.cache = LRUCache(max_size=2, ttl=10, clock=self.clock)
+
+    def test_get_set_delete(self):
+        """Test entries are read back until deleted."""
+        self.cache.set('a', 1)
+
+        self.assertEqual(self.cache.get('a'), 1)
+        self.cache.delete('a')
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get('a', 'missing'), 'missing')
+
+    def test_least_recently_used_evicted(self):
+        """Test the least recently used entry makes room when full."""
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+
+        self.cache.set('c', 3)
+
+        self.assertEqual(len(self.cache), 2)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.get('c'), 3)
+
+    def test_entries_expire(self):
+        """Test entries are dropped once their time to live passed."""
+        self.cache.set('a', 1)
+
+        self.clock.now = 9
+        self.assertEqual(self.cache.get('a'), 1)
+        self.clock.now = 10
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_disabled(self):
+        """Test a cache of size 0 holds nothing."""
+        cache = LRUCache(max_size=0, ttl=10)
+
+        cache.set('a', 1)
+
+        self.assertIsNone(cache.get('a'))
@@ -0,0 +1,130 @@
+"""
+Tests for keyset pagination.
+"""
+import base64
+import json
+from urllib.parse import (
+    parse_qs,
+    urlparse,
+)
+
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from utils.create_test_user import create_user
+
+from core.models import (
+    Park,
+    Post,
+)
+
+PARKS_URL = reverse('park:park-list')
+FEED_URL = reverse('feed:feed')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def make_cursor(position):
+    """Return a cursor encoding `position` as is."""
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+class KeysetPaginationTests(TestCase):
+    """Test paginated list endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def collect_ids(self, url, **params):
+        """Follow next links from url and return the ids of every page."""
+        pages = []
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append([
+                item['post']['id'] if 'post' in item else item['id']
+                for item in res.data['results']
+            ])
+            if res.data['next'] is None:
+                return pages
+            res = self.client.get(res.data['next'])
+
+    def test_pages_follow_cursor(self):
+        """Test walking next links returns every row once, newest first."""
+        parks = [
+            Park.objects.create(user=self.user, name=f'Park {i}')
+            for i in range(5)
+        ]
+
+        pages = self.collect_ids(PARKS_URL, page_size=2)
+
+        expected = [park.id for park in reversed(parks)]
+        self.assertEqual(pages, [expected[:2], expected[2:4], expected[4:]])
+
+    def test_ties_on_sort_key_are_broken_by_id(self):
+        """Test rows sharing a sort key are neither skipped nor repeated."""
+        created_at = timezone.now()
+        posts = [
+            Post.objects.create(
+                user=self.user, title=f'Post {i}', created_at=created_at)
+            for i in range(5)
+        ]
+
+        pages = self.collect_ids(FEED_URL, page_size=2)
+
+        ids = [entry_id for page in pages for entry_id in page]
+        self.assertEqual(ids, [post.id for post in reversed(posts)])
+
+    @override_settings(PAGINATION_MAX_PAGE_SIZE=3)
+    def test_page_size_is_capped(self):
+        """Test page sizes above the maximum are capped."""
+        for i in range(5):
+            Park.objects.create(user=self.user, name=f'Park {i}')
+
+        res = self.client.get(PARKS_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 3)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor returns 404."""
+        res = self.client.get(PARKS_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tampered_cursor_values(self):
+        """Test cursor values that do not fit the ordering fields return
+        404."""
+        cases = [
+            (PARKS_URL, ['abc']),
+            (PARKS_URL, [{'id': 1}]),
+            (PARKS_URL, [None]),
+            (TAGS_URL, [1, 'x']),
+            (FEED_URL, ['yesterday', 1]),
+            (FEED_URL, [timezone.now().isoformat(), 1, 2]),
+        ]
+        for url, position in cases:
+            with self.subTest(url=url, position=position):
+                res = self.client.get(url, {'cursor': make_cursor(position)})
+
+                self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_feed_cursor_is_created_and_post_id(self):
+        """Test the feed cursor holds the created time and post id only."""
+        for i in range(2):
+            Post.objects.create(user=self.user, title=f'Post {i}')
+
+        res = self.client.get(FEED_URL, {'page_size': 1})
+
+        cursor = parse_qs(urlparse(res.data['next']).query)['cursor'][0]
+        position = json.loads(base64.urlsafe_b64decode(cursor))
+        self.assertEqual(len(position), 2)
+        self.assertEqual(position[1], res.data['results'][0]['post']['id'])
@@ -0,0 +1,179 @@
+"""
+Tests for the response cache.
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import (
+    override_settings,
+    TestCase,
+)
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from account.serializers import AccountDetailSerializer
+from core.models import (
+    Account,
+    Friend,
+    Ingredient,
+    Park,
+    Recipe,
+    Tag,
+)
+from media import images
+from recipe.serializers import RecipeDetailSerializer
+from utils.create_test_user import create_user
+from utils.ResponseCacheMixin import (
+    get_related_models,
+    invalidate,
+    model_tag,
+    response_cache_stats,
+)
+
+PARKS_URL = reverse('park:park-list')
+
+
+def park_detail_url(park_id):
+    """Create and return a park detail URL."""
+    return reverse('park:park-detail', args=[park_id])
+
+
+def recipe_detail_url(recipe_id):
+    """Create and return a recipe detail URL."""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def account_detail_url(account_id):
+    """Create and return an account detail URL."""
+    return reverse('account:account-detail', args=[account_id])
+
+
+class RelatedModelTests(TestCase):
+    """Test finding the models a serializer renders."""
+
+    def test_nested_models(self):
+        """Test nested serializers are dependencies."""
+        self.assertLessEqual(
+            {Tag, Ingredient}, get_related_models(RecipeDetailSerializer))
+        self.assertIn(Friend, get_related_models(AccountDetailSerializer))
+
+
+@override_settings(RESPONSE_CACHE='default')
+class ResponseCacheApiTests(TestCase):
+    """Test caching responses of viewsets."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='pass1234')
+        self.client.force_authenticate(self.user)
+        self.park = Park.objects.create(user=self.user, name='Sample park')
+
+    def test_second_request_hits(self):
+        """Test repeated requests are answered from the cache."""
+        res = self.client.get(PARKS_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(0):
+            res = self.client.get(PARKS_URL)
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+        self.assertEqual(res.data['results'][0]['name'], 'Sample park')
+        self.assertGreaterEqual(
+            response_cache_stats()['ParkViewSet.list']['hits'], 1)
+
+    def test_query_params_keyed(self):
+        """Test different queries are cached apart."""
+        self.client.get(PARKS_URL)
+
+        res = self.client.get(PARKS_URL, {'page_size': 1})
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+    def test_users_keyed(self):
+        """Test users do not share entries."""
+        self.client.get(PARKS_URL)
+        other = create_user(email='other@example.com', password='pass1234')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(PARKS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+    def test_write_invalidates(self):
+        """Test writes through the API are seen by the next read."""
+        self.client.get(PARKS_URL)
+        self.client.get(park_detail_url(self.park.id))
+
+        self.client.patch(park_detail_url(self.park.id), {'name': 'New'})
+
+        res = self.client.get(PARKS_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'][0]['name'], 'New')
+        res = self.client.get(park_detail_url(self.park.id))
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['name'], 'New')
+
+    def test_other_rows_keep_retrieves(self):
+        """Test writes to one row leave the retrieves of others cached."""
+        self.client.get(park_detail_url(self.park.id))
+
+        Park.objects.create(user=self.user, name='Other park')
+        res = self.client.get(park_detail_url(self.park.id))
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+    def test_related_rows_invalidate(self):
+        """Test writes to nested rows drop the responses holding them."""
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=5,
+            price=Decimal('5.00'),
+        )
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        self.client.get(recipe_detail_url(recipe.id))
+
+        tag.name = 'Dessert'
+        tag.save()
+        res = self.client.get(recipe_detail_url(recipe.id))
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['tags'][0]['name'], 'Dessert')
+
+    def test_m2m_changes_invalidate(self):
+        """Test adding related rows drops the responses holding them."""
+        account = Account.objects.get(user=self.user)
+        self.client.get(account_detail_url(account.id))
+        friend = Friend.objects.create(
+            user=create_user(email='friend@example.com', password='pass1234'))
+
+        account.friends.add(friend)
+        res = self.client.get(account_detail_url(account.id))
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data['friends']), 2)
+
+    def test_queryset_update_invalidates(self):
+        """Test derivatives recorded with an update drop the responses."""
+        self.park.image = 'uploads/park/a.jpg'
+        self.park.save()
+        self.client.get(park_detail_url(self.park.id))
+
+        images._record(Park, self.park.id, 'image', 'uploads/park/a.jpg', (
+            {}, 'L00000fQfQfQfQfQfQfQfQfQfQfQ'))
+        res = self.client.get(park_detail_url(self.park.id))
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(
+            res.data['image_placeholder'], 'L00000fQfQfQfQfQfQfQfQfQfQfQ')
+
+    def test_invalidated_again_on_commit(self):
+        """Test responses computed before a write commits are dropped."""
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate(Park, [self.park.id])
+            version = cache.get(model_tag(Park))
+
+        self.assertNotEqual(cache.get(model_tag(Park)), version)
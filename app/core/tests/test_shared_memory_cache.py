@@ -0,0 +1,181 @@
+"""
+Tests for the shared memory cache backend.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from utils.SharedMemoryCache import SharedMemoryCache
+
+
+def make_cache(path, buckets=4, bucket_size=4096):
+    return SharedMemoryCache(path, {
+        'OPTIONS': {'BUCKETS': buckets, 'BUCKET_SIZE': bucket_size},
+    })
+
+
+def fork(fn):
+    """Run `fn` in a forked process, exiting with 1 if it fails, and return
+    its pid."""
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            fn()
+            status = 0
+        finally:
+            os._exit(status)
+
+    return pid
+
+
+def wait(pid):
+    """Return the exit code of a forked process."""
+    return os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1])
+
+
+class SharedMemoryCacheTests(SimpleTestCase):
+    """Tests for SharedMemoryCache."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, 'cache')
+        self.cache = make_cache(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_set_get_delete(self):
+        """Test values are read back until deleted."""
+        self.cache.set('a', {'name': 'park'})
+
+        self.assertEqual(self.cache.get('a'), {'name': 'park'})
+        self.assertTrue(self.cache.delete('a'))
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get('a', 'missing'), 'missing')
+        self.assertFalse(self.cache.delete('a'))
+
+    def test_set_replaces(self):
+        """Test setting a key again replaces its value."""
+        self.cache.set('a', 1)
+        self.cache.set('a', 2)
+
+        self.assertEqual(self.cache.get('a'), 2)
+        self.assertEqual(self.cache.stats()['entries'], 1)
+
+    def test_add_only_new_keys(self):
+        """Test add leaves existing keys alone."""
+        self.assertTrue(self.cache.add('a', 1))
+        self.assertFalse(self.cache.add('a', 2))
+
+        self.assertEqual(self.cache.get('a'), 1)
+
+    def test_expiry(self):
+        """Test entries expire after their timeout, and touch extends it."""
+        self.cache.set('a', 1, 0.2)
+        self.cache.set('b', 2, 0.2)
+        self.cache.set('c', 3, None)
+        self.assertTrue(self.cache.touch('b', 60))
+        time.sleep(0.3)
+
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get('b'), 2)
+        self.assertEqual(self.cache.get('c'), 3)
+        self.assertFalse(self.cache.touch('a'))
+
+    def test_incr(self):
+        """Test incr adds to a value and fails on a missing key."""
+        self.cache.set('n', 1)
+
+        self.assertEqual(self.cache.incr('n', 2), 3)
+        self.assertEqual(self.cache.get('n'), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_least_recently_used_evicted(self):
+        """Test a full bucket evicts its least recently used entries."""
+        cache = make_cache(self.path, buckets=1, bucket_size=400)
+        cache.set('a', 'x' * 100)
+        cache.set('b', 'x' * 100)
+        cache.get('a')
+        cache.set('c', 'x' * 100)
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertLessEqual(cache.stats()['bytes'], 400)
+
+    def test_oversized_value_not_stored(self):
+        """Test a value larger than a bucket is not cached."""
+        cache = make_cache(self.path, buckets=1, bucket_size=400)
+        cache.set('a', 1)
+        cache.set('b', 'x' * 1000)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+
+    def test_stats(self):
+        """Test hits and misses are counted."""
+        self.cache.set('a', 1)
+        self.cache.get('a')
+        self.cache.get('a')
+        self.cache.get('b')
+
+        stats = self.cache.stats()
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_clear(self):
+        """Test clear drops every entry."""
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.cache.clear()
+
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_layout_change_resets(self):
+        """Test a file mapped with other options is started over."""
+        self.cache.set('a', 1)
+        cache = make_cache(self.path, buckets=8)
+
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', 2)
+        self.assertEqual(cache.get('a'), 2)
+
+    def test_shared_between_processes(self):
+        """Test values set by another process are read back."""
+        self.cache.set('parent', 1)
+
+        def child():
+            if self.cache.get('parent') == 1:
+                self.cache.set('child', 2)
+
+        self.assertEqual(wait(fork(child)), 0)
+        self.assertEqual(self.cache.get('child'), 2)
+
+    def test_incr_atomic(self):
+        """Test concurrent increments from threads and processes all
+        count."""
+        self.cache.set('n', 0)
+
+        def increment():
+            for _ in range(50):
+                self.cache.incr('n')
+
+        def child():
+            threads = [threading.Thread(target=increment) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        pids = [fork(child) for _ in range(3)]
+
+        self.assertEqual([wait(pid) for pid in pids], [0, 0, 0])
+        self.assertEqual(self.cache.get('n'), 300)
@@ -2,11 +2,27 @@
 Core views for app.
 """
 
+from django.conf import settings
+from django.core.cache import caches
+
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
+from user.hashers import get_pool
+from utils.ResponseCacheMixin import response_cache_stats
+
 
 @api_view(['GET'])
 def health_check(request):
-    """Returns successful response."""
-    return Response({'healthy': True})
+    """Returns successful response, with the password hashing queue, the
+    response cache hits of this process and the node cache counters."""
+    data = {'healthy': True}
+    if settings.PASSWORD_HASHING_WORKERS > 0:
+        data['password_hashing'] = get_pool().metrics()
+    if settings.RESPONSE_CACHE:
+        data['response_cache'] = response_cache_stats()
+    for alias in {settings.RESPONSE_CACHE, settings.AUTH_TOKEN_SHARED_CACHE}:
+        if alias and hasattr(caches[alias], 'stats'):
+            data.setdefault('caches', {})[alias] = caches[alias].stats()
+
+    return Response(data)
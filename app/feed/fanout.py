@@ -0,0 +1,68 @@
+"""
+Fan-out-on-write for home timelines.
+"""
+from django.conf import settings
+
+from core.models import (
+    Account,
+    FeedEntry,
+    Post,
+)
+
+
+def get_follower_ids(user_id):
+    """Return ids of users whose accounts list the user as a friend."""
+    return Account.objects.filter(
+        friends__user_id=user_id
+    ).values_list('user_id', flat=True).distinct()
+
+
+def is_high_fanout(user_id):
+    """Return True if the user has more followers than the threshold."""
+    threshold = settings.FEED_FANOUT_THRESHOLD
+    followers = get_follower_ids(user_id)[:threshold + 1]
+
+    return followers.count() > threshold
+
+
+def fan_out_posts(posts):
+    """Write feed entries for the posts into every follower's timeline.
+
+    Posts by high fan-out authors are only flagged, and get merged into
+    their followers' timelines at read time instead.
+    """
+    posts_by_user = {}
+    for post in posts:
+        posts_by_user.setdefault(post.user_id, []).append(post)
+
+    batch_size = settings.FEED_FANOUT_BATCH_SIZE
+    for user_id, user_posts in posts_by_user.items():
+        if is_high_fanout(user_id):
+            Post.objects.filter(
+                pk__in=[post.pk for post in user_posts]
+            ).update(fanned_out=False)
+            for post in user_posts:
+                post.fanned_out = False
+            continue
+
+        entries = []
+        for owner_id in get_follower_ids(user_id).iterator():
+            entries.extend(
+                FeedEntry(
+                    owner_id=owner_id,
+                    post_id=post.id,
+                    created=post.created_at,
+                )
+                for post in user_posts
+            )
+            if len(entries) >= batch_size:
+                FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+                entries = []
+
+        if entries:
+            FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    """Write a feed entry for the post into every follower's timeline."""
+    fan_out_posts([post])
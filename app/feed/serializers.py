@@ -0,0 +1,20 @@
+"""
+Serializers for feed APIs.
+"""
+
+from rest_framework import serializers
+
+from core.models import FeedEntry
+
+from post.serializers import PostSerializer
+
+
+class FeedEntrySerializer(serializers.ModelSerializer):
+    """Serializer for home timeline entries."""
+
+    post = PostSerializer(read_only=True)
+
+    class Meta:
+        model = FeedEntry
+        fields = ['post', 'created']
+        read_only_fields = ['post', 'created']
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save
+
+from django.dispatch import receiver
+
+from core.models import Post
+
+from feed.fanout import fan_out_post
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+
+    if created:
+        fan_out_post(instance)
@@ -0,0 +1,207 @@
+"""
+Tests for feed API.
+"""
+from datetime import timedelta
+
+from django.db import connection
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from feed.timeline import get_pulled_entries
+from utils.create_test_user import create_user
+
+from core.models import (
+    Account,
+    FeedEntry,
+    Friend,
+    Post,
+)
+
+FEED_URL = reverse('feed:feed')
+
+
+def add_friend(user, friend_user):
+    """Add friend_user to the friends of user's account."""
+    account = Account.objects.get(user=user)
+    account.friends.add(Friend.objects.get(user=friend_user))
+
+
+def create_post(user, **params):
+    """Create and return a sample post."""
+    defaults = {
+        'title': 'Sample post title',
+        'description': 'A very nice post',
+    }
+    defaults.update(params)
+
+    return Post.objects.create(user=user, **defaults)
+
+
+class PublicFeedAPITests(TestCase):
+    """Test unauthenticated API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test auth is required to call API."""
+        res = self.client.get(FEED_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateFeedAPITests(TestCase):
+    """Test authenticated API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.friend = create_user(
+            email='friend@example.com',
+            password='test123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_post_fans_out_to_followers(self):
+        """Test creating a post writes it into followers' timelines."""
+        add_friend(self.user, self.friend)
+        stranger = create_user(email='other@example.com', password='test123')
+
+        post = create_post(user=self.friend)
+
+        self.assertTrue(
+            FeedEntry.objects.filter(owner=self.user, post=post).exists())
+        self.assertTrue(
+            FeedEntry.objects.filter(owner=self.friend, post=post).exists())
+        self.assertFalse(
+            FeedEntry.objects.filter(owner=stranger, post=post).exists())
+
+    def test_retrieve_feed(self):
+        """Test the feed lists only the user's timeline, newest first."""
+        add_friend(self.user, self.friend)
+        stranger = create_user(email='other@example.com', password='test123')
+        now = timezone.now()
+        older = create_post(
+            user=self.friend, created_at=now - timedelta(hours=1))
+        newer = create_post(user=self.user, created_at=now)
+        create_post(user=stranger)
+
+        res = self.client.get(FEED_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        post_ids = [entry['post']['id'] for entry in res.data['results']]
+        self.assertEqual(post_ids, [newer.id, older.id])
+
+    def test_feed_is_paginated(self):
+        """Test the next link continues after the last entry."""
+        now = timezone.now()
+        older = create_post(
+            user=self.user, created_at=now - timedelta(hours=1))
+        newer = create_post(user=self.user, created_at=now)
+
+        res = self.client.get(FEED_URL, {'page_size': 1})
+        self.assertEqual(res.data['results'][0]['post']['id'], newer.id)
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(res.data['results'][0]['post']['id'], older.id)
+        self.assertIsNone(res.data['next'])
+
+    def test_deleting_post_removes_feed_entries(self):
+        """Test deleting a post removes it from timelines."""
+        add_friend(self.user, self.friend)
+        post = create_post(user=self.friend)
+
+        post.delete()
+
+        self.assertFalse(FeedEntry.objects.filter(owner=self.user).exists())
+
+
+@override_settings(FEED_FANOUT_THRESHOLD=1)
+class HighFanoutFeedAPITests(TestCase):
+    """Test timelines for authors above the fan-out threshold."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.celebrity = create_user(
+            email='celebrity@example.com',
+            password='test123',
+        )
+        add_friend(self.user, self.celebrity)
+        self.client.force_authenticate(self.user)
+
+    def test_high_fanout_post_is_not_fanned_out(self):
+        """Test posts by high fan-out authors skip timeline writes."""
+        post = create_post(user=self.celebrity)
+
+        post.refresh_from_db()
+        self.assertFalse(post.fanned_out)
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+
+    def test_feed_merges_high_fanout_posts(self):
+        """Test the feed merges pulled posts with the pushed slice."""
+        now = timezone.now()
+        oldest = create_post(
+            user=self.user, created_at=now - timedelta(hours=2))
+        middle = create_post(
+            user=self.celebrity, created_at=now - timedelta(hours=1))
+        newest = create_post(user=self.user, created_at=now)
+
+        res = self.client.get(FEED_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        post_ids = [entry['post']['id'] for entry in res.data['results']]
+        self.assertEqual(post_ids, [newest.id, middle.id, oldest.id])
+
+    def test_feed_merges_several_high_fanout_authors(self):
+        """Test posts of several pulled authors are merged across pages."""
+        other = create_user(email='star@example.com', password='test123')
+        add_friend(self.user, other)
+        now = timezone.now()
+        posts = [
+            create_post(
+                user=(self.celebrity, other)[i % 2],
+                created_at=now - timedelta(minutes=i),
+            )
+            for i in range(5)
+        ]
+        self.assertFalse(Post.objects.filter(fanned_out=True).exists())
+
+        post_ids = []
+        url = FEED_URL + '?page_size=2'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            post_ids += [entry['post']['id'] for entry in res.data['results']]
+            url = res.data['next']
+
+        self.assertEqual(post_ids, [post.id for post in posts])
+
+    def test_pulled_authors_read_in_constant_queries(self):
+        """Test pulling posts does not take a query per followed high
+        fan-out author."""
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                get_pulled_entries(self.user, 10)
+            return len(context.captured_queries)
+
+        create_post(user=self.celebrity)
+        before = count_queries()
+        for i in range(3):
+            other = create_user(
+                email=f'star{i}@example.com', password='test123')
+            add_friend(self.user, other)
+            create_post(user=other)
+        self.assertFalse(Post.objects.filter(fanned_out=True).exists())
+
+        self.assertEqual(count_queries(), before)
+        self.assertEqual(len(get_pulled_entries(self.user, 10)), 4)
@@ -0,0 +1,105 @@
+"""
+Read path for home timelines.
+"""
+import heapq
+
+from django.db import connection
+from django.db.models import (
+    Exists,
+    OuterRef,
+    prefetch_related_objects,
+)
+
+from core.models import (
+    FeedEntry,
+    Friend,
+    Post,
+)
+
+from utils.KeysetPagination import keyset_filter
+
+TIMELINE_ORDERING = ('-created', '-post_id')
+
+
+def _sort_key(entry):
+    return (entry.created, entry.post_id)
+
+
+def get_pushed_entries(user, limit, position=None):
+    """Return the newest entries materialized in the user's timeline."""
+    entries = FeedEntry.objects.filter(owner=user)
+    if position is not None:
+        entries = entries.filter(keyset_filter(TIMELINE_ORDERING, position))
+
+    return entries.select_related(
+        'post'
+    ).prefetch_related(
+        'post__tags'
+    ).order_by(*TIMELINE_ORDERING)[:limit]
+
+
+def get_pulled_entries(user, limit, position=None):
+    """Return unsaved entries for followed authors that are not fanned out.
+
+    The newest posts of each such author are a range scan on
+    post_pull_feed_idx, and are merged by the database in one UNION ALL
+    query, so the cost stays bounded by `limit` however many posts those
+    authors have. Databases that cannot limit the parts of a union merge
+    every post of those authors instead.
+    """
+    ordering = ('-created_at', '-id')
+    authors = list(Friend.objects.filter(account__user=user).filter(
+        Exists(Post.objects.filter(
+            user_id=OuterRef('user_id'), fanned_out=False))
+    ).values_list('user_id', flat=True))
+    if not authors:
+        return []
+
+    def newest(posts):
+        posts = posts.filter(fanned_out=False)
+        if position is not None:
+            posts = posts.filter(keyset_filter(ordering, position))
+        return posts.order_by(*ordering)
+
+    if len(authors) > 1 and (
+        connection.features.supports_slicing_ordering_in_compound
+    ):
+        streams = [
+            newest(Post.objects.filter(user_id=author_id))[:limit]
+            for author_id in authors
+        ]
+        posts = streams[0].union(*streams[1:], all=True)
+    else:
+        posts = newest(Post.objects.filter(user_id__in=authors))
+    posts = list(posts.order_by(*ordering)[:limit])
+    prefetch_related_objects(posts, 'tags')
+
+    return [
+        FeedEntry(owner=user, post=post, created=post.created_at)
+        for post in posts
+    ]
+
+
+def get_timeline(user, limit, position=None):
+    """Merge the pushed and pulled timeline streams, newest first.
+
+    `position` is the (created, post id) of the last entry already seen.
+    """
+    merged = heapq.merge(
+        get_pushed_entries(user, limit, position),
+        get_pulled_entries(user, limit, position),
+        key=_sort_key,
+        reverse=True,
+    )
+
+    entries = []
+    seen = set()
+    for entry in merged:
+        if entry.post_id in seen:
+            continue
+        seen.add(entry.post_id)
+        entries.append(entry)
+        if len(entries) == limit:
+            break
+
+    return entries
@@ -0,0 +1,12 @@
+"""
+URL mappings for the feed app.
+"""
+from django.urls import path
+
+from feed import views
+
+app_name = 'feed'
+
+urlpatterns = [
+    path('', views.FeedView.as_view(), name='feed'),
+]
@@ -1,3 +1,42 @@
-from django.shortcuts import render
+"""
+Views for the feed APIs.
+"""
+from rest_framework import generics
+from rest_framework.permissions import IsAuthenticated
 
-# Create your views here.
+from core.models import FeedEntry
+from feed import serializers
+from feed.timeline import (
+    TIMELINE_ORDERING,
+    get_timeline,
+)
+from user.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
+
+
+class FeedView(generics.GenericAPIView):
+    """List the authenticated user's home timeline."""
+    serializer_class = serializers.FeedEntrySerializer
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
+    permission_classes = [IsAuthenticated]
+    ordering = TIMELINE_ORDERING
+    cursor_unique_field = 'post_id'
+
+    def get(self, request):
+        """Return a page of timeline entries for authenticated user."""
+        page = self.paginator.paginate_fetch(
+            lambda position, limit: get_timeline(
+                request.user, limit, position
+            ),
+            request,
+            view=self,
+            model=FeedEntry,
+        )
+        serializer = self.get_serializer(page, many=True)
+
+        return self.get_paginated_response(serializer.data)
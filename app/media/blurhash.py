@@ -0,0 +1,117 @@
+"""
+BlurHash encoding of image placeholders.
+
+A BlurHash is a short string holding the average colour of an image and a
+few cosine components of its variation, which clients decode into a
+blurred preview while the image loads. See https://blurha.sh.
+"""
+import math
+
+from PIL import Image
+
+ALPHABET = (
+    '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    'abcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+)
+
+# Images are scaled down to this before encoding; the few components kept
+# do not need more pixels.
+SAMPLE_SIZE = 32
+
+
+def encode83(value, length):
+    """Return `value` in base 83 with `length` digits."""
+    digits = []
+    for _ in range(length):
+        value, digit = divmod(value, 83)
+        digits.append(ALPHABET[digit])
+
+    return ''.join(reversed(digits))
+
+
+def srgb_to_linear(value):
+    value = value / 255
+    if value <= 0.04045:
+        return value / 12.92
+
+    return ((value + 0.055) / 1.055) ** 2.4
+
+
+def linear_to_srgb(value):
+    value = max(0.0, min(1.0, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def encode(image, x_components=4, y_components=3):
+    """Return the BlurHash of a Pillow image."""
+    image = image.convert('RGB')
+    image.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE))
+    width, height = image.size
+    pixels = [
+        tuple(srgb_to_linear(channel) for channel in pixel)
+        for pixel in image.getdata()
+    ]
+    x_basis = [
+        [math.cos(math.pi * i * x / width) for x in range(width)]
+        for i in range(x_components)
+    ]
+    y_basis = [
+        [math.cos(math.pi * j * y / height) for y in range(height)]
+        for j in range(y_components)
+    ]
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            scale = (1 if i == 0 and j == 0 else 2) / (width * height)
+            red = green = blue = 0.0
+            for y in range(height):
+                row = y * width
+                y_cos = y_basis[j][y]
+                for x in range(width):
+                    basis = x_basis[i][x] * y_cos
+                    pixel = pixels[row + x]
+                    red += basis * pixel[0]
+                    green += basis * pixel[1]
+                    blue += basis * pixel[2]
+            factors.append((red * scale, green * scale, blue * scale))
+
+    dc, ac = factors[0], factors[1:]
+    blurhash = encode83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        actual_max = max(abs(value) for factor in ac for value in factor)
+        quantised_max = max(0, min(82, int(actual_max * 166 - 0.5)))
+        maximum = (quantised_max + 1) / 166
+        blurhash += encode83(quantised_max, 1)
+    else:
+        maximum = 1
+        blurhash += encode83(0, 1)
+    blurhash += encode83(
+        (linear_to_srgb(dc[0]) << 16)
+        + (linear_to_srgb(dc[1]) << 8)
+        + linear_to_srgb(dc[2]),
+        4,
+    )
+    for factor in ac:
+        red, green, blue = (
+            max(0, min(18, math.floor(
+                _sign_pow(value / maximum, 0.5) * 9 + 9.5)))
+            for value in factor
+        )
+        blurhash += encode83(red * 19 * 19 + green * 19 + blue, 2)
+
+    return blurhash
+
+
+def encode_file(path):
+    """Return the BlurHash of an image file."""
+    with Image.open(path) as image:
+        image.draft('RGB', (SAMPLE_SIZE, SAMPLE_SIZE))
+        return encode(image)
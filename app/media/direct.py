@@ -0,0 +1,268 @@
+"""
+Direct uploads to storage with presigned URLs.
+
+Clients ask for a presigned URL, send the image straight to storage with
+it and then confirm the upload, which only checks the object exists and
+records its name on the row. No image bytes go through the app server.
+
+Backends are pluggable through MEDIA_DIRECT_UPLOAD_BACKEND:
+FileSystemBackend presigns URLs of the app's own signed file view and
+stores under MEDIA_ROOT, for development and tests, and S3Backend signs
+AWS SigV4 URLs for S3 or a compatible store such as MinIO.
+"""
+import datetime
+import hashlib
+import hmac
+import os
+import time
+import uuid
+from functools import lru_cache
+from urllib.error import HTTPError
+from urllib.parse import (
+    quote,
+    urlparse,
+)
+from urllib.request import (
+    Request,
+    urlopen,
+)
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from rest_framework import exceptions
+
+from media.images import (
+    CONTENT_TYPES,
+    placeholder_field,
+    process_upload,
+    variants_field,
+)
+from media.uploads import (
+    Conflict,
+    get_target,
+    TARGETS,
+)
+
+CONFIRM_SALT = 'media.direct.confirm'
+
+
+class FileSystemBackend:
+    """
+    Stores direct uploads under MEDIA_ROOT through SignedFileView, whose
+    URLs carry a signed, expiring token naming the file and method.
+    """
+    local = True
+    salt = 'media.direct.FileSystemBackend'
+
+    def _url(self, method, key, expires, **extra):
+        expiry = int(time.time()) + expires
+        token = signing.dumps(
+            {'m': method, 'k': key, 'e': expiry, **extra}, salt=self.salt)
+
+        return reverse('media:signed-file', args=[token])
+
+    def presign_upload(self, key, content_type, max_bytes, expires):
+        """Return how to send the file: {method, url, headers}."""
+        return {
+            'method': 'PUT',
+            'url': self._url('PUT', key, expires, n=max_bytes),
+            'headers': {'Content-Type': content_type},
+        }
+
+    def presign_download(self, key, expires):
+        """Return a URL reading the file until it expires."""
+        return self._url('GET', key, expires)
+
+    def unsign(self, token, method):
+        """Return the payload of a valid token for `method`, else None."""
+        try:
+            payload = signing.loads(token, salt=self.salt)
+        except signing.BadSignature:
+            return None
+        if payload['m'] != method or payload['e'] < time.time():
+            return None
+
+        return payload
+
+    def size(self, key):
+        """Return the size of a stored file, or None when missing."""
+        try:
+            return os.path.getsize(default_storage.path(key))
+        except FileNotFoundError:
+            return None
+
+    def delete(self, key):
+        """Remove a stored file."""
+        default_storage.delete(key)
+
+
+class S3Backend:
+    """
+    Presigns SigV4 query string URLs for an S3 compatible store.
+
+    MEDIA_S3_ENDPOINT is the URL of the bucket, either virtual hosted
+    (https://bucket.s3.amazonaws.com) or path style
+    (http://minio:9000/bucket). Objects are only checked with HEAD requests
+    here; images stored this way are not rendered by the local derivative
+    pipeline, which needs them on the file system.
+    """
+    local = False
+
+    def __init__(self, endpoint=None, region=None, access_key=None,
+                 secret_key=None):
+        self.endpoint = (endpoint or settings.MEDIA_S3_ENDPOINT).rstrip('/')
+        self.region = region or settings.MEDIA_S3_REGION
+        self.access_key = access_key or settings.MEDIA_S3_ACCESS_KEY
+        self.secret_key = secret_key or settings.MEDIA_S3_SECRET_KEY
+
+    def _signing_key(self, datestamp):
+        key = ('AWS4' + self.secret_key).encode()
+        for part in (datestamp, self.region, 's3', 'aws4_request'):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+
+        return key
+
+    def presign(self, method, key, expires, now=None):
+        """Return a URL for `method` on the object `key`."""
+        now = now or datetime.datetime.utcnow()
+        amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+        datestamp = now.strftime('%Y%m%d')
+        endpoint = urlparse(self.endpoint)
+        path = f"{endpoint.path}/{quote(key, safe='/~')}"
+        scope = f'{datestamp}/{self.region}/s3/aws4_request'
+        query = '&'.join(
+            f"{name}={quote(value, safe='~')}"
+            for name, value in sorted({
+                'X-Amz-Algorithm': 'AWS4-HMAC-SHA256',
+                'X-Amz-Credential': f'{self.access_key}/{scope}',
+                'X-Amz-Date': amz_date,
+                'X-Amz-Expires': str(expires),
+                'X-Amz-SignedHeaders': 'host',
+            }.items())
+        )
+        canonical_request = '\n'.join([
+            method, path, query, f'host:{endpoint.netloc}\n', 'host',
+            'UNSIGNED-PAYLOAD',
+        ])
+        string_to_sign = '\n'.join([
+            'AWS4-HMAC-SHA256', amz_date, scope,
+            hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ])
+        signature = hmac.new(
+            self._signing_key(datestamp), string_to_sign.encode(),
+            hashlib.sha256,
+        ).hexdigest()
+
+        return (
+            f'{endpoint.scheme}://{endpoint.netloc}{path}?{query}'
+            f'&X-Amz-Signature={signature}'
+        )
+
+    def presign_upload(self, key, content_type, max_bytes, expires):
+        """Return how to send the file: {method, url, headers}."""
+        return {
+            'method': 'PUT',
+            'url': self.presign('PUT', key, expires),
+            'headers': {'Content-Type': content_type},
+        }
+
+    def presign_download(self, key, expires):
+        """Return a URL reading the object until it expires."""
+        return self.presign('GET', key, expires)
+
+    def _request(self, method, key):
+        return urlopen(
+            Request(self.presign(method, key, 60), method=method),
+            timeout=10,
+        )
+
+    def size(self, key):
+        """Return the size of a stored object, or None when missing."""
+        try:
+            with self._request('HEAD', key) as response:
+                return int(response.headers['Content-Length'])
+        except HTTPError as error:
+            if error.code == 404:
+                return None
+            raise
+
+    def delete(self, key):
+        """Remove a stored object."""
+        self._request('DELETE', key).close()
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    """Return the configured direct upload backend."""
+    return import_string(settings.MEDIA_DIRECT_UPLOAD_BACKEND)()
+
+
+def start_upload(user, target, object_id, content_type):
+    """
+    Presign the upload of an image for an object of `user`, returning the
+    upload instructions and a token to confirm it with.
+    """
+    get_target(user, target, object_id)
+    key = os.path.join(
+        'uploads', target, 'direct',
+        f'{uuid.uuid4()}{CONTENT_TYPES[content_type]}',
+    )
+    expires = settings.MEDIA_DIRECT_UPLOAD_EXPIRES
+    token = signing.dumps(
+        {'u': user.pk, 't': target, 'o': object_id, 'k': key},
+        salt=CONFIRM_SALT,
+    )
+
+    return {
+        'token': token,
+        'upload': get_backend().presign_upload(
+            key, content_type, settings.MEDIA_UPLOAD_MAX_BYTES, expires),
+        'expires': expires,
+    }
+
+
+def confirm_upload(user, token):
+    """
+    Record a finished direct upload on its object and return the object,
+    the name of its image field and a presigned URL to download it.
+
+    Tokens stay valid for the grace period gc_media gives new files, so an
+    upload is either confirmed or collected.
+    """
+    try:
+        payload = signing.loads(
+            token, salt=CONFIRM_SALT, max_age=settings.MEDIA_GC_MIN_AGE)
+    except signing.BadSignature:
+        raise exceptions.ValidationError({'token': 'Invalid or expired.'})
+    if payload['u'] != user.pk:
+        raise exceptions.ValidationError({'token': 'Invalid or expired.'})
+
+    backend = get_backend()
+    key = payload['k']
+    size = backend.size(key)
+    if size is None:
+        raise Conflict('The file has not been uploaded.')
+    if size > settings.MEDIA_UPLOAD_MAX_BYTES:
+        backend.delete(key)
+        raise exceptions.ValidationError(
+            {'detail': 'The uploaded file is too large.'})
+
+    instance = get_target(user, payload['t'], payload['o'])
+    field_name = TARGETS[payload['t']][1]
+    rendered = {
+        variants_field(field_name): {},
+        placeholder_field(field_name): '',
+    }
+    setattr(instance, field_name, key)
+    for field, value in rendered.items():
+        setattr(instance, field, value)
+    instance.save(update_fields=[field_name, *rendered])
+    if backend.local:
+        process_upload(instance, field_name)
+    url = backend.presign_download(key, settings.MEDIA_DIRECT_UPLOAD_EXPIRES)
+
+    return instance, field_name, url
@@ -0,0 +1,222 @@
+"""
+Garbage collection of media files no row refers to.
+"""
+import heapq
+import os
+import shutil
+import time
+from array import array
+from datetime import timedelta
+from bisect import bisect_left
+from hashlib import blake2b
+from itertools import islice
+
+from django.apps import apps
+from django.db.models import FileField
+from django.utils import timezone
+
+from core.models import (
+    Blob,
+    UploadSession,
+)
+from media.images import derivative_name
+from media.storage import TEMP_DIR
+
+UPLOADS_DIR = 'uploads'
+DERIVATIVES_DIR = 'derivatives'
+
+
+def _digest(name):
+    """Return a 64 bit hash of a storage name."""
+    digest = blake2b(name.encode(), digest_size=8).digest()
+
+    return int.from_bytes(digest, 'big')
+
+
+class NameSet:
+    """
+    A set of storage names held as a sorted array of 64 bit hashes, 8 bytes
+    per name instead of a string each.
+
+    A hash collision can only make an unreferenced file look referenced,
+    so the collector errs on the side of keeping files.
+    """
+
+    def __init__(self, names, chunk_size=100000):
+        chunks = []
+        names = iter(names)
+        while True:
+            chunk = sorted(_digest(name) for name in islice(names, chunk_size))
+            if not chunk:
+                break
+            chunks.append(array('Q', chunk))
+        self._hashes = array('Q', heapq.merge(*chunks))
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def __contains__(self, name):
+        value = _digest(name)
+        index = bisect_left(self._hashes, value)
+
+        return index < len(self._hashes) and self._hashes[index] == value
+
+
+def file_fields():
+    """Return (model, field name) for every file field of every model."""
+    return [
+        (model, field.name)
+        for model in apps.get_models()
+        for field in model._meta.get_fields()
+        if isinstance(field, FileField)
+    ]
+
+
+def referenced_names(chunk_size):
+    """Stream the name of every file stored on a row."""
+    for model, field_name in file_fields():
+        queryset = model._default_manager.exclude(
+            **{f'{field_name}__isnull': True}
+        ).exclude(**{field_name: ''}).values_list(field_name, flat=True)
+        yield from queryset.iterator(chunk_size=chunk_size)
+
+
+def still_referenced(names):
+    """Return which of the names a row refers to now."""
+    found = set()
+    for model, field_name in file_fields():
+        found.update(model._default_manager.filter(
+            **{f'{field_name}__in': names}
+        ).values_list(field_name, flat=True))
+
+    return found
+
+
+def walk(root, top):
+    """
+    Yield (name, path, stat) for every file under root/top, with names
+    relative to root, walking with os.scandir one directory at a time.
+    """
+    stack = [top]
+    while stack:
+        relative = stack.pop()
+        try:
+            entries = os.scandir(os.path.join(root, relative))
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                name = os.path.join(relative, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(name)
+                elif entry.is_file(follow_symlinks=False):
+                    try:
+                        yield name, entry.path, entry.stat()
+                    except FileNotFoundError:
+                        continue
+
+
+class MediaCollector:
+    """
+    Finds files under the media root that no row refers to and deletes or
+    quarantines them in batches.
+
+    Uploads are kept while any file field holds their name and derivatives
+    while their upload is kept. Temporary files, including those of
+    upload sessions, are collected once stale with their sessions.
+    Files newer than `min_age` seconds are always kept, so uploads whose
+    row is not committed yet are safe, and each batch is checked against
+    the database again right before it is removed.
+    """
+
+    def __init__(
+        self, root, min_age, batch_size=1000, quarantine=None, dry_run=False,
+    ):
+        self.root = root
+        self.min_age = min_age
+        self.batch_size = batch_size
+        self.quarantine = quarantine
+        self.dry_run = dry_run
+        self.stats = {
+            'scanned': 0,
+            'collected': 0,
+            'bytes': 0,
+        }
+
+    def _is_orphan(self, name, uploads, stems):
+        """Return whether a file outlived its grace period unreferenced."""
+        top = name.split(os.sep, 1)[0]
+        if top == UPLOADS_DIR:
+            return name not in uploads
+        if top == DERIVATIVES_DIR:
+            stem = os.path.dirname(name)[len(DERIVATIVES_DIR) + 1:]
+            return stem not in stems
+        return True
+
+    def candidates(self):
+        """Yield (name, path, size) for every collectable file."""
+        uploads = NameSet(referenced_names(self.batch_size))
+        stems = NameSet(
+            os.path.dirname(derivative_name(name, 'x', ''))[
+                len(DERIVATIVES_DIR) + 1:
+            ]
+            for name in referenced_names(self.batch_size)
+        )
+        cutoff = time.time() - self.min_age
+
+        for top in (UPLOADS_DIR, DERIVATIVES_DIR, TEMP_DIR):
+            for name, path, stat in walk(self.root, top):
+                self.stats['scanned'] += 1
+                if stat.st_mtime > cutoff:
+                    continue
+                if self._is_orphan(name, uploads, stems):
+                    yield name, path, stat.st_size
+
+    def _remove(self, name, path):
+        """Delete or quarantine one file."""
+        if self.quarantine is None:
+            os.remove(path)
+            return
+        target = os.path.join(self.quarantine, name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(path, target)
+
+    def collect_batch(self, batch):
+        """Remove a batch of candidates that are still unreferenced."""
+        uploads = [
+            name for name, _, _ in batch
+            if name.split(os.sep, 1)[0] == UPLOADS_DIR
+        ]
+        keep = still_referenced(uploads) if uploads else set()
+        removed = []
+        for name, path, size in batch:
+            if name in keep:
+                continue
+            if not self.dry_run:
+                try:
+                    self._remove(name, path)
+                except FileNotFoundError:
+                    continue
+            removed.append(name)
+            self.stats['collected'] += 1
+            self.stats['bytes'] += size
+
+        if not self.dry_run:
+            Blob.objects.filter(name__in=removed).delete()
+
+    def run(self):
+        """Collect every orphaned file and return the stats."""
+        if not self.dry_run:
+            # Their temporary files are collected below.
+            UploadSession.objects.filter(
+                updated_at__lt=timezone.now() - timedelta(
+                    seconds=self.min_age),
+            ).delete()
+        candidates = self.candidates()
+        while True:
+            batch = list(islice(candidates, self.batch_size))
+            if not batch:
+                break
+            self.collect_batch(batch)
+
+        return self.stats
@@ -0,0 +1,291 @@
+"""
+Image derivative pipeline.
+
+After an upload commits, fixed size derivatives of the image are rendered
+by a bounded pool of worker processes and recorded on the row in the
+`<field>_variants` JSON field next to the image field, along with a
+BlurHash placeholder in `<field>_placeholder`.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import (
+    connection,
+    transaction,
+)
+
+from PIL import (
+    features,
+    Image,
+    ImageOps,
+)
+
+from media import blurhash
+
+from utils.ResponseCacheMixin import invalidate
+
+logger = logging.getLogger(__name__)
+
+# Longest side in pixels of each derivative; images are never upscaled.
+DERIVATIVES = {
+    'thumb': 200,
+    'card': 640,
+    'full': 1600,
+}
+
+# Pillow format, file extension, content type and save options of each
+# output format.
+FORMATS = {
+    'jpeg': ('JPEG', '.jpg', 'image/jpeg', {
+        'quality': 82,
+        'optimize': True,
+        'progressive': True,
+    }),
+    'png': ('PNG', '.png', 'image/png', {'optimize': True}),
+}
+if features.check('webp'):
+    FORMATS['webp'] = (
+        'WEBP', '.webp', 'image/webp', {'quality': 80, 'method': 4})
+if features.check('avif'):
+    FORMATS['avif'] = (
+        'AVIF', '.avif', 'image/avif', {'quality': 60, 'speed': 6})
+
+# File extension of each content type an image may be uploaded as.
+CONTENT_TYPES = {
+    content_type: ext for _, ext, content_type, _ in FORMATS.values()
+}
+
+# Formats every derivative is also rendered in, best first. Clients get
+# them only when they list them in Accept.
+MODERN_FORMATS = tuple(
+    output_format for output_format in ('avif', 'webp')
+    if output_format in FORMATS
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = None
+
+
+def variants_field(field_name):
+    """Return the name of the field recording derivatives of an image."""
+    return f'{field_name}_variants'
+
+
+def placeholder_field(field_name):
+    """Return the name of the field holding the placeholder of an image."""
+    return f'{field_name}_placeholder'
+
+
+def derivative_name(name, size, ext):
+    """Return the storage name of a derivative of the image `name`."""
+    stem = os.path.splitext(name)[0]
+
+    return os.path.join('derivatives', stem, f'{size}{ext}')
+
+
+def has_alpha(image):
+    """Return whether an image has transparent pixels to keep."""
+    return image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def default_format(image):
+    """Return the output format for an image: PNG when it has
+    transparency, JPEG otherwise."""
+    return 'png' if has_alpha(image) else 'jpeg'
+
+
+def convert_for(image, output_format):
+    """Convert an image to a mode the output format can store."""
+    if output_format != 'jpeg' and has_alpha(image):
+        return image.convert('RGBA')
+
+    return image.convert('RGB')
+
+
+def save_image(image, path, output_format):
+    """Encode an image to a file in one of FORMATS."""
+    pillow_format, _, _, options = FORMATS[output_format]
+    image.save(path, format=pillow_format, **options)
+
+
+def render_derivatives(source, destinations):
+    """
+    Render the derivatives of an image file.
+
+    `destinations` maps each size to a (path stem, longest side) pair. Each
+    size is written as JPEG, or PNG for transparent images, and in every
+    MODERN_FORMATS alongside. Runs in a worker process, so it only touches
+    the filesystem, never the database. Returns
+    {size: (path, width, height, formats)}.
+    """
+    results = {}
+    with Image.open(source) as image:
+        largest = max(longest for _, longest in destinations.values())
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        output_format = default_format(image)
+        image = convert_for(image, output_format)
+        ext = FORMATS[output_format][1]
+
+        for size, (stem, longest) in sorted(
+            destinations.items(), key=lambda item: -item[1][1]
+        ):
+            image.thumbnail((longest, longest), Image.LANCZOS)
+            path = stem + ext
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            save_image(image, path, output_format)
+            for modern_format in MODERN_FORMATS:
+                save_image(image, stem + FORMATS[modern_format][1],
+                           modern_format)
+            results[size] = (
+                path,
+                image.width,
+                image.height,
+                [output_format, *MODERN_FORMATS],
+            )
+
+    return results
+
+
+def render_upload(source, destinations):
+    """
+    Render the derivatives of an image file and the BlurHash placeholder
+    of the smallest. Returns (derivatives, placeholder).
+    """
+    results = render_derivatives(source, destinations)
+    smallest = min(results.values(), key=lambda result: result[1])
+
+    return results, blurhash.encode_file(smallest[0])
+
+
+def _get_executor():
+    """Return the process pool, starting it on first use."""
+    global _executor, _pending
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_PIPELINE_WORKERS)
+            _pending = threading.BoundedSemaphore(
+                settings.IMAGE_PIPELINE_MAX_PENDING)
+
+    return _executor
+
+
+def _record(model, pk, field_name, name, rendered):
+    """Store rendered derivatives and placeholder, unless the image was
+    replaced since."""
+    results, placeholder = rendered
+    root = default_storage.path('')
+    variants = {
+        size: {
+            'name': os.path.relpath(path, root),
+            'width': width,
+            'height': height,
+            'formats': formats,
+        }
+        for size, (path, width, height, formats) in results.items()
+    }
+    model._default_manager.filter(pk=pk, **{field_name: name}).update(**{
+        variants_field(field_name): variants,
+        placeholder_field(field_name): placeholder,
+    })
+    invalidate(model, [pk])
+
+
+def _on_done(model, pk, field_name, name, thread, future):
+    """Record the result of a pool job."""
+    _pending.release()
+    try:
+        _record(model, pk, field_name, name, future.result())
+    except Exception:
+        logger.exception('Rendering derivatives of %s failed.', name)
+    finally:
+        # Callbacks usually run in the pool's management thread, whose
+        # connection would otherwise stay open forever.
+        if threading.current_thread() is not thread:
+            connection.close()
+
+
+def _submit(source, destinations):
+    """Queue a render on the pool and return its future, or None when the
+    pool is full or refuses it."""
+    executor = _get_executor()
+    if not _pending.acquire(blocking=False):
+        return None
+    try:
+        return executor.submit(render_upload, source, destinations)
+    except Exception:
+        _pending.release()
+        logger.exception('Queueing a render of %s failed.', source)
+        return None
+
+
+def generate_derivatives(model, pk, field_name, name):
+    """Render and record the derivatives of an image, in the pool if one
+    is configured and has room."""
+    destinations = {
+        size: (default_storage.path(derivative_name(name, size, '')), longest)
+        for size, longest in DERIVATIVES.items()
+    }
+    source = default_storage.path(name)
+    future = None
+    if settings.IMAGE_PIPELINE_WORKERS > 0:
+        future = _submit(source, destinations)
+    if future is None:
+        # Render in the caller once the workers fall behind, instead of
+        # queueing without limit or waiting for the renders ahead.
+        _record(
+            model, pk, field_name, name,
+            render_upload(source, destinations),
+        )
+        return
+
+    future.add_done_callback(partial(
+        _on_done, model, pk, field_name, name, threading.current_thread()
+    ))
+
+
+def process_upload(instance, field_name='image'):
+    """
+    Queue derivatives for the image just stored on `instance`.
+
+    The previous derivatives and placeholder are replaced right away so
+    they are never served for the new image, by those of another row
+    holding the same image when there is one. Otherwise rendering starts
+    once the transaction commits so the workers see the saved file and
+    row.
+    """
+    model = type(instance)
+    name = getattr(instance, field_name).name
+    rendered = {
+        variants_field(field_name): {},
+        placeholder_field(field_name): '',
+    }
+    if name:
+        # Content-addressed names are shared by rows holding the same
+        # image, so derivatives rendered for one of them can be reused.
+        rendered = model._default_manager.filter(
+            **{field_name: name}
+        ).exclude(
+            pk=instance.pk
+        ).exclude(
+            **{variants_field(field_name): {}}
+        ).values(*rendered).first() or rendered
+    for field, value in rendered.items():
+        setattr(instance, field, value)
+    model._default_manager.filter(pk=instance.pk).update(**rendered)
+    invalidate(model, [instance.pk])
+    if not name or rendered[variants_field(field_name)]:
+        return
+
+    transaction.on_commit(partial(
+        generate_derivatives, model, instance.pk, field_name, name
+    ))
@@ -0,0 +1,64 @@
+"""
+Django command to remove media files no row refers to
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from media.gc import MediaCollector
+
+
+class Command(BaseCommand):
+    """Django command to collect orphaned media."""
+
+    help = 'Delete or quarantine media files no row refers to.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report orphaned files without removing them.',
+        )
+        parser.add_argument(
+            '--quarantine', action='store_true',
+            help='Move orphaned files to MEDIA_GC_QUARANTINE_ROOT.',
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=settings.MEDIA_GC_MIN_AGE,
+            help='Seconds a file is spared after it was written.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.MEDIA_GC_BATCH_SIZE,
+            help='Files removed per batch.',
+        )
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Run again every this many seconds instead of once.',
+        )
+
+    def collect(self, options):
+        """Run one collection and report it."""
+        collector = MediaCollector(
+            settings.MEDIA_ROOT,
+            min_age=options['min_age'],
+            batch_size=options['batch_size'],
+            quarantine=(
+                settings.MEDIA_GC_QUARANTINE_ROOT
+                if options['quarantine'] else None
+            ),
+            dry_run=options['dry_run'],
+        )
+        stats = collector.run()
+        action = 'Found' if options['dry_run'] else 'Collected'
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} {stats['collected']} of {stats['scanned']} files, "
+            f"{stats['bytes']} bytes."
+        ))
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        while True:
+            self.collect(options)
+            if options['interval'] <= 0:
+                break
+            time.sleep(options['interval'])
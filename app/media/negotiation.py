@@ -0,0 +1,88 @@
+"""
+Choosing image formats from the Accept header.
+"""
+import os
+import posixpath
+
+from django.core.files.storage import default_storage
+
+from media.images import (
+    FORMATS,
+    MODERN_FORMATS,
+)
+
+# Derivatives are the only files served in a negotiated format.
+NEGOTIABLE_ROOT = 'derivatives'
+
+EXTENSION_FORMATS = {ext: name for name, (_, ext, _, _) in FORMATS.items()}
+
+
+def parse_accept(header):
+    """Return {media type: quality} for an Accept header."""
+    accepted = {}
+    for item in (header or '').split(','):
+        media_type, *params = item.strip().split(';')
+        media_type = media_type.strip().lower()
+        if not media_type:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[media_type] = max(quality, accepted.get(media_type, 0.0))
+
+    return accepted
+
+
+def choose_format(header, fallback, available=MODERN_FORMATS):
+    """
+    Return the best of the `available` modern formats the Accept header
+    lists by name, or `fallback` when it lists none.
+
+    Wildcards such as image/* do not count: browsers send them without
+    being able to decode WebP or AVIF.
+    """
+    accepted = parse_accept(header)
+    best, best_quality = fallback, 0.0
+    for output_format in MODERN_FORMATS:
+        if output_format not in available:
+            continue
+        quality = accepted.get(FORMATS[output_format][2], 0.0)
+        if quality > best_quality:
+            best, best_quality = output_format, quality
+
+    return best
+
+
+def open_derivative(name, header):
+    """
+    Return (file, content type) for the derivative `name` in the best
+    format the Accept header allows, or None when there is no such
+    derivative. `name` is the JPEG or PNG derivative recorded on the row;
+    other formats are looked up next to it.
+    """
+    name = posixpath.normpath(name)
+    stem, ext = os.path.splitext(name)
+    fallback = EXTENSION_FORMATS.get(ext.lower())
+    if (
+        fallback is None or name.startswith(('/', '..')) or
+        name.split('/', 1)[0] != NEGOTIABLE_ROOT
+    ):
+        return None
+
+    output_format = choose_format(header, fallback)
+    if output_format != fallback:
+        try:
+            entry = open(
+                default_storage.path(stem + FORMATS[output_format][1]), 'rb')
+            return entry, FORMATS[output_format][2]
+        except FileNotFoundError:
+            pass
+    try:
+        return open(default_storage.path(name), 'rb'), FORMATS[fallback][2]
+    except FileNotFoundError:
+        return None
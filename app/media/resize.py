@@ -0,0 +1,122 @@
+"""
+On-demand resizing of uploaded images.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from PIL import (
+    Image,
+    ImageOps,
+)
+
+from media.images import (
+    convert_for,
+    FORMATS,
+    save_image,
+)
+from media.serving import (
+    is_readable,
+    resolve_media,
+)
+from utils.DiskLRUCache import DiskLRUCache
+
+# Only uploads can be resized, not derivatives or anything else under
+# MEDIA_ROOT.
+RESIZABLE_ROOT = 'uploads'
+
+TRANSPARENT_EXTENSIONS = ('.png', '.gif', '.webp')
+
+_caches = {}
+
+
+def get_cache():
+    """Return the resize cache for the configured root."""
+    root = settings.MEDIA_RESIZE_CACHE_ROOT
+    if root not in _caches:
+        _caches[root] = DiskLRUCache(
+            root, settings.MEDIA_RESIZE_CACHE_MAX_BYTES)
+
+    return _caches[root]
+
+
+def resolve_source(name, user):
+    """
+    Return the storage name of an upload `user` may resize, or None when
+    the name is not one. Like media files, only uploads a row readable by
+    the user holds are resizable.
+    """
+    resolved = resolve_media(name)
+    if resolved is None or (
+        resolved[0].split('/', 1)[0] != RESIZABLE_ROOT
+    ) or not is_readable(*resolved, user):
+        return None
+    name = resolved[0]
+    if not os.path.isfile(default_storage.path(name)):
+        return None
+
+    return name
+
+
+def snap_width(width):
+    """Round a width up to the resize step, capped to the maximum."""
+    step = settings.MEDIA_RESIZE_WIDTH_STEP
+    width = -(-width // step) * step
+
+    return min(width, settings.MEDIA_RESIZE_MAX_WIDTH)
+
+
+def variant_key(name, width, output_format):
+    """
+    Return the cache key of a variant. The source modification time is part
+    of the key, so replacing a file never serves variants of the old one.
+    """
+    mtime = os.stat(default_storage.path(name)).st_mtime_ns
+    key = f'{name}:{mtime}:{width}:{output_format}'
+
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def render_variant(source, width, output_format, path):
+    """Write the image at `source` scaled down to `width` to `path`."""
+    with Image.open(source) as image:
+        image.draft('RGB', (width, width * image.height // image.width))
+        image = ImageOps.exif_transpose(image)
+        image = convert_for(image, output_format)
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+        save_image(image, path, output_format)
+
+
+def source_format(name):
+    """
+    Return the default output format for an upload, guessed from its
+    extension so cache hits never have to open the source: PNG for formats
+    that can be transparent, JPEG otherwise.
+    """
+    ext = os.path.splitext(name)[1].lower()
+
+    return 'png' if ext in TRANSPARENT_EXTENSIONS else 'jpeg'
+
+
+def open_variant(name, width, output_format=None):
+    """
+    Return (file, content type) of an upload resized to `width`, rendering
+    it into the cache on the first request.
+    """
+    if output_format is None:
+        output_format = source_format(name)
+    width = snap_width(width)
+    ext = FORMATS[output_format][1]
+    source = default_storage.path(name)
+
+    entry = get_cache().get_or_create(
+        variant_key(name, width, output_format),
+        lambda path: render_variant(source, width, output_format, path),
+        ext=ext,
+    )
+
+    return entry, FORMATS[output_format][2]
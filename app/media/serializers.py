@@ -0,0 +1,140 @@
+"""
+Serializers for media APIs.
+"""
+from django.conf import settings
+from django.db import models
+from django.urls import reverse
+
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
+
+from rest_framework import serializers
+
+from core.models import UploadSession
+from media.images import (
+    CONTENT_TYPES,
+    FORMATS,
+)
+from media.validation import (
+    clean_image,
+    InvalidImage,
+)
+
+RESIZE_FORMATS = tuple(FORMATS)
+
+
+@extend_schema_field(OpenApiTypes.OBJECT)
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    The derivatives recorded for an image, as
+    {size: {url, width, height, formats}}. The URLs answer in the best of
+    the formats the client accepts. Empty while they are being rendered.
+    """
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        variants = {}
+        for size, variant in (value or {}).items():
+            url = reverse('media:derivative', args=[variant['name']])
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            variants[size] = {
+                'url': url,
+                'width': variant['width'],
+                'height': variant['height'],
+                'formats': variant.get('formats', []),
+            }
+
+        return variants
+
+
+class ResizeQuerySerializer(serializers.Serializer):
+    """Serializer for the query parameters of a resize request."""
+    w = serializers.IntegerField(min_value=1)
+    fmt = serializers.ChoiceField(choices=RESIZE_FORMATS, required=False)
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Serializer for resumable upload sessions."""
+    chunk_size = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.MEDIA_UPLOAD_MAX_CHUNK_SIZE,
+        default=settings.MEDIA_UPLOAD_CHUNK_SIZE,
+    )
+    chunk_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'target', 'object_id', 'filename', 'size', 'chunk_size',
+            'chunk_count', 'received', 'created_at', 'updated_at',
+        ]
+        read_only_fields = ['id', 'received', 'created_at', 'updated_at']
+
+    def validate_size(self, value):
+        """Reject empty files and files over the upload limit."""
+        if not 0 < value <= settings.MEDIA_UPLOAD_MAX_BYTES:
+            raise serializers.ValidationError(
+                f'Must be between 1 and {settings.MEDIA_UPLOAD_MAX_BYTES} '
+                'bytes.'
+            )
+
+        return value
+
+
+class UploadCompleteSerializer(serializers.Serializer):
+    """Serializer for completing a resumable upload."""
+    checksum = serializers.RegexField(
+        r'^[0-9a-fA-F]{64}$',
+        help_text='SHA-256 of the whole file, in hex.',
+    )
+
+
+class DirectUploadSerializer(serializers.Serializer):
+    """Serializer for requesting a presigned upload."""
+    target = serializers.ChoiceField(choices=UploadSession.TARGET_CHOICES)
+    object_id = serializers.IntegerField(min_value=1)
+    content_type = serializers.ChoiceField(choices=list(CONTENT_TYPES))
+
+
+class PresignedRequestSerializer(serializers.Serializer):
+    """How to send a file to a presigned URL."""
+    method = serializers.CharField()
+    url = serializers.CharField()
+    headers = serializers.DictField(child=serializers.CharField())
+
+
+class DirectUploadStartSerializer(serializers.Serializer):
+    """Serializer for a presigned upload."""
+    token = serializers.CharField(
+        help_text='Confirms the upload once the file is sent.')
+    upload = PresignedRequestSerializer()
+    expires = serializers.IntegerField(
+        help_text='Seconds the upload URL is valid.')
+
+
+class DirectUploadConfirmSerializer(serializers.Serializer):
+    """Serializer for confirming a presigned upload."""
+    token = serializers.CharField()
+
+
+class SafeImageField(serializers.FileField):
+    """
+    An image upload checked and stripped of metadata by clean_image, which
+    never decodes more pixels than the memory budget allows.
+    """
+
+    def to_internal_value(self, data):
+        file = super().to_internal_value(data)
+        try:
+            return clean_image(file)
+        except InvalidImage as error:
+            raise serializers.ValidationError(str(error))
+
+
+class SafeImageFieldsMixin:
+    """Validate the image fields of a model serializer with SafeImageField."""
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: SafeImageField,
+    }
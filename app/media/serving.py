@@ -0,0 +1,197 @@
+"""
+Access checked serving of media files.
+
+Files under MEDIA_ROOT are served once their access has been checked:
+uploads and derivatives are readable while a row the requester may read
+holds them, and nothing else is, so neither temporary files and upload
+sessions nor unconfirmed direct uploads or orphans awaiting gc_media leak
+out. Rows are readable as their viewsets list them: recipes by their
+owner only, posts, parks and accounts by any signed in user.
+
+With MEDIA_ACCEL_REDIRECT the transfer is handed to nginx with
+X-Accel-Redirect, which sends the file, ranges included, without a worker
+copying bytes. Otherwise the file is sent from Django with the same
+Range, If-Range and conditional request handling.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.utils.http import (
+    http_date,
+    parse_http_date_safe,
+)
+
+from core.models import Recipe
+from media.uploads import TARGETS
+
+UPLOADS_ROOT = 'uploads'
+DERIVATIVES_ROOT = 'derivatives'
+READ_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Models whose rows, and so their media, only their owner may read.
+OWNER_ONLY = (Recipe,)
+
+
+class RangeNotSatisfiable(Exception):
+    """A Range header no byte of the file falls in."""
+
+
+def resolve_media(name):
+    """
+    Return the storage name of a servable file and the (model, field) it
+    belongs to, or None when the name points elsewhere.
+    """
+    name = posixpath.normpath(name)
+    if name.startswith(('/', '..')):
+        return None
+    parts = name.split('/')
+    if parts[0] == DERIVATIVES_ROOT:
+        parts = parts[1:]
+    if len(parts) < 3 or parts[0] != UPLOADS_ROOT or parts[1] not in TARGETS:
+        return None
+    model, field_name, _ = TARGETS[parts[1]]
+
+    return name, model, field_name
+
+
+def is_readable(name, model, field_name, user):
+    """Return whether a row `user` may read holds the upload, or the
+    upload of the derivative, `name`."""
+    if name.startswith(DERIVATIVES_ROOT + '/'):
+        stem = os.path.dirname(name)[len(DERIVATIVES_ROOT) + 1:]
+        lookup = {f'{field_name}__startswith': stem + '.'}
+    else:
+        lookup = {field_name: name}
+
+    rows = model._default_manager.filter(**lookup)
+    if model in OWNER_ONLY:
+        rows = rows.filter(user=user)
+
+    return rows.exists()
+
+
+def parse_range(header, size):
+    """
+    Return the (first, last) byte of a single Range header, or None to
+    send the whole file. Raises RangeNotSatisfiable.
+    """
+    match = RANGE_RE.match(header.replace(' ', '')) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        first, last = max(0, size - int(last)), size - 1
+    else:
+        first = int(first)
+        last = min(int(last), size - 1) if last else size - 1
+    if first > last or first >= size:
+        raise RangeNotSatisfiable()
+
+    return first, last
+
+
+def etag_for(stat):
+    """Return an ETag for a file built like the one nginx sends."""
+    return f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return etag in [tag.strip() for tag in if_none_match.split(',')]
+    since = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+
+    return since is not None and int(mtime) <= since
+
+
+def _range_applies(request, etag, mtime):
+    """Return whether If-Range, if sent, still matches the file."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+
+    return parse_http_date_safe(if_range) == int(mtime)
+
+
+def _read_range(path, first, last):
+    with open(path, 'rb') as source:
+        source.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            data = source.read(min(READ_SIZE, remaining))
+            if not data:
+                return
+            remaining -= len(data)
+            yield data
+
+
+def accel_response(name):
+    """Hand the transfer of a file to nginx."""
+    response = HttpResponse()
+    response['X-Accel-Redirect'] = quote(
+        settings.MEDIA_ACCEL_PREFIX + name)
+    response['Content-Type'] = (
+        mimetypes.guess_type(name)[0] or 'application/octet-stream')
+
+    return response
+
+
+def file_response(request, name):
+    """Send a file from Django, honouring Range and conditional requests."""
+    path = default_storage.path(name)
+    stat = os.stat(path)
+    etag = etag_for(stat)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+    }
+    if _not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+    else:
+        content_type = (
+            mimetypes.guess_type(name)[0] or 'application/octet-stream')
+        byte_range = None
+        if _range_applies(request, etag, stat.st_mtime):
+            try:
+                byte_range = parse_range(
+                    request.META.get('HTTP_RANGE'), stat.st_size)
+            except RangeNotSatisfiable:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{stat.st_size}'
+                return response
+
+        if byte_range is None:
+            response = FileResponse(
+                open(path, 'rb'), content_type=content_type)
+        else:
+            first, last = byte_range
+            response = StreamingHttpResponse(
+                _read_range(path, first, last),
+                status=206,
+                content_type=content_type,
+            )
+            response['Content-Range'] = f'bytes {first}-{last}/{stat.st_size}'
+            response['Content-Length'] = str(last - first + 1)
+    for header, value in headers.items():
+        response[header] = value
+
+    return response
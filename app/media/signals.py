@@ -0,0 +1,78 @@
+from django.db.models import FileField
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_save,
+)
+
+from django.dispatch import receiver
+
+from core.models import (
+    Account,
+    Park,
+    Post,
+    Recipe,
+)
+
+from media.storage import release_file
+
+
+def file_field_names(model):
+    """Return the names of the file fields of a model."""
+    return [
+        field.name for field in model._meta.concrete_fields
+        if isinstance(field, FileField)
+    ]
+
+
+@receiver(pre_save, sender=Account)
+@receiver(pre_save, sender=Park)
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Recipe)
+def remember_replaced_files(sender, instance, update_fields=None, **kwargs):
+
+    # Only saves assigning a file read the previous ones, which are
+    # released once the save is done.
+    if instance._state.adding:
+        return
+    uploaded = [
+        name for name in file_field_names(sender)
+        if not getattr(instance, name)._committed
+    ]
+    assigned = [
+        name for name in file_field_names(sender)
+        if name in (update_fields or ()) and name not in uploaded
+    ]
+    if not uploaded and not assigned:
+        return
+
+    previous = sender._default_manager.filter(
+        pk=instance.pk).values(*uploaded, *assigned).first() or {}
+    # Every upload counted a reference, even one of the same content.
+    instance._replaced_files = [
+        previous[name] for name in uploaded if previous.get(name)
+    ] + [
+        previous[name] for name in assigned
+        if previous.get(name) and previous[name] != getattr(
+            instance, name).name
+    ]
+
+
+@receiver(post_save, sender=Account)
+@receiver(post_save, sender=Park)
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Recipe)
+def release_replaced_files(sender, instance, **kwargs):
+
+    for name in instance.__dict__.pop('_replaced_files', ()):
+        release_file(name)
+
+
+@receiver(post_delete, sender=Account)
+@receiver(post_delete, sender=Park)
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Recipe)
+def release_deleted_files(sender, instance, **kwargs):
+
+    for name in file_field_names(sender):
+        release_file(getattr(instance, name).name)
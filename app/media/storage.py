@@ -0,0 +1,168 @@
+"""
+Content-addressed file storage.
+"""
+import hashlib
+import os
+import tempfile
+from functools import partial
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import (
+    default_storage,
+    FileSystemStorage,
+)
+from django.core.files.uploadedfile import UploadedFile
+from django.db import (
+    IntegrityError,
+    transaction,
+)
+from django.db.models import F
+
+from core.models import Blob
+
+# Uploads held in memory are streamed here while they are hashed.
+TEMP_DIR = 'tmp'
+
+
+class TemporaryUpload(UploadedFile):
+    """
+    A file in the temporary directory of the media root, handed to storage
+    by path so it is moved into place rather than copied. Copies never
+    saved are collected by gc_media.
+    """
+
+    def __init__(self, path, name, size, content_type=None, file=None):
+        super().__init__(
+            file or open(path, 'rb'), name, content_type, size)
+        self._path = path
+
+    @classmethod
+    def create(cls, name, content_type=None):
+        """Return a new empty upload open for writing."""
+        directory = default_storage.path(TEMP_DIR)
+        os.makedirs(directory, exist_ok=True)
+        descriptor, path = tempfile.mkstemp(dir=directory)
+
+        return cls(
+            path, name, 0, content_type, file=os.fdopen(descriptor, 'w+b'))
+
+    def temporary_file_path(self):
+        return self._path
+
+    def discard(self):
+        """Close and remove the file."""
+        self.close()
+        try:
+            os.remove(self._path)
+        except FileNotFoundError:
+            pass
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage naming files by the SHA-256 of their content.
+
+    The directory chosen by `upload_to` is kept and the file name replaced
+    by the hash, so the same image uploaded twice to the same kind of
+    object is stored once. Each save of a file counts one reference on its
+    Blob row and each delete drops one; the file itself is only written
+    for the first reference and only removed with the last. The receivers
+    in media.signals drop the references of replaced and deleted images.
+    """
+
+    def _hash_to_temp(self, content):
+        """Stream content to a temporary file, returning (path, digest)."""
+        directory = self.path(TEMP_DIR)
+        os.makedirs(directory, exist_ok=True)
+        hasher = hashlib.sha256()
+        descriptor, temp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(descriptor, 'wb') as temp:
+                for chunk in content.chunks():
+                    hasher.update(chunk)
+                    temp.write(chunk)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+        return temp_path, hasher.hexdigest()
+
+    def _hash_file(self, path):
+        """Return the digest of a file on disk."""
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as source:
+            for chunk in iter(lambda: source.read(64 * 1024), b''):
+                hasher.update(chunk)
+
+        return hasher.hexdigest()
+
+    def _add_reference(self, name):
+        """Count a reference to a blob, returning whether it has a row."""
+        return bool(Blob.objects.filter(name=name).update(
+            refcount=F('refcount') + 1))
+
+    def _store(self, name, source, temp_path):
+        """Move the hashed content into place."""
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        if temp_path is not None:
+            os.replace(temp_path, full_path)
+        else:
+            file_move_safe(source, full_path, allow_overwrite=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+
+    def _save(self, name, content):
+        directory = os.path.dirname(name)
+        ext = os.path.splitext(name)[1].lower()
+        if hasattr(content, 'temporary_file_path'):
+            source = content.temporary_file_path()
+            temp_path, digest = None, self._hash_file(source)
+        else:
+            temp_path, digest = self._hash_to_temp(content)
+            source = temp_path
+        name = os.path.join(directory, digest[:2], f'{digest}{ext}')
+
+        if self._add_reference(name):
+            if os.path.exists(self.path(name)):
+                if temp_path is not None:
+                    os.remove(temp_path)
+            else:
+                self._store(name, source, temp_path)
+            return name
+
+        self._store(name, source, temp_path)
+        try:
+            with transaction.atomic():
+                Blob.objects.create(
+                    name=name, size=os.path.getsize(self.path(name)))
+        except IntegrityError:
+            # Stored concurrently by another upload of the same content.
+            self._add_reference(name)
+
+        return name
+
+    def delete(self, name):
+        """
+        Drop a reference to a file, removing it with the last one. Files
+        without a Blob row are removed right away.
+
+        The blob row stays locked while its file is removed, so a concurrent
+        upload of the same content waits and then writes it again.
+        """
+        with transaction.atomic():
+            blob = Blob.objects.select_for_update().filter(name=name).first()
+            if blob is not None and blob.refcount > 1:
+                Blob.objects.filter(pk=blob.pk).update(
+                    refcount=F('refcount') - 1)
+                return
+            super().delete(name)
+            if blob is not None:
+                blob.delete()
+
+
+def release_file(name):
+    """Drop the reference a row held on a stored file, once the transaction
+    commits."""
+    if name:
+        transaction.on_commit(partial(default_storage.delete, name))
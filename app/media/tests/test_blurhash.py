@@ -0,0 +1,52 @@
+"""
+Tests for BlurHash placeholders.
+"""
+from PIL import Image
+
+from django.test import SimpleTestCase
+
+from media import blurhash
+
+
+def decode83(text):
+    """Return the value of base 83 digits."""
+    value = 0
+    for character in text:
+        value = value * 83 + blurhash.ALPHABET.index(character)
+
+    return value
+
+
+class BlurHashTests(SimpleTestCase):
+    """Tests for encoding BlurHashes."""
+
+    def test_solid_colour(self):
+        """Test the average colour of an image is encoded."""
+        image = Image.new('RGB', (64, 48), (200, 40, 10))
+
+        placeholder = blurhash.encode(image)
+
+        self.assertEqual(len(placeholder), 28)
+        self.assertEqual(placeholder[0], blurhash.encode83(3 + 2 * 9, 1))
+        average = decode83(placeholder[2:6])
+        self.assertEqual(
+            (average >> 16, (average >> 8) & 255, average & 255),
+            (200, 40, 10),
+        )
+
+    def test_gradient_varies(self):
+        """Test a gradient is encoded with non-zero components."""
+        image = Image.linear_gradient('L').resize((64, 64))
+
+        placeholder = blurhash.encode(image, x_components=3, y_components=3)
+
+        self.assertEqual(len(placeholder), 6 + 2 * 8)
+        self.assertGreater(decode83(placeholder[1]), 10)
+
+    def test_srgb_round_trip(self):
+        """Test colour conversions invert each other."""
+        for value in (0, 1, 10, 128, 254, 255):
+            self.assertEqual(
+                blurhash.linear_to_srgb(blurhash.srgb_to_linear(value)),
+                value,
+            )
@@ -0,0 +1,145 @@
+"""
+Tests for collecting orphaned media.
+"""
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import (
+    override_settings,
+    SimpleTestCase,
+    TestCase,
+)
+
+from core.models import (
+    Blob,
+    Post,
+)
+from media.gc import (
+    MediaCollector,
+    NameSet,
+)
+
+
+class NameSetTests(SimpleTestCase):
+    """Tests for the compact name set."""
+
+    def test_membership(self):
+        """Test names added are found and others are not."""
+        names = NameSet(
+            (f'uploads/post/{index}.jpg' for index in range(1000)),
+            chunk_size=64,
+        )
+
+        self.assertEqual(len(names), 1000)
+        self.assertIn('uploads/post/0.jpg', names)
+        self.assertIn('uploads/post/999.jpg', names)
+        self.assertNotIn('uploads/post/1000.jpg', names)
+        self.assertNotIn('x', NameSet([]))
+
+
+class MediaCollectorTests(TestCase):
+    """Tests for collecting orphaned media files."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.quarantine = tempfile.mkdtemp()
+        self.override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            MEDIA_GC_QUARANTINE_ROOT=self.quarantine,
+        )
+        self.override.enable()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password1234',
+        )
+        self.kept = self.create_file('uploads/post/aa/kept.jpg')
+        self.kept_thumb = self.create_file(
+            'derivatives/uploads/post/aa/kept/thumb.webp')
+        Post.objects.create(
+            user=self.user, title='Kept', image='uploads/post/aa/kept.jpg')
+        self.orphan = self.create_file('uploads/post/bb/orphan.jpg')
+        self.orphan_thumb = self.create_file(
+            'derivatives/uploads/post/bb/orphan/thumb.jpg')
+        self.temp = self.create_file('tmp/upload-part')
+        Blob.objects.create(name='uploads/post/bb/orphan.jpg', size=5)
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root)
+        shutil.rmtree(self.quarantine)
+
+    def create_file(self, name, age=7 * 24 * 3600):
+        """Create a media file last written `age` seconds ago."""
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'bytes')
+        mtime = os.stat(path).st_mtime - age
+        os.utime(path, (mtime, mtime))
+
+        return path
+
+    def test_orphans_deleted(self):
+        """Test unreferenced files go and referenced ones stay."""
+        stats = MediaCollector(self.media_root, min_age=3600).run()
+
+        self.assertEqual(stats['scanned'], 5)
+        self.assertEqual(stats['collected'], 3)
+        self.assertEqual(stats['bytes'], 15)
+        for path in (self.orphan, self.orphan_thumb, self.temp):
+            self.assertFalse(os.path.exists(path))
+        for path in (self.kept, self.kept_thumb):
+            self.assertTrue(os.path.exists(path))
+        self.assertFalse(Blob.objects.exists())
+
+    def test_recent_files_spared(self):
+        """Test files inside the grace period are kept."""
+        recent = self.create_file('uploads/post/cc/recent.jpg', age=0)
+
+        MediaCollector(self.media_root, min_age=3600).run()
+
+        self.assertTrue(os.path.exists(recent))
+
+    def test_dry_run(self):
+        """Test a dry run removes nothing."""
+        stats = MediaCollector(
+            self.media_root, min_age=3600, dry_run=True).run()
+
+        self.assertEqual(stats['collected'], 3)
+        self.assertTrue(os.path.exists(self.orphan))
+        self.assertTrue(Blob.objects.exists())
+
+    def test_quarantine(self):
+        """Test quarantined files are moved out of the media root."""
+        MediaCollector(
+            self.media_root, min_age=3600, quarantine=self.quarantine).run()
+
+        self.assertFalse(os.path.exists(self.orphan))
+        self.assertTrue(os.path.exists(
+            os.path.join(self.quarantine, 'uploads/post/bb/orphan.jpg')))
+
+    def test_batch_rechecked(self):
+        """Test a file referenced after the scan started is kept."""
+        collector = MediaCollector(self.media_root, min_age=3600)
+        candidates = list(collector.candidates())
+        Post.objects.create(
+            user=self.user, title='Late', image='uploads/post/bb/orphan.jpg')
+
+        collector.collect_batch(candidates)
+
+        self.assertTrue(os.path.exists(self.orphan))
+        self.assertFalse(os.path.exists(self.orphan_thumb))
+
+    def test_command(self):
+        """Test the command collects in small batches."""
+        out = StringIO()
+
+        call_command(
+            'gc_media', '--batch-size', '1', '--min-age', '60', stdout=out)
+
+        self.assertIn('Collected 3 of 5 files', out.getvalue())
+        self.assertFalse(os.path.exists(self.orphan))
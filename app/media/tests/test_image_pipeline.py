@@ -0,0 +1,264 @@
+"""
+Tests for the image derivative pipeline.
+"""
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    override_settings,
+    TestCase,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Account,
+    Post,
+)
+from media import (
+    blurhash,
+    images,
+)
+
+
+def post_upload_url(post_id):
+    """Create and return a post image upload URL."""
+    return reverse('post:post-upload-image', args=[post_id])
+
+
+def account_upload_url(account_id):
+    """Create and return an account image upload URL."""
+    return reverse('account:account-upload-image', args=[account_id])
+
+
+def make_image(path, size, mode='RGB', format='JPEG'):
+    """Write a solid image to a path."""
+    Image.new(mode, size, 'red').save(path, format=format)
+
+
+class RenderDerivativesTests(TestCase):
+    """Tests for rendering derivatives of a file."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def destinations(self):
+        """Return destinations for every derivative under the root."""
+        return {
+            size: (os.path.join(self.root, 'out', size), longest)
+            for size, longest in images.DERIVATIVES.items()
+        }
+
+    def test_sizes_keep_aspect_ratio(self):
+        """Test each derivative fits its size without upscaling."""
+        source = os.path.join(self.root, 'photo.jpg')
+        make_image(source, (3200, 1000))
+
+        results = images.render_derivatives(source, self.destinations())
+
+        self.assertEqual(results['thumb'][1:3], (200, 63))
+        self.assertEqual(results['card'][1:3], (640, 200))
+        self.assertEqual(results['full'][1:3], (1600, 500))
+        with Image.open(results['thumb'][0]) as thumb:
+            self.assertEqual(thumb.format, 'JPEG')
+            self.assertEqual(thumb.size, (200, 63))
+
+    def test_small_image_not_upscaled(self):
+        """Test images smaller than a derivative keep their size."""
+        source = os.path.join(self.root, 'photo.jpg')
+        make_image(source, (300, 300))
+
+        results = images.render_derivatives(source, self.destinations())
+
+        self.assertEqual(results['card'][1:3], (300, 300))
+        self.assertEqual(results['thumb'][1:3], (200, 200))
+
+    def test_transparency_kept(self):
+        """Test images with an alpha channel are rendered as PNG."""
+        source = os.path.join(self.root, 'logo.png')
+        make_image(source, (800, 800), mode='RGBA', format='PNG')
+
+        results = images.render_derivatives(source, self.destinations())
+
+        self.assertTrue(results['thumb'][0].endswith('.png'))
+        with Image.open(results['thumb'][0]) as thumb:
+            self.assertEqual(thumb.mode, 'RGBA')
+
+
+@override_settings(IMAGE_PIPELINE_WORKERS=0)
+class ImagePipelineApiTests(TestCase):
+    """Tests for derivatives of uploaded images."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password1234',
+        )
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(user=self.user, title='Kickflip')
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root)
+
+    def upload(self, url, field='image', size=(1000, 800)):
+        """Upload an image, running the commit hooks."""
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', size).save(image_file, format='JPEG')
+            image_file.seek(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                return self.client.post(
+                    url, {field: image_file}, format='multipart')
+
+    def test_upload_records_derivatives(self):
+        """Test uploading an image records its derivatives."""
+        res = self.upload(post_upload_url(self.post.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.post.refresh_from_db()
+        variants = self.post.image_variants
+        self.assertEqual(set(variants), set(images.DERIVATIVES))
+        self.assertEqual(
+            (variants['card']['width'], variants['card']['height']),
+            (640, 512),
+        )
+        for variant in variants.values():
+            path = os.path.join(self.media_root, variant['name'])
+            self.assertTrue(os.path.exists(path))
+
+    def test_list_references_thumbnails(self):
+        """Test post lists include the derivative URLs."""
+        self.upload(post_upload_url(self.post.id))
+
+        res = self.client.get(reverse('post:post-list'))
+
+        [post] = res.data['results']
+        thumb = post['image_variants']['thumb']
+        self.assertTrue(thumb['url'].startswith('http://testserver/'))
+        self.assertTrue(thumb['url'].endswith('/thumb.jpg'))
+        self.assertEqual((thumb['width'], thumb['height']), (200, 160))
+        self.assertEqual(post['image_placeholder'], blurhash.encode(
+            Image.new('RGB', (200, 160))))
+
+    def test_upload_clears_old_derivatives(self):
+        """Test the derivatives of a replaced image are not served."""
+        self.post.image_variants = {'thumb': {
+            'name': 'derivatives/old/thumb.jpg', 'width': 1, 'height': 1,
+        }}
+        self.post.image_placeholder = 'L00000fQfQfQfQfQfQfQfQfQfQfQ'
+        self.post.save()
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+                Image.new('RGB', (10, 10)).save(image_file, format='JPEG')
+                image_file.seek(0)
+                res = self.client.post(
+                    post_upload_url(self.post.id),
+                    {'image': image_file},
+                    format='multipart',
+                )
+
+        self.assertEqual(res.data['image_variants'], {})
+        self.assertEqual(res.data['image_placeholder'], '')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.image_variants, {})
+        self.assertEqual(self.post.image_placeholder, '')
+        self.assertEqual(len(callbacks), 1)
+
+    def test_stale_result_ignored(self):
+        """Test derivatives finishing after a newer upload are dropped."""
+        self.post.image = 'uploads/post/new.jpg'
+        self.post.save()
+
+        images._record(Post, self.post.id, 'image', 'uploads/post/old.jpg', ({
+            'thumb': (os.path.join(self.media_root, 'x.jpg'), 1, 1, ['jpeg']),
+        }, 'L00000fQfQfQfQfQfQfQfQfQfQfQ'))
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.image_variants, {})
+
+    def test_account_avatar_derivatives(self):
+        """Test avatars get derivatives too."""
+        account = Account.objects.get(user=self.user)
+
+        res = self.upload(account_upload_url(account.id), field='avatar')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        account.refresh_from_db()
+        self.assertEqual(
+            set(account.avatar_variants), set(images.DERIVATIVES))
+
+
+@override_settings(IMAGE_PIPELINE_WORKERS=1)
+class ImagePipelinePoolTests(TestCase):
+    """Tests for handing renders to the worker pool."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password1234',
+        )
+        os.makedirs(os.path.join(self.media_root, 'uploads', 'post'))
+        self.name = 'uploads/post/photo.jpg'
+        make_image(os.path.join(self.media_root, self.name), (400, 300))
+        self.post = Post.objects.create(
+            user=user, title='Kickflip', image=self.name)
+        self.executor = mock.Mock()
+        self.pending = threading.BoundedSemaphore(1)
+        for patcher in (
+            mock.patch.object(
+                images, '_get_executor', return_value=self.executor),
+            mock.patch.object(images, '_pending', self.pending),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root)
+
+    def assert_rendered(self):
+        """Assert the post got its derivatives."""
+        self.post.refresh_from_db()
+        self.assertEqual(
+            set(self.post.image_variants), set(images.DERIVATIVES))
+
+    def test_full_pool_renders_inline(self):
+        """Test renders beyond the queue bound run in the caller instead
+        of waiting for a slot."""
+        self.pending.acquire()
+
+        images.generate_derivatives(Post, self.post.id, 'image', self.name)
+
+        self.executor.submit.assert_not_called()
+        self.assert_rendered()
+
+    def test_refused_submit_releases_slot(self):
+        """Test a pool refusing a render gives its slot back and the
+        render runs in the caller."""
+        self.executor.submit.side_effect = RuntimeError('broken pool')
+
+        with self.assertLogs('media', 'ERROR'):
+            images.generate_derivatives(
+                Post, self.post.id, 'image', self.name)
+
+        self.assert_rendered()
+        self.assertTrue(self.pending.acquire(blocking=False))
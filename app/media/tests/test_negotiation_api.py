@@ -0,0 +1,171 @@
+"""
+Tests for Accept negotiated image formats.
+"""
+import os
+import shutil
+import tempfile
+from unittest import skipUnless
+
+from PIL import (
+    features,
+    Image,
+)
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    override_settings,
+    SimpleTestCase,
+    TestCase,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Post
+from media import images
+from media.negotiation import choose_format
+
+
+CHROME_ACCEPT = 'image/avif,image/webp,image/apng,image/*,*/*;q=0.8'
+SAFARI_ACCEPT = 'image/png,image/svg+xml,image/*;q=0.8,*/*;q=0.5'
+
+
+def derivative_url(name):
+    """Create and return a derivative URL."""
+    return reverse('media:derivative', args=[name])
+
+
+class ChooseFormatTests(SimpleTestCase):
+    """Tests for picking a format from an Accept header."""
+
+    @skipUnless(features.check('webp'), 'Pillow is built without WebP')
+    def test_best_listed_format(self):
+        """Test the best modern format listed by name is chosen."""
+        self.assertEqual(
+            choose_format(CHROME_ACCEPT, 'jpeg'), images.MODERN_FORMATS[0])
+        self.assertEqual(
+            choose_format('image/webp,*/*', 'jpeg'), 'webp')
+
+    def test_wildcards_ignored(self):
+        """Test wildcards alone fall back to the original format."""
+        self.assertEqual(choose_format(SAFARI_ACCEPT, 'jpeg'), 'jpeg')
+        self.assertEqual(choose_format('*/*', 'png'), 'png')
+        self.assertEqual(choose_format(None, 'jpeg'), 'jpeg')
+
+    @skipUnless(features.check('webp'), 'Pillow is built without WebP')
+    def test_quality_values(self):
+        """Test q values rank formats and q=0 refuses one."""
+        self.assertEqual(
+            choose_format('image/avif;q=0.5,image/webp', 'jpeg'), 'webp')
+        self.assertEqual(
+            choose_format('image/avif;q=0,image/webp;q=0', 'jpeg'), 'jpeg')
+
+    @skipUnless(features.check('webp'), 'Pillow is built without WebP')
+    def test_available_formats(self):
+        """Test formats that were not rendered are skipped."""
+        self.assertEqual(
+            choose_format(CHROME_ACCEPT, 'jpeg', available=('webp',)),
+            'webp',
+        )
+
+
+class DerivativeApiTests(TestCase):
+    """Tests for serving derivatives in negotiated formats."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            MEDIA_RESIZE_CACHE_ROOT=os.path.join(self.media_root, 'cache'),
+        )
+        self.override.enable()
+        self.client = APIClient()
+        os.makedirs(os.path.join(self.media_root, 'uploads', 'post'))
+        self.upload = 'uploads/post/photo.jpg'
+        source = os.path.join(self.media_root, self.upload)
+        Image.new('RGB', (800, 600), 'green').save(source)
+        stem = os.path.join(
+            self.media_root, images.derivative_name(self.upload, 'thumb', ''))
+        results = images.render_derivatives(source, {'thumb': (stem, 200)})
+        self.name = os.path.relpath(results['thumb'][0], self.media_root)
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password1234',
+        )
+        self.post = Post.objects.create(
+            user=self.user, title='Photo', image=self.upload)
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_derivatives_rendered_in_modern_formats(self):
+        """Test derivatives are written in every modern format."""
+        stem = os.path.splitext(
+            os.path.join(self.media_root, self.name))[0]
+        for output_format in images.MODERN_FORMATS:
+            ext = images.FORMATS[output_format][1]
+            self.assertTrue(os.path.exists(stem + ext))
+
+    @skipUnless(features.check('webp'), 'Pillow is built without WebP')
+    def test_modern_format_when_accepted(self):
+        """Test clients accepting WebP get it instead of JPEG."""
+        res = self.client.get(
+            derivative_url(self.name), HTTP_ACCEPT='image/webp,*/*')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'image/webp')
+        self.assertIn('Accept', res['Vary'])
+
+    def test_original_format_otherwise(self):
+        """Test clients listing only wildcards get the JPEG."""
+        res = self.client.get(
+            derivative_url(self.name), HTTP_ACCEPT=SAFARI_ACCEPT)
+
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertIn('Accept', res['Vary'])
+
+    @skipUnless(features.check('webp'), 'Pillow is built without WebP')
+    def test_missing_modern_file_falls_back(self):
+        """Test a derivative missing the accepted format is sent as is."""
+        stem = os.path.splitext(os.path.join(self.media_root, self.name))[0]
+        os.remove(stem + '.webp')
+
+        res = self.client.get(
+            derivative_url(self.name), HTTP_ACCEPT='image/webp')
+
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+
+    def test_only_derivatives(self):
+        """Test uploads and unknown paths are not served."""
+        for path in (self.upload, 'derivatives/none/thumb.jpg',
+                     'derivatives/../uploads/post/photo.jpg'):
+            res = self.client.get(derivative_url(path))
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @skipUnless(features.check('webp'), 'Pillow is built without WebP')
+    def test_resize_negotiates_without_format(self):
+        """Test resizing picks a format from Accept unless one is given."""
+        url = reverse('media:resize', args=[self.upload])
+
+        res = self.client.get(url + '?w=64', HTTP_ACCEPT=CHROME_ACCEPT)
+        self.assertEqual(
+            res['Content-Type'],
+            images.FORMATS[images.MODERN_FORMATS[0]][2],
+        )
+        self.assertIn('Accept', res['Vary'])
+
+        res = self.client.get(
+            url + '?w=64&fmt=jpeg', HTTP_ACCEPT=CHROME_ACCEPT)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertNotIn('Accept', res.get('Vary', ''))
+
+    def test_unheld_derivative_not_served(self):
+        """Test derivatives of uploads no row holds are not served."""
+        Post.objects.filter(pk=self.post.pk).update(image='')
+
+        res = self.client.get(derivative_url(self.name))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,141 @@
+"""
+Tests for the image resize API.
+"""
+import os
+import shutil
+import tempfile
+from unittest import (
+    mock,
+    skipUnless,
+)
+
+from PIL import (
+    features,
+    Image,
+)
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    override_settings,
+    TestCase,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Post
+from media import resize
+
+
+def resize_url(path, **params):
+    """Create and return a resize URL."""
+    url = reverse('media:resize', args=[path])
+    if params:
+        url += '?' + '&'.join(f'{k}={v}' for k, v in params.items())
+
+    return url
+
+
+class ResizeApiTests(TestCase):
+    """Tests for resizing uploads on demand."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.cache_root = tempfile.mkdtemp()
+        self.override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            MEDIA_RESIZE_CACHE_ROOT=self.cache_root,
+        )
+        self.override.enable()
+        self.client = APIClient()
+        os.makedirs(os.path.join(self.media_root, 'uploads', 'post'))
+        self.name = 'uploads/post/photo.jpg'
+        Image.new('RGB', (1000, 500), 'blue').save(
+            os.path.join(self.media_root, self.name))
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password1234',
+        )
+        self.post = Post.objects.create(
+            user=self.user, title='Photo', image=self.name)
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root)
+        shutil.rmtree(self.cache_root)
+
+    def read_image(self, res):
+        """Decode the image in a response."""
+        path = os.path.join(self.cache_root, 'out')
+        with open(path, 'wb') as f:
+            f.write(b''.join(res.streaming_content))
+
+        return Image.open(path)
+
+    def test_resize(self):
+        """Test an upload is scaled to the requested width."""
+        res = self.client.get(resize_url(self.name, w=320))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertIn('max-age=', res['Cache-Control'])
+        self.assertIn('private', res['Cache-Control'])
+        with self.read_image(res) as image:
+            self.assertEqual(image.size, (320, 160))
+
+    def test_width_snapped_and_capped(self):
+        """Test widths round up to the step and never upscale."""
+        res = self.client.get(resize_url(self.name, w=310))
+        with self.read_image(res) as image:
+            self.assertEqual(image.width, 320)
+
+        res = self.client.get(resize_url(self.name, w=1500))
+        with self.read_image(res) as image:
+            self.assertEqual(image.width, 1000)
+
+    @skipUnless(features.check('webp'), 'Pillow is built without WebP')
+    def test_format(self):
+        """Test the output format can be chosen."""
+        res = self.client.get(resize_url(self.name, w=100, fmt='webp'))
+
+        self.assertEqual(res['Content-Type'], 'image/webp')
+        with self.read_image(res) as image:
+            self.assertEqual(image.format, 'WEBP')
+
+    def test_repeat_served_from_cache(self):
+        """Test a variant is rendered once and then read from disk."""
+        with mock.patch.object(
+            resize, 'render_variant', wraps=resize.render_variant
+        ) as render:
+            self.client.get(resize_url(self.name, w=100))
+            res = self.client.get(resize_url(self.name, w=100))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(render.call_count, 1)
+
+    def test_only_uploads(self):
+        """Test paths outside the uploads cannot be resized."""
+        for path in (
+            'uploads/post/missing.jpg',
+            'derivatives/uploads/post/photo/thumb.jpg',
+            'uploads/../uploads/../../etc/passwd',
+        ):
+            res = self.client.get(resize_url(path, w=100))
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_params(self):
+        """Test bad widths and formats are rejected."""
+        for params in ({}, {'w': 0}, {'w': 'big'}, {'w': 10, 'fmt': 'bmp'}):
+            res = self.client.get(resize_url(self.name, **params))
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unheld_upload_not_resized(self):
+        """Test uploads no row holds, like unconfirmed direct uploads, are
+        not resized."""
+        self.post.delete()
+
+        res = self.client.get(resize_url(self.name, w=100))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,198 @@
+"""
+Tests for serving media files.
+"""
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    override_settings,
+    SimpleTestCase,
+    TestCase,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Post,
+    Recipe,
+)
+from media.serving import (
+    parse_range,
+    RangeNotSatisfiable,
+)
+
+CONTENT = b'0123456789abcdef'
+
+
+def media_url(name):
+    """Create and return the URL of a media file."""
+    return reverse('media-file', args=[name])
+
+
+class ParseRangeTests(SimpleTestCase):
+    """Tests for reading Range headers."""
+
+    def test_ranges(self):
+        """Test byte ranges are resolved against the file size."""
+        self.assertEqual(parse_range('bytes=0-3', 16), (0, 3))
+        self.assertEqual(parse_range('bytes=10-', 16), (10, 15))
+        self.assertEqual(parse_range('bytes=-4', 16), (12, 15))
+        self.assertEqual(parse_range('bytes=8-100', 16), (8, 15))
+
+    def test_ignored(self):
+        """Test missing, malformed and multiple ranges send the file."""
+        for header in (None, '', 'bytes=a-b', 'bytes=0-1,4-5', 'lines=1-2'):
+            self.assertIsNone(parse_range(header, 16))
+
+    def test_unsatisfiable(self):
+        """Test ranges past the end of the file are refused."""
+        for header in ('bytes=16-', 'bytes=5-2'):
+            with self.assertRaises(RangeNotSatisfiable):
+                parse_range(header, 16)
+
+
+class MediaFileApiTests(TestCase):
+    """Tests for the media file view."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(
+            MEDIA_ROOT=self.media_root, MEDIA_ACCEL_REDIRECT=False)
+        self.override.enable()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password1234',
+        )
+        self.client.force_authenticate(self.user)
+        self.name = 'uploads/post/ab/clip.jpg'
+        Post.objects.create(user=self.user, title='Clip', image=self.name)
+        self.thumb = 'derivatives/uploads/post/ab/clip/thumb.webp'
+        for name in (self.name, self.thumb, 'uploads/post/ab/orphan.jpg',
+                     'tmp/sessions/upload'):
+            self.create_file(name)
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root)
+
+    def create_file(self, name):
+        """Create a media file."""
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(CONTENT)
+
+    def test_handed_to_nginx(self):
+        """Test readable files are sent by nginx when it is in front."""
+        with self.settings(MEDIA_ACCEL_REDIRECT=True):
+            res = self.client.get(media_url(self.name))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res['X-Accel-Redirect'], '/protected-media/' + self.name)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res.content, b'')
+
+    def test_only_held_files(self):
+        """Test files no row holds are not served."""
+        for name in ('uploads/post/ab/orphan.jpg', 'tmp/sessions/upload',
+                     'uploads/post/ab/missing.jpg',
+                     'uploads/../tmp/sessions/upload',
+                     'derivatives/uploads/post/ab/orphan/thumb.webp'):
+            res = self.client.get(media_url(name))
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_derivative_served(self):
+        """Test derivatives of a held upload are served."""
+        res = self.client.get(media_url(self.thumb))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'image/webp')
+
+    def test_whole_file(self):
+        """Test files are sent whole without a Range header."""
+        res = self.client.get(media_url(self.name))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+
+    def test_partial_content(self):
+        """Test a Range header gets only the bytes asked for."""
+        res = self.client.get(media_url(self.name), HTTP_RANGE='bytes=4-7')
+
+        self.assertEqual(res.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(res.streaming_content), b'4567')
+        self.assertEqual(res['Content-Range'], 'bytes 4-7/16')
+        self.assertEqual(res['Content-Length'], '4')
+
+    def test_range_not_satisfiable(self):
+        """Test ranges past the end of the file are refused."""
+        res = self.client.get(media_url(self.name), HTTP_RANGE='bytes=20-')
+
+        self.assertEqual(
+            res.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(res['Content-Range'], 'bytes */16')
+
+    def test_if_range(self):
+        """Test ranges are only sent while If-Range matches the file."""
+        etag = self.client.get(media_url(self.name))['ETag']
+
+        res = self.client.get(
+            media_url(self.name), HTTP_RANGE='bytes=-2', HTTP_IF_RANGE=etag)
+        self.assertEqual(res.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(res.streaming_content), b'ef')
+
+        res = self.client.get(
+            media_url(self.name), HTTP_RANGE='bytes=-2',
+            HTTP_IF_RANGE='"changed"',
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+
+    def test_not_modified(self):
+        """Test clients holding the current file get a 304."""
+        etag = self.client.get(media_url(self.name))['ETag']
+
+        res = self.client.get(media_url(self.name), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_auth_required(self):
+        """Test media files are not sent to anonymous clients."""
+        self.client.force_authenticate(None)
+
+        res = self.client.get(media_url(self.name))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_recipe_images_owner_only(self):
+        """Test recipe images are only sent to the owner of the recipe,
+        as the recipe API lists them."""
+        name = 'uploads/recipe/cd/cake.jpg'
+        self.create_file(name)
+        Recipe.objects.create(
+            user=self.user,
+            title='Cake',
+            time_minutes=30,
+            price=Decimal('5.00'),
+            image=name,
+        )
+
+        res = self.client.get(media_url(name))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            'other@example.com',
+            'password1234',
+        ))
+        res = self.client.get(media_url(name))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        res = self.client.get(media_url(self.name))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
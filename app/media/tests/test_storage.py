@@ -0,0 +1,214 @@
+"""
+Tests for content-addressed storage.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.test import (
+    override_settings,
+    TestCase,
+)
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import (
+    Blob,
+    Post,
+)
+from media.storage import ContentAddressedStorage
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Tests for ContentAddressedStorage."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_named_by_content(self):
+        """Test files are named by the hash of their content."""
+        digest = hashlib.sha256(b'kickflip').hexdigest()
+
+        name = self.storage.save(
+            'uploads/post/a.JPG', ContentFile(b'kickflip'))
+
+        self.assertEqual(name, f'uploads/post/{digest[:2]}/{digest}.jpg')
+        with self.storage.open(name) as f:
+            self.assertEqual(f.read(), b'kickflip')
+        blob = Blob.objects.get(name=name)
+        self.assertEqual((blob.size, blob.refcount), (8, 1))
+        self.assertEqual(os.listdir(os.path.join(self.root, 'tmp')), [])
+
+    def test_duplicate_counted_not_written(self):
+        """Test saving the same content again only adds a reference."""
+        first = self.storage.save('uploads/post/a.jpg', ContentFile(b'ollie'))
+        path = self.storage.path(first)
+        os.utime(path, (0, 0))
+
+        second = self.storage.save(
+            'uploads/post/b.jpg', ContentFile(b'ollie'))
+
+        self.assertEqual(first, second)
+        self.assertEqual(os.stat(path).st_mtime, 0)
+        self.assertEqual(Blob.objects.get(name=first).refcount, 2)
+        self.assertEqual(os.listdir(os.path.join(self.root, 'tmp')), [])
+
+    def test_temporary_upload_moved(self):
+        """Test uploads spooled to disk are hashed and moved into place."""
+        upload = TemporaryUploadedFile('a.jpg', 'image/jpeg', 5, None)
+        upload.write(b'grind')
+        upload.seek(0)
+
+        name = self.storage.save('uploads/park/a.jpg', upload)
+
+        digest = hashlib.sha256(b'grind').hexdigest()
+        self.assertTrue(name.endswith(f'{digest}.jpg'))
+        self.assertTrue(self.storage.exists(name))
+
+    def test_delete_drops_references(self):
+        """Test the file is removed with its last reference."""
+        name = self.storage.save('uploads/post/a.jpg', ContentFile(b'manual'))
+        self.storage.save('uploads/post/b.jpg', ContentFile(b'manual'))
+
+        self.storage.delete(name)
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(Blob.objects.get(name=name).refcount, 1)
+
+        self.storage.delete(name)
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(Blob.objects.filter(name=name).exists())
+
+    def test_missing_file_rewritten(self):
+        """Test a blob whose file went missing is written again."""
+        name = self.storage.save('uploads/post/a.jpg', ContentFile(b'nose'))
+        os.remove(self.storage.path(name))
+
+        self.storage.save('uploads/post/a.jpg', ContentFile(b'nose'))
+
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(Blob.objects.get(name=name).refcount, 2)
+
+
+@override_settings(IMAGE_PIPELINE_WORKERS=0)
+class DeduplicatedUploadTests(TestCase):
+    """Tests for uploading the same image twice."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password1234',
+        )
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_repost_shares_file_and_derivatives(self):
+        """Test a reposted image reuses the stored file and derivatives."""
+        posts = [
+            Post.objects.create(user=self.user, title=title)
+            for title in ('First', 'Repost')
+        ]
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (400, 300), 'red').save(
+                image_file, format='JPEG')
+            for post in posts:
+                image_file.seek(0)
+                url = reverse('post:post-upload-image', args=[post.id])
+                with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                    self.client.post(
+                        url, {'image': image_file}, format='multipart')
+
+        first, repost = [Post.objects.get(id=post.id) for post in posts]
+        self.assertEqual(first.image.name, repost.image.name)
+        self.assertEqual(Blob.objects.get(name=first.image.name).refcount, 2)
+        self.assertEqual(repost.image_variants, first.image_variants)
+        self.assertEqual(callbacks, [])
+
+
+@override_settings(IMAGE_PIPELINE_WORKERS=0)
+class ReleasedUploadTests(TestCase):
+    """Tests for the references of replaced and deleted images."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password1234',
+        )
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(user=self.user, title='Post')
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root)
+
+    def upload(self, color):
+        """Upload an image of one color to the post and return its name."""
+        url = reverse('post:post-upload-image', args=[self.post.id])
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (40, 30), color).save(image_file, format='JPEG')
+            image_file.seek(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    url, {'image': image_file}, format='multipart')
+
+        return Post.objects.get(id=self.post.id).image.name
+
+    def test_replaced_image_released(self):
+        """Test replacing an image drops the reference on the old one."""
+        old = self.upload('red')
+        new = self.upload('blue')
+
+        self.assertNotEqual(old, new)
+        self.assertFalse(Blob.objects.filter(name=old).exists())
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, old)))
+        self.assertEqual(Blob.objects.get(name=new).refcount, 1)
+
+    def test_same_image_again_keeps_one_reference(self):
+        """Test uploading the same image again leaves one reference."""
+        first = self.upload('red')
+        second = self.upload('red')
+
+        self.assertEqual(first, second)
+        self.assertEqual(Blob.objects.get(name=first).refcount, 1)
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, first)))
+
+    def test_deleted_row_released(self):
+        """Test deleting a row drops the reference on its image, keeping
+        the file while another row refers to it."""
+        name = self.upload('red')
+        other = Post.objects.create(user=self.user, title='Repost')
+        other.image = name
+        other.save()
+        Blob.objects.filter(name=name).update(refcount=2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.get(id=self.post.id).delete()
+
+        self.assertEqual(Blob.objects.get(name=name).refcount, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+
+        self.assertFalse(Blob.objects.filter(name=name).exists())
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, name)))
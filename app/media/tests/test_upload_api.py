@@ -0,0 +1,278 @@
+"""
+Tests for the resumable upload API.
+"""
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    override_settings,
+    TestCase,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from core.models import (
+    Account,
+    Post,
+    UploadSession,
+)
+from media.uploads import session_path
+from post.serializers import PostImageSerializer
+
+SESSIONS_URL = reverse('media:uploadsession-list')
+
+
+def detail_url(session_id):
+    """Create and return an upload session URL."""
+    return reverse('media:uploadsession-detail', args=[session_id])
+
+
+def chunk_url(session_id, index):
+    """Create and return the URL of a chunk."""
+    return reverse('media:uploadsession-chunk', args=[session_id, index])
+
+
+def complete_url(session_id):
+    """Create and return the URL completing an upload."""
+    return reverse('media:uploadsession-complete', args=[session_id])
+
+
+def image_bytes():
+    """Return a small JPEG."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (300, 200), 'blue').save(buffer, format='JPEG')
+
+    return buffer.getvalue()
+
+
+@override_settings(IMAGE_PIPELINE_WORKERS=0)
+class UploadApiTests(TestCase):
+    """Tests for uploading images in chunks."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password1234',
+        )
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(user=self.user, title='Kickflip')
+        self.data = image_bytes()
+        self.chunk_size = len(self.data) // 3 + 1
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root)
+
+    def create_session(self, **params):
+        """Create an upload session for the post."""
+        payload = {
+            'target': 'post',
+            'object_id': self.post.id,
+            'filename': 'photo.jpg',
+            'size': len(self.data),
+            'chunk_size': self.chunk_size,
+        }
+        payload.update(params)
+
+        return self.client.post(SESSIONS_URL, payload)
+
+    def put_chunk(self, session_id, index):
+        """PUT chunk `index` of the image."""
+        start = index * self.chunk_size
+        return self.client.put(
+            chunk_url(session_id, index),
+            self.data[start:start + self.chunk_size],
+            content_type='application/octet-stream',
+        )
+
+    def test_upload_in_chunks(self):
+        """Test an image sent in chunks is attached to the post."""
+        res = self.create_session()
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        session_id = res.data['id']
+        self.assertEqual(res.data['chunk_count'], 3)
+
+        for index in range(3):
+            res = self.put_chunk(session_id, index)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.data['received'], index + 1)
+        checksum = hashlib.sha256(self.data).hexdigest()
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(
+                complete_url(session_id), {'checksum': checksum})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.post.refresh_from_db()
+        with self.post.image.open('rb') as image_file:
+            self.assertEqual(image_file.read(), self.data)
+        self.assertIn('thumb', self.post.image_variants)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertEqual(
+            os.listdir(os.path.join(self.media_root, 'tmp', 'sessions')), [])
+
+    def test_resume_after_interruption(self):
+        """Test the session reports where to resume and retries are safe."""
+        session_id = self.create_session().data['id']
+        self.put_chunk(session_id, 0)
+
+        res = self.client.get(detail_url(session_id))
+        self.assertEqual(res.data['received'], 1)
+
+        res = self.put_chunk(session_id, 0)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.put_chunk(session_id, 2)
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.put_chunk(session_id, 1)
+        self.put_chunk(session_id, 2)
+        session = UploadSession.objects.get(id=session_id)
+        with open(session_path(session), 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_wrong_chunk_length_dropped(self):
+        """Test a truncated chunk is not kept."""
+        session_id = self.create_session().data['id']
+
+        res = self.client.put(
+            chunk_url(session_id, 0),
+            self.data[:10],
+            content_type='application/octet-stream',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        session = UploadSession.objects.get(id=session_id)
+        self.assertEqual(session.received, 0)
+        self.assertEqual(os.path.getsize(session_path(session)), 0)
+
+    def test_incomplete_upload_rejected(self):
+        """Test completing before every chunk arrived fails."""
+        session_id = self.create_session().data['id']
+        self.put_chunk(session_id, 0)
+
+        res = self.client.post(
+            complete_url(session_id),
+            {'checksum': hashlib.sha256(self.data).hexdigest()},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+    def test_checksum_mismatch(self):
+        """Test a file not matching its checksum is discarded."""
+        session_id = self.create_session().data['id']
+        for index in range(3):
+            self.put_chunk(session_id, index)
+
+        res = self.client.post(
+            complete_url(session_id), {'checksum': '0' * 64})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(UploadSession.objects.exists())
+        self.post.refresh_from_db()
+        self.assertFalse(self.post.image)
+
+    def test_not_an_image(self):
+        """Test a completed upload that is not an image is rejected."""
+        self.data = b'not an image' * 10
+        self.chunk_size = len(self.data)
+        session_id = self.create_session().data['id']
+        self.put_chunk(session_id, 0)
+
+        res = self.client.post(
+            complete_url(session_id),
+            {'checksum': hashlib.sha256(self.data).hexdigest()},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+        self.assertTrue(UploadSession.objects.filter(id=session_id).exists())
+
+    def test_refused_upload_kept_for_retry(self):
+        """Test a verified file the target refuses is kept, so completing
+        can be retried without sending the chunks again."""
+        session_id = self.create_session().data['id']
+        for index in range(3):
+            self.put_chunk(session_id, index)
+        checksum = hashlib.sha256(self.data).hexdigest()
+        with mock.patch.object(
+            PostImageSerializer, 'validate',
+            side_effect=ValidationError('Post is being edited.'),
+        ):
+            res = self.client.post(
+                complete_url(session_id), {'checksum': checksum})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(
+                complete_url(session_id), {'checksum': checksum})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.post.refresh_from_db()
+        with self.post.image.open('rb') as image_file:
+            self.assertEqual(image_file.read(), self.data)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_account_avatar(self):
+        """Test uploading to the avatar of the user's account."""
+        account = Account.objects.get(user=self.user)
+        self.chunk_size = len(self.data)
+        session_id = self.create_session(
+            target='account', object_id=account.id).data['id']
+        self.put_chunk(session_id, 0)
+
+        res = self.client.post(
+            complete_url(session_id),
+            {'checksum': hashlib.sha256(self.data).hexdigest()},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        account.refresh_from_db()
+        self.assertTrue(account.avatar)
+
+    def test_other_users_objects(self):
+        """Test uploading to another user's post or session is refused."""
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'password1234',
+        )
+        post = Post.objects.create(user=other, title='Heelflip')
+        res = self.create_session(object_id=post.id)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        session_id = self.create_session().data['id']
+        self.client.force_authenticate(other)
+        res = self.put_chunk(session_id, 0)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_size_limits(self):
+        """Test oversized files and chunks are refused."""
+        with self.settings(MEDIA_UPLOAD_MAX_BYTES=100):
+            res = self.create_session()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('size', res.data)
+
+        res = self.create_session(chunk_size=64 * 1024 ** 2)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('chunk_size', res.data)
+
+    def test_abort(self):
+        """Test deleting a session removes its file."""
+        session_id = self.create_session().data['id']
+        path = session_path(UploadSession.objects.get(id=session_id))
+
+        res = self.client.delete(detail_url(session_id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(os.path.exists(path))
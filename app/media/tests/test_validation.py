@@ -0,0 +1,186 @@
+"""
+Tests for bounded-memory image validation.
+"""
+import io
+import shutil
+import tempfile
+import threading
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import (
+    override_settings,
+    SimpleTestCase,
+    TestCase,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Post
+from media import validation
+from media.validation import (
+    clean_image,
+    DecodeBudget,
+    InvalidImage,
+)
+
+GPS_INFO_TAG = 0x8825
+ORIENTATION_TAG = 0x0112
+
+
+def upload(size=(80, 60), image_format='JPEG', mode='RGB', **save_options):
+    """Return an uploaded image file."""
+    buffer = io.BytesIO()
+    Image.new(mode, size, 'red').save(
+        buffer, format=image_format, **save_options)
+
+    return SimpleUploadedFile('photo', buffer.getvalue())
+
+
+def tagged_exif():
+    """Return EXIF with a rotation and a location."""
+    exif = Image.Exif()
+    exif[ORIENTATION_TAG] = 6
+    exif[GPS_INFO_TAG] = {1: 'N', 2: (52.0, 22.0, 0.0)}
+
+    return exif
+
+
+class CleanImageTests(SimpleTestCase):
+    """Tests for validating uploaded images."""
+
+    @override_settings(IMAGE_MAX_PIXELS=1000000)
+    def test_too_many_pixels(self):
+        """Test images over the pixel limit are refused undecoded."""
+        image_file = upload((2000, 1000), 'PNG', mode='1')
+
+        with self.assertRaisesRegex(InvalidImage, 'at most'):
+            clean_image(image_file)
+
+    @override_settings(IMAGE_DECODE_MAX_BYTES=100 * 100 * 4)
+    def test_large_jpeg_decoded_reduced(self):
+        """Test JPEGs over the memory limit are decoded at a lower scale."""
+        image_file = upload((800, 800))
+
+        cleaned = clean_image(image_file)
+
+        with Image.open(cleaned) as image:
+            self.assertEqual(image.size, (800, 800))
+
+    @override_settings(IMAGE_DECODE_MAX_BYTES=100 * 100 * 4)
+    def test_large_png_refused(self):
+        """Test images that cannot be decoded small enough are refused."""
+        with self.assertRaisesRegex(InvalidImage, 'too large'):
+            clean_image(upload((800, 800), 'PNG'))
+
+    def test_not_an_image(self):
+        """Test files that are not images are refused."""
+        for data in (b'not an image', upload().read()[:200]):
+            with self.assertRaises(InvalidImage):
+                clean_image(SimpleUploadedFile('photo', data))
+
+    def test_exif_stripped(self):
+        """Test metadata is removed except for the orientation."""
+        for image_format in validation.STRIPPERS:
+            if image_format not in validation.UPLOAD_FORMATS:
+                continue
+            with self.subTest(image_format=image_format):
+                image_file = upload(
+                    image_format=image_format, exif=tagged_exif())
+
+                cleaned = clean_image(image_file)
+
+                with Image.open(cleaned) as image:
+                    exif = image.getexif()
+                    self.assertNotIn(GPS_INFO_TAG, exif)
+                    if image_format != 'WEBP':
+                        self.assertEqual(exif.get(ORIENTATION_TAG), 6)
+                    image.load()
+                    self.assertEqual(image.size, (80, 60))
+
+    def test_without_exif_unchanged(self):
+        """Test images without metadata are copied as they are."""
+        image_file = upload(image_format='PNG')
+        data = image_file.read()
+        image_file.seek(0)
+
+        self.assertEqual(clean_image(image_file).read(), data)
+
+
+class DecodeBudgetTests(SimpleTestCase):
+    """Tests for sharing decode memory between threads."""
+
+    def test_waits_for_budget(self):
+        """Test a decode waits until enough of the budget is released."""
+        budget = DecodeBudget(10)
+        reserved = threading.Event()
+
+        def decode():
+            with budget.reserve(5):
+                reserved.set()
+
+        with budget.reserve(8):
+            thread = threading.Thread(target=decode)
+            thread.start()
+            self.assertFalse(reserved.wait(0.05))
+        thread.join()
+
+        self.assertTrue(reserved.is_set())
+        self.assertEqual(budget.used, 0)
+
+    def test_oversized_reservation(self):
+        """Test reservations over the total wait for the whole budget."""
+        budget = DecodeBudget(10)
+
+        with budget.reserve(50):
+            self.assertEqual(budget.used, 10)
+
+
+@override_settings(IMAGE_PIPELINE_WORKERS=0)
+class ValidatedUploadApiTests(TestCase):
+    """Tests for uploads going through validation."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password1234',
+        )
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(user=self.user, title='Kickflip')
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_stored_without_location(self):
+        """Test uploaded photos are stored without their location."""
+        image_file = upload(exif=tagged_exif())
+        image_file.name = 'photo.jpg'
+        url = reverse('post:post-upload-image', args=[self.post.id])
+
+        res = self.client.post(url, {'image': image_file}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.post.refresh_from_db()
+        with Image.open(self.post.image.path) as image:
+            self.assertNotIn(GPS_INFO_TAG, image.getexif())
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_oversized_refused(self):
+        """Test images over the pixel limit get a validation error."""
+        image_file = upload()
+        image_file.name = 'photo.jpg'
+        url = reverse('post:post-upload-image', args=[self.post.id])
+
+        res = self.client.post(url, {'image': image_file}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
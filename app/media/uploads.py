@@ -0,0 +1,191 @@
+"""
+Resumable chunked uploads.
+
+A session is created for an image field of an object, then its chunks are
+PUT in order and appended straight to a temporary file, so a request never
+holds more than a small buffer. A client that lost its connection asks
+the session how many chunks arrived and carries on from there. Completing
+the session checks the SHA-256 of the whole file and attaches it through
+the same serializer as a direct upload.
+"""
+import fcntl
+import hashlib
+import os
+
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from rest_framework import (
+    exceptions,
+    status,
+)
+
+from account.serializers import AccountImageSerializer
+from core.models import (
+    Account,
+    Park,
+    Post,
+    Recipe,
+    UploadSession,
+)
+from media.images import process_upload
+from media.storage import (
+    TEMP_DIR,
+    TemporaryUpload,
+)
+from park.serializers import ParkImageSerializer
+from post.serializers import PostImageSerializer
+from recipe.serializers import RecipeImageSerializer
+
+# Model, image field and upload serializer of each target.
+TARGETS = {
+    'post': (Post, 'image', PostImageSerializer),
+    'park': (Park, 'image', ParkImageSerializer),
+    'recipe': (Recipe, 'image', RecipeImageSerializer),
+    'account': (Account, 'avatar', AccountImageSerializer),
+}
+
+SESSIONS_DIR = os.path.join(TEMP_DIR, 'sessions')
+READ_SIZE = 64 * 1024
+
+
+class Conflict(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Chunk out of order.'
+    default_code = 'conflict'
+
+
+class Gone(exceptions.APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'Upload expired.'
+    default_code = 'gone'
+
+
+def session_path(session):
+    """Return the path of the temporary file of a session."""
+    return default_storage.path(os.path.join(SESSIONS_DIR, str(session.pk)))
+
+
+def get_target(user, target, object_id):
+    """Return the object of `user` an upload is for, or raise NotFound."""
+    model = TARGETS[target][0]
+    instance = model._default_manager.filter(
+        pk=object_id, user=user).first()
+    if instance is None:
+        raise exceptions.NotFound(f'No such {target}.')
+
+    return instance
+
+
+def start_session(session):
+    """Create the empty temporary file of a new session."""
+    path = session_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+
+
+def discard_session(session):
+    """Delete a session and whatever of its file arrived."""
+    try:
+        os.remove(session_path(session))
+    except FileNotFoundError:
+        pass
+    session.delete()
+
+
+def write_chunk(session, index, stream):
+    """
+    Append chunk `index` read from `stream` to the session file.
+
+    Chunks already received are acknowledged without being written again,
+    so a client may retry one whose response it lost. The file is locked
+    while a chunk is written, and a chunk of the wrong length is dropped.
+    """
+    if index >= session.chunk_count:
+        raise exceptions.ValidationError(
+            {'index': f'Expected at most {session.chunk_count} chunks.'})
+    try:
+        chunk_file = open(session_path(session), 'r+b')
+    except FileNotFoundError:
+        raise Gone()
+
+    with chunk_file:
+        fcntl.flock(chunk_file, fcntl.LOCK_EX)
+        session.refresh_from_db(fields=['received'])
+        if index < session.received:
+            return
+        if index > session.received:
+            raise Conflict(f'Expected chunk {session.received}.')
+
+        offset = index * session.chunk_size
+        length = session.chunk_length(index)
+        chunk_file.seek(offset)
+        chunk_file.truncate()
+        written = 0
+        while stream is not None and written <= length:
+            data = stream.read(min(READ_SIZE, length + 1 - written))
+            if not data:
+                break
+            chunk_file.write(data)
+            written += len(data)
+        if written != length:
+            chunk_file.truncate(offset)
+            raise exceptions.ValidationError(
+                {'detail': f'Chunk {index} must be {length} bytes.'})
+        chunk_file.flush()
+        os.fsync(chunk_file.fileno())
+
+        session.received = index + 1
+        UploadSession.objects.filter(pk=session.pk).update(
+            received=session.received, updated_at=timezone.now())
+
+
+def file_checksum(path):
+    """Return the SHA-256 hex digest of a file."""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(READ_SIZE), b''):
+            hasher.update(chunk)
+
+    return hasher.hexdigest()
+
+
+def complete_session(session, checksum, context):
+    """
+    Check a fully received session against its checksum and attach the
+    file to its target, returning the upload serializer. The session is
+    discarded once the file is attached or fails its checksum; when the
+    target refuses it, the session is kept so completing can be retried
+    without sending the chunks again, until the client aborts it or
+    gc_media collects it.
+    """
+    if session.received < session.chunk_count:
+        raise Conflict(f'Expected chunk {session.received}.')
+    path = session_path(session)
+    if not os.path.exists(path):
+        session.delete()
+        raise Gone()
+    if file_checksum(path) != checksum.lower():
+        discard_session(session)
+        raise exceptions.ValidationError(
+            {'checksum': 'Checksum does not match the uploaded file.'})
+
+    instance = get_target(session.user, session.target, session.object_id)
+    _, field_name, serializer_class = TARGETS[session.target]
+    upload = TemporaryUpload(path, session.filename, session.size)
+    try:
+        serializer = serializer_class(
+            instance,
+            data={field_name: upload},
+            partial=True,
+            context=context,
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+    finally:
+        upload.close()
+    discard_session(session)
+
+    process_upload(instance, field_name)
+
+    return serializer
@@ -0,0 +1,33 @@
+"""
+URL mappings for the media app.
+"""
+from django.urls import (
+    include,
+    path,
+)
+
+from rest_framework.routers import DefaultRouter
+
+from media import views
+
+router = DefaultRouter()
+router.register('uploads', views.UploadSessionViewSet)
+router.register(
+    'direct-uploads', views.DirectUploadViewSet, basename='direct-upload')
+
+app_name = 'media'
+
+urlpatterns = [
+    path('', include(router.urls)),
+    path('resize/<path:path>', views.ResizeView.as_view(), name='resize'),
+    path(
+        'images/<path:path>',
+        views.DerivativeView.as_view(),
+        name='derivative',
+    ),
+    path(
+        'files/<str:token>',
+        views.SignedFileView.as_view(),
+        name='signed-file',
+    ),
+]
@@ -0,0 +1,284 @@
+"""
+Upload validation that keeps image decoding within a memory budget.
+
+Uploads are checked from their headers before any pixel is decoded: the
+format must be one the site stores and the dimensions within
+IMAGE_MAX_PIXELS. Large JPEGs are then decoded at a reduced scale with
+Pillow's draft mode, and no image is decoded if its pixels would need more
+than IMAGE_DECODE_MAX_BYTES. All decodes in a process share
+IMAGE_DECODE_BUDGET_BYTES, so concurrent uploads wait for each other
+instead of adding up. Finally EXIF and XMP metadata, which may carry the
+location a photo was taken at, are stripped by copying the file without
+them, keeping only the orientation.
+"""
+import math
+import os
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from PIL import (
+    Image,
+    UnidentifiedImageError,
+)
+
+from media.images import FORMATS
+from media.storage import TemporaryUpload
+
+# Pillow formats accepted for uploads.
+UPLOAD_FORMATS = {
+    pillow_format for pillow_format, _, _, _ in FORMATS.values()
+} | {'GIF'}
+
+ORIENTATION_TAG = 0x0112
+COPY_SIZE = 64 * 1024
+
+
+class InvalidImage(ValueError):
+    """An upload that is not an image the site accepts."""
+
+
+class DecodeBudget:
+    """
+    Bytes of decoded pixels a process may hold at once. Decodes reserve
+    their estimated size and wait while the budget is used up.
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self.used = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def reserve(self, size):
+        size = min(size, self.total)
+        with self._condition:
+            self._condition.wait_for(lambda: self.used + size <= self.total)
+            self.used += size
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.used -= size
+                self._condition.notify_all()
+
+
+_budget = None
+_budget_lock = threading.Lock()
+
+
+def get_budget():
+    """Return the decode budget of this process."""
+    global _budget
+    with _budget_lock:
+        if _budget is None:
+            _budget = DecodeBudget(settings.IMAGE_DECODE_BUDGET_BYTES)
+
+    return _budget
+
+
+def decoded_size(image):
+    """Return the bytes Pillow needs to hold the pixels of an image."""
+    if image.mode in ('1', 'L', 'P'):
+        pixel = 1
+    elif image.mode.startswith('I;16'):
+        pixel = 2
+    else:
+        pixel = 4
+
+    return image.width * image.height * pixel
+
+
+def check_dimensions(image):
+    """Raise InvalidImage for images with too many pixels to decode."""
+    if image.width < 1 or image.height < 1:
+        raise InvalidImage('The image is empty.')
+    if image.width * image.height > settings.IMAGE_MAX_PIXELS:
+        raise InvalidImage(
+            f'Images may have at most {settings.IMAGE_MAX_PIXELS} pixels.')
+
+
+def reduce_for_decoding(image):
+    """
+    Pick a JPEG decoding scale keeping the pixels within the per-image
+    memory limit, and raise InvalidImage if no scale does.
+    """
+    limit = settings.IMAGE_DECODE_MAX_BYTES
+    size = decoded_size(image)
+    if image.format == 'JPEG' and size > limit:
+        scale = math.sqrt(size / limit)
+        image.draft(image.mode, (
+            math.ceil(image.width / scale), math.ceil(image.height / scale)))
+    if decoded_size(image) > limit:
+        raise InvalidImage('The image is too large to process.')
+
+
+def inspect_image(file):
+    """
+    Check an image file from its headers, then decode it within the
+    memory budget. Returns (Pillow format, EXIF orientation).
+    """
+    try:
+        with Image.open(file) as image:
+            if image.format not in UPLOAD_FORMATS:
+                raise InvalidImage(
+                    f'{image.format} images are not supported.')
+            check_dimensions(image)
+            reduce_for_decoding(image)
+            orientation = image.getexif().get(ORIENTATION_TAG, 1)
+            with get_budget().reserve(decoded_size(image)):
+                image.load()
+            return image.format, orientation
+    except (
+        UnidentifiedImageError, Image.DecompressionBombError, OSError,
+        SyntaxError, struct.error,
+    ):
+        raise InvalidImage(
+            'Upload a valid image. The file you uploaded was either not an '
+            'image or a corrupted image.'
+        )
+    finally:
+        file.seek(0)
+
+
+def _orientation_exif(orientation):
+    """Return EXIF data holding only an orientation, with its header."""
+    exif = Image.Exif()
+    exif[ORIENTATION_TAG] = orientation
+
+    return exif.tobytes()
+
+
+def _read(source, size):
+    data = source.read(size)
+    if len(data) != size:
+        raise InvalidImage('The image is truncated.')
+
+    return data
+
+
+def _copy(source, target, size=None):
+    """Copy `size` bytes, or the rest of the file, in small pieces."""
+    while size is None or size > 0:
+        data = source.read(
+            COPY_SIZE if size is None else min(COPY_SIZE, size))
+        if not data:
+            if size is not None:
+                raise InvalidImage('The image is truncated.')
+            return
+        target.write(data)
+        if size is not None:
+            size -= len(data)
+
+
+def strip_jpeg(source, target, orientation):
+    """Copy a JPEG without its APP1 (EXIF and XMP) segments."""
+    target.write(_read(source, 2))
+    if orientation != 1:
+        exif = _orientation_exif(orientation)
+        target.write(b'\xff\xe1' + struct.pack('>H', len(exif) + 2) + exif)
+    while True:
+        marker = _read(source, 2)
+        if marker[0] != 0xff:
+            raise InvalidImage('The image is corrupted.')
+        while marker[1] == 0xff:
+            marker = marker[1:] + _read(source, 1)
+        if marker[1] == 0xda or marker[1] == 0xd9:
+            # Start of scan: the compressed data runs to the end.
+            target.write(marker)
+            _copy(source, target)
+            return
+        if marker[1] == 0x01 or 0xd0 <= marker[1] <= 0xd7:
+            target.write(marker)
+            continue
+        length = _read(source, 2)
+        payload_size = struct.unpack('>H', length)[0] - 2
+        if marker[1] == 0xe1:
+            source.seek(payload_size, os.SEEK_CUR)
+            continue
+        target.write(marker + length)
+        _copy(source, target, payload_size)
+
+
+def strip_png(source, target, orientation):
+    """Copy a PNG without its eXIf chunk."""
+    target.write(_read(source, 8))
+    while True:
+        header = source.read(8)
+        if not header:
+            return
+        if len(header) != 8:
+            raise InvalidImage('The image is truncated.')
+        length, chunk_type = struct.unpack('>I4s', header)
+        if chunk_type == b'eXIf':
+            source.seek(length + 4, os.SEEK_CUR)
+            if orientation != 1:
+                data = _orientation_exif(orientation)[6:]
+                target.write(struct.pack('>I', len(data)) + b'eXIf' + data)
+                target.write(struct.pack(
+                    '>I', zlib.crc32(b'eXIf' + data) & 0xffffffff))
+            continue
+        target.write(header)
+        _copy(source, target, length + 4)
+
+
+def strip_webp(source, target, orientation):
+    """Copy a WebP without its EXIF and XMP chunks."""
+    header = _read(source, 12)
+    target.write(header)
+    while True:
+        chunk_header = source.read(8)
+        if not chunk_header:
+            break
+        if len(chunk_header) != 8:
+            raise InvalidImage('The image is truncated.')
+        fourcc, size = struct.unpack('<4sI', chunk_header)
+        padded = size + (size & 1)
+        if fourcc in (b'EXIF', b'XMP '):
+            source.seek(padded, os.SEEK_CUR)
+            continue
+        target.write(chunk_header)
+        if fourcc == b'VP8X':
+            # Clear the flags announcing the dropped chunks.
+            flags = _read(source, 1)[0] & ~0x0c
+            target.write(bytes([flags]))
+            padded -= 1
+        _copy(source, target, padded)
+    riff_size = target.tell() - 8
+    target.seek(4)
+    target.write(struct.pack('<I', riff_size))
+    target.seek(0, os.SEEK_END)
+
+
+STRIPPERS = {
+    'JPEG': strip_jpeg,
+    'PNG': strip_png,
+    'WEBP': strip_webp,
+}
+
+
+def clean_image(file):
+    """
+    Validate an uploaded image and return it, copied to a TemporaryUpload
+    without its metadata for formats that carry any. Raises InvalidImage.
+    """
+    image_format, orientation = inspect_image(file)
+    strip = STRIPPERS.get(image_format)
+    if strip is None:
+        return file
+
+    cleaned = TemporaryUpload.create(file.name, file.content_type)
+    try:
+        strip(file, cleaned.file, orientation)
+    except BaseException:
+        cleaned.discard()
+        raise
+    finally:
+        file.seek(0)
+    cleaned.size = cleaned.file.tell()
+    cleaned.seek(0)
+
+    return cleaned
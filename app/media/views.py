@@ -0,0 +1,383 @@
+"""
+Views for the media APIs.
+"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import (
+    FileResponse,
+    Http404,
+)
+from django.utils.cache import patch_vary_headers
+
+from drf_spectacular.utils import (
+    extend_schema,
+    OpenApiParameter,
+    OpenApiTypes,
+)
+
+from rest_framework import (
+    mixins,
+    status,
+    viewsets,
+)
+from rest_framework.decorators import action
+from rest_framework.permissions import (
+    AllowAny,
+    IsAuthenticated,
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.models import UploadSession
+from media import serializers
+from media.direct import (
+    confirm_upload,
+    FileSystemBackend,
+    get_backend,
+    start_upload,
+)
+from media.negotiation import (
+    choose_format,
+    open_derivative,
+)
+from media.resize import (
+    open_variant,
+    resolve_source,
+    source_format,
+)
+from media.serving import (
+    accel_response,
+    file_response,
+    is_readable,
+    resolve_media,
+)
+from media.uploads import (
+    complete_session,
+    READ_SIZE,
+    discard_session,
+    get_target,
+    start_session,
+    write_chunk,
+)
+from user.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
+
+
+class PublicImageView(APIView):
+    """
+    Base for views answering with image files to anyone. Errors are still
+    rendered as JSON, whatever the client accepts.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    renderer_classes = [JSONRenderer]
+
+    def perform_content_negotiation(self, request, force=False):
+        return super().perform_content_negotiation(request, force=True)
+
+
+class MediaView(PublicImageView):
+    """
+    Base for views answering with media files, which are only sent to
+    signed in users who may read a row holding them.
+    """
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
+    permission_classes = [IsAuthenticated]
+
+
+class ResizeView(MediaView):
+    """
+    Uploaded images scaled to a width, cacheable for a long time since a
+    variant never changes.
+    """
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'w',
+                OpenApiTypes.INT,
+                required=True,
+                description='Width in pixels.',
+            ),
+            OpenApiParameter(
+                'fmt',
+                OpenApiTypes.STR,
+                enum=list(serializers.RESIZE_FORMATS),
+                description=(
+                    'Output format. By default WebP or AVIF when accepted, '
+                    'otherwise that of the upload.'
+                ),
+            ),
+        ],
+        responses={(200, 'image/*'): OpenApiTypes.BINARY},
+    )
+    def get(self, request, path):
+        """Return the upload at `path` scaled down to the width."""
+        name = resolve_source(path, request.user)
+        if name is None:
+            raise Http404('No such upload.')
+        query = serializers.ResizeQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        output_format = query.validated_data.get('fmt')
+        if output_format is None:
+            output_format = choose_format(
+                request.META.get('HTTP_ACCEPT'), source_format(name))
+        entry, content_type = open_variant(
+            name, query.validated_data['w'], output_format)
+        response = FileResponse(entry, content_type=content_type)
+        response['Cache-Control'] = (
+            f'private, max-age={settings.MEDIA_RESIZE_MAX_AGE}, immutable'
+        )
+        if 'fmt' not in query.validated_data:
+            patch_vary_headers(response, ['Accept'])
+
+        return response
+
+
+class DerivativeView(MediaView):
+    """
+    Image derivatives in WebP or AVIF for clients that accept them, and in
+    their original JPEG or PNG for the others.
+    """
+
+    @extend_schema(responses={(200, 'image/*'): OpenApiTypes.BINARY})
+    def get(self, request, path):
+        """Return the derivative at `path` in the best accepted format."""
+        resolved = resolve_media(path)
+        if resolved is None or not is_readable(*resolved, request.user):
+            raise Http404('No such image.')
+        opened = open_derivative(
+            resolved[0], request.META.get('HTTP_ACCEPT'))
+        if opened is None:
+            raise Http404('No such image.')
+
+        entry, content_type = opened
+        response = FileResponse(entry, content_type=content_type)
+        response['Cache-Control'] = (
+            f'private, max-age={settings.MEDIA_RESIZE_MAX_AGE}, immutable'
+        )
+        patch_vary_headers(response, ['Accept'])
+
+        return response
+
+
+class MediaFileView(MediaView):
+    """
+    Files under MEDIA_ROOT, served after checking a row the user may read
+    holds them, by nginx when MEDIA_ACCEL_REDIRECT is set.
+    """
+
+    @extend_schema(responses={
+        (200, '*/*'): OpenApiTypes.BINARY,
+        (206, '*/*'): OpenApiTypes.BINARY,
+    })
+    def get(self, request, path):
+        """Return a media file, or the requested range of it."""
+        resolved = resolve_media(path)
+        if resolved is None or not is_readable(*resolved, request.user):
+            raise Http404('No such file.')
+        name = resolved[0]
+        if not os.path.isfile(default_storage.path(name)):
+            raise Http404('No such file.')
+
+        if settings.MEDIA_ACCEL_REDIRECT:
+            return accel_response(name)
+
+        return file_response(request, name)
+
+
+class UploadSessionViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Resumable uploads: create a session, PUT its chunks in order, then
+    complete it with the checksum of the whole file.
+    """
+    serializer_class = serializers.UploadSessionSerializer
+    queryset = UploadSession.objects.all()
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Retrieve upload sessions for authenticated user."""
+        return self.queryset.filter(user=self.request.user)
+
+    def get_serializer_class(self):
+        """Return the serializer for the request."""
+        if self.action == 'complete':
+            return serializers.UploadCompleteSerializer
+
+        return self.serializer_class
+
+    def perform_create(self, serializer):
+        """Create a session for an object of the user."""
+        get_target(
+            self.request.user,
+            serializer.validated_data['target'],
+            serializer.validated_data['object_id'],
+        )
+        start_session(serializer.save(user=self.request.user))
+
+    def perform_destroy(self, instance):
+        """Abort an upload."""
+        discard_session(instance)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'index',
+                OpenApiTypes.INT,
+                OpenApiParameter.PATH,
+                description='Chunk number, from 0.',
+            ),
+        ],
+        request={'application/octet-stream': OpenApiTypes.BINARY},
+        responses=serializers.UploadSessionSerializer,
+    )
+    @action(methods=['PUT'], detail=True, url_path=r'chunks/(?P<index>\d+)')
+    def chunk(self, request, pk=None, index=None):
+        """Store chunk `index` of the upload, sent as the raw body."""
+        session = self.get_object()
+        write_chunk(session, int(index), request.stream)
+        serializer = serializers.UploadSessionSerializer(session)
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    @action(methods=['POST'], detail=True, url_path='complete')
+    def complete(self, request, pk=None):
+        """Attach the uploaded file once its checksum is verified."""
+        session = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = complete_session(
+            session,
+            serializer.validated_data['checksum'],
+            self.get_serializer_context(),
+        )
+
+        return Response(upload.data, status=status.HTTP_200_OK)
+
+
+class DirectUploadViewSet(viewsets.GenericViewSet):
+    """
+    Uploads sent straight to storage: request a presigned URL, send the
+    file to it, then confirm the upload with the token returned.
+    """
+    serializer_class = serializers.DirectUploadSerializer
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
+    permission_classes = [IsAuthenticated]
+
+    def get_serializer_class(self):
+        """Return the serializer for the request."""
+        if self.action == 'confirm':
+            return serializers.DirectUploadConfirmSerializer
+
+        return self.serializer_class
+
+    def _absolute(self, url):
+        return self.request.build_absolute_uri(url)
+
+    @extend_schema(responses={201: serializers.DirectUploadStartSerializer})
+    def create(self, request):
+        """Presign the upload of an image for an object of the user."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        started = start_upload(request.user, **serializer.validated_data)
+        started['upload']['url'] = self._absolute(started['upload']['url'])
+
+        return Response(
+            serializers.DirectUploadStartSerializer(started).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    @action(methods=['POST'], detail=False, url_path='confirm')
+    def confirm(self, request):
+        """Attach an image sent to a presigned URL to its object."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        instance, field_name, url = confirm_upload(
+            request.user, serializer.validated_data['token'])
+
+        return Response({
+            'id': instance.pk,
+            field_name: getattr(instance, field_name).name,
+            'url': self._absolute(url),
+        }, status=status.HTTP_200_OK)
+
+
+class SignedFileView(PublicImageView):
+    """
+    Files sent to and read from URLs presigned by FileSystemBackend, the
+    stand-in for object storage. The token is the only authorisation.
+    """
+    backend_class = FileSystemBackend
+
+    def _payload(self, token, method):
+        if not isinstance(get_backend(), self.backend_class):
+            raise Http404()
+        payload = get_backend().unsign(token, method)
+        if payload is None:
+            raise Http404('Invalid or expired URL.')
+
+        return payload
+
+    @extend_schema(responses={(200, 'image/*'): OpenApiTypes.BINARY})
+    def get(self, request, token):
+        """Return a presigned file."""
+        payload = self._payload(token, 'GET')
+        try:
+            return FileResponse(default_storage.open(payload['k']))
+        except FileNotFoundError:
+            raise Http404('No such file.')
+
+    @extend_schema(
+        request={'application/octet-stream': OpenApiTypes.BINARY},
+        responses={201: None},
+    )
+    def put(self, request, token):
+        """Store a file at its presigned name."""
+        payload = self._payload(token, 'PUT')
+        path = default_storage.path(payload['k'])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        written = 0
+        try:
+            with os.fdopen(descriptor, 'wb') as target:
+                while request.stream is not None:
+                    data = request.stream.read(READ_SIZE)
+                    if not data:
+                        break
+                    written += len(data)
+                    if written > payload['n']:
+                        return Response(
+                            {'detail': 'File too large.'},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        )
+                    target.write(data)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        return Response(status=status.HTTP_201_CREATED)
@@ -0,0 +1,73 @@
+"""
+Nearby park search.
+"""
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+from core.geo import (
+    bounding_box,
+    covering_cells,
+    haversine,
+    precision_for_radius,
+)
+from core.models import Park
+
+
+def nearby_filter(latitude, longitude, radius):
+    """
+    Build a filter selecting parks that may lie within `radius` meters.
+
+    The geohash cells around the point become prefix range scans on the
+    indexed geohash column; the bounding box then trims the corners of the
+    cells. Radii larger than any cell fall back to the bounding box alone.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(
+        latitude, longitude, radius)
+    condition = Q(
+        latitude__gte=min_lat,
+        latitude__lte=max_lat,
+        longitude__gte=min_lon,
+        longitude__lte=max_lon,
+    )
+    precision = precision_for_radius(radius, latitude)
+    if precision is not None:
+        cells = covering_cells(latitude, longitude, precision)
+        condition &= reduce(or_, (
+            Q(geohash__startswith=cell) for cell in sorted(cells)
+        ))
+
+    return condition
+
+
+def nearby_parks(latitude, longitude, radius, limit, queryset=None):
+    """
+    Return up to `limit` parks within `radius` meters of a point, nearest
+    first, each with a `distance` attribute in meters.
+
+    Only the coordinates of the candidates are loaded to compute exact
+    distances; full rows are fetched for the parks that are returned.
+    """
+    if queryset is None:
+        queryset = Park.objects.all()
+    candidates = queryset.filter(
+        nearby_filter(latitude, longitude, radius)
+    ).values_list('id', 'latitude', 'longitude')
+
+    distances = {}
+    for park_id, park_lat, park_lon in candidates:
+        distance = haversine(latitude, longitude, park_lat, park_lon)
+        if distance <= radius:
+            distances[park_id] = distance
+    nearest = sorted(distances, key=lambda park_id: (
+        distances[park_id], park_id))[:limit]
+
+    parks = queryset.in_bulk(nearest)
+    results = []
+    for park_id in nearest:
+        park = parks[park_id]
+        park.distance = distances[park_id]
+        results.append(park)
+
+    return results
@@ -2,15 +2,23 @@
 Serializers for park APIs
 """
 
+from django.conf import settings
+
 from rest_framework import serializers
 
+from media.serializers import (
+    ImageVariantsField,
+    SafeImageFieldsMixin,
+)
+
 from core.models import (
     Park,
 )
 
 
-class ParkSerializer(serializers.ModelSerializer):
+class ParkSerializer(SafeImageFieldsMixin, serializers.ModelSerializer):
     """Serializer for parks."""
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Park
@@ -24,7 +32,11 @@ class ParkSerializer(serializers.ModelSerializer):
             'postal_code',
             'country',
             'description',
-            'image'
+            'image',
+            'image_variants',
+            'image_placeholder',
+            'latitude',
+            'longitude',
         ]
         read_only_fields = ['id']
 
@@ -50,11 +62,89 @@ class ParkDetailSerializer(ParkSerializer):
         fields = ParkSerializer.Meta.fields
 
 
-class ParkImageSerializer(serializers.ModelSerializer):
+class ParkNearbySerializer(ParkSerializer):
+    """Serializer for parks found around a point."""
+    distance = serializers.FloatField(
+        read_only=True, help_text='Distance from the point in meters.')
+
+    class Meta(ParkSerializer.Meta):
+        fields = ParkSerializer.Meta.fields + ['distance']
+
+
+class ParkNearbyQuerySerializer(serializers.Serializer):
+    """Serializer for the query parameters of a nearby search."""
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lon = serializers.FloatField(min_value=-180, max_value=180)
+    radius = serializers.FloatField(
+        min_value=1,
+        required=False,
+        help_text='Search radius in meters.',
+    )
+    limit = serializers.IntegerField(min_value=1, required=False)
+
+    def validate_radius(self, value):
+        """Cap the radius to the configured maximum."""
+        return min(value, settings.PARK_NEARBY_MAX_RADIUS)
+
+    def validate_limit(self, value):
+        """Cap the number of results to the configured maximum."""
+        return min(value, settings.PARK_NEARBY_MAX_RESULTS)
+
+
+class ParkMarkerSerializer(serializers.ModelSerializer):
+    """Serializer for parks drawn as single map markers."""
+
+    class Meta:
+        model = Park
+        fields = ['id', 'name', 'latitude', 'longitude']
+        read_only_fields = fields
+
+
+class ParkClusterSerializer(serializers.Serializer):
+    """Serializer for a cluster of parks in one grid cell."""
+    cell = serializers.CharField(help_text='Geohash of the grid cell.')
+    count = serializers.IntegerField()
+    latitude = serializers.FloatField()
+    longitude = serializers.FloatField()
+    park = serializers.IntegerField(help_text='Id of a park in the cluster.')
+
+
+class ParkViewportSerializer(serializers.Serializer):
+    """Serializer for the contents of a map viewport."""
+    zoom = serializers.IntegerField()
+    clusters = ParkClusterSerializer(many=True)
+    parks = ParkMarkerSerializer(many=True)
+
+
+class ParkViewportQuerySerializer(serializers.Serializer):
+    """Serializer for the query parameters of a viewport query."""
+    bbox = serializers.CharField(
+        help_text='min_lon,min_lat,max_lon,max_lat of the viewport.')
+    zoom = serializers.IntegerField(min_value=0, max_value=24)
+
+    def validate_bbox(self, value):
+        """Return the bbox as (min_lat, min_lon, max_lat, max_lon)."""
+        try:
+            min_lon, min_lat, max_lon, max_lat = map(float, value.split(','))
+        except ValueError:
+            raise serializers.ValidationError(
+                'Expected four comma separated numbers.')
+        if not -90 <= min_lat <= max_lat <= 90:
+            raise serializers.ValidationError('Invalid latitude range.')
+        if not (-180 <= min_lon <= 180 and -180 <= max_lon <= 180):
+            raise serializers.ValidationError('Invalid longitude range.')
+
+        return min_lat, min_lon, max_lat, max_lon
+
+
+class ParkImageSerializer(SafeImageFieldsMixin, serializers.ModelSerializer):
     """Serializer for uploading image to parks."""
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Park
-        fields = ['id', 'image']
+        fields = [
+            'id', 'image', 'image_variants', 'image_placeholder',
+        ]
         read_only_fields = ['id']
         extra_kwargs = {'image': {'required': True}}
@@ -0,0 +1,270 @@
+"""
+Tests for the nearby park API.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import geo
+from core.models import Park
+from park.viewport import precision_for_zoom
+
+
+NEARBY_URL = reverse('park:park-nearby')
+VIEWPORT_URL = reverse('park:park-viewport')
+
+# Balboa Park, San Diego
+ORIGIN = (32.7341, -117.1446)
+
+
+def create_park(user, name, latitude, longitude):
+    """Create and return a park at a location."""
+    return Park.objects.create(
+        user=user,
+        name=name,
+        street_number=1,
+        street_name='Park',
+        city='San Diego',
+        state='California',
+        postal_code=92101,
+        country='United States',
+        latitude=latitude,
+        longitude=longitude,
+    )
+
+
+class GeoHelperTests(TestCase):
+    """Tests for the geohash and distance helpers."""
+
+    def test_geohash_encode(self):
+        """Test encoding a point matches the reference geohash."""
+        self.assertEqual(geo.geohash_encode(57.64911, 10.40744, 11),
+                         'u4pruydqqvj')
+
+    def test_haversine(self):
+        """Test the distance between two known points."""
+        distance = geo.haversine(32.7157, -117.1611, 34.0522, -118.2437)
+
+        self.assertAlmostEqual(distance / 1000, 179.4, delta=1)
+
+    def test_box_cells_cover_box(self):
+        """Test every point of a box falls in one of its covering cells."""
+        boxes = [
+            (32.7, -117.2, 32.8, -117.1),
+            (-18.0, 179.0, -17.0, -179.0),
+            (-85.0, -180.0, 85.0, 180.0),
+        ]
+        for min_lat, min_lon, max_lat, max_lon in boxes:
+            cells = geo.box_cells(min_lat, min_lon, max_lat, max_lon, 12, 32)
+            self.assertLessEqual(len(cells), 32)
+            if min_lon > max_lon:
+                max_lon += 360
+            for i in range(11):
+                for j in range(11):
+                    lat = min_lat + (max_lat - min_lat) * i / 10
+                    lon = min_lon + (max_lon - min_lon) * j / 10
+                    lon = (lon + 180) % 360 - 180
+                    geohash = geo.geohash_encode(lat, lon)
+                    self.assertTrue(
+                        any(geohash.startswith(cell) for cell in cells),
+                        (lat, lon),
+                    )
+
+    def test_cell_box(self):
+        """Test the box of a cell holds the points sharing its geohash."""
+        min_lat, min_lon, max_lat, max_lon = geo.cell_box(*ORIGIN, 5)
+        geohash = geo.geohash_encode(*ORIGIN, 5)
+
+        self.assertTrue(min_lat <= ORIGIN[0] < max_lat)
+        self.assertTrue(min_lon <= ORIGIN[1] < max_lon)
+        for lat, lon in ((min_lat, min_lon), (max_lat - 1e-9, max_lon - 1e-9)):
+            self.assertEqual(geo.geohash_encode(lat, lon, 5), geohash)
+
+    def test_covering_cells_contain_circle(self):
+        """Test points within the radius fall in the covering cells."""
+        radius = 5000
+        precision = geo.precision_for_radius(radius, ORIGIN[0])
+        cells = geo.covering_cells(*ORIGIN, precision)
+        offsets = ((0.044, 0), (-0.044, 0), (0, 0.053), (0, -0.053))
+        for d_lat, d_lon in offsets:
+            geohash = geo.geohash_encode(ORIGIN[0] + d_lat, ORIGIN[1] + d_lon)
+            self.assertIn(geohash[:precision], cells)
+
+
+class NearbyParkApiTests(TestCase):
+    """Tests for the nearby park API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password1234',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_geohash_set_on_save(self):
+        """Test saving a park records the geohash of its location."""
+        park = create_park(self.user, 'Balboa', *ORIGIN)
+        self.assertEqual(park.geohash, geo.geohash_encode(*ORIGIN))
+
+        park.latitude = None
+        park.save()
+        self.assertEqual(park.geohash, '')
+
+    def test_nearby_sorted_by_distance(self):
+        """Test nearby parks within the radius are listed nearest first."""
+        far = create_park(self.user, 'Far', ORIGIN[0] + 0.03, ORIGIN[1])
+        near = create_park(self.user, 'Near', ORIGIN[0] + 0.01, ORIGIN[1])
+        create_park(self.user, 'Los Angeles', 34.0522, -118.2437)
+        create_park(self.user, 'Nowhere', None, None)
+
+        res = self.client.get(NEARBY_URL, {
+            'lat': ORIGIN[0],
+            'lon': ORIGIN[1],
+            'radius': 5000,
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in res.data], [near.id, far.id])
+        self.assertAlmostEqual(res.data[0]['distance'], 1112, delta=5)
+
+    def test_nearby_excludes_box_corners(self):
+        """Test parks in the bounding box but outside the radius are left
+        out."""
+        create_park(self.user, 'Corner', ORIGIN[0] + 0.04, ORIGIN[1] + 0.05)
+
+        res = self.client.get(NEARBY_URL, {
+            'lat': ORIGIN[0],
+            'lon': ORIGIN[1],
+            'radius': 5000,
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+
+    def test_nearby_across_cell_boundary(self):
+        """Test parks just across a geohash cell edge are found."""
+        precision = geo.precision_for_radius(1000, ORIGIN[0])
+        height, width = geo.cell_size(precision)
+        edge = (ORIGIN[1] + 180) // width * width - 180
+        park = create_park(self.user, 'West', ORIGIN[0], edge - 0.0001)
+
+        res = self.client.get(NEARBY_URL, {
+            'lat': ORIGIN[0],
+            'lon': edge + 0.0001,
+            'radius': 1000,
+        })
+
+        self.assertEqual([p['id'] for p in res.data], [park.id])
+
+    def test_nearby_limit(self):
+        """Test the number of results can be limited."""
+        for index in range(3):
+            create_park(
+                self.user, f'Park {index}', ORIGIN[0] + index * 0.001,
+                ORIGIN[1])
+
+        res = self.client.get(NEARBY_URL, {
+            'lat': ORIGIN[0],
+            'lon': ORIGIN[1],
+            'limit': 2,
+        })
+
+        self.assertEqual(len(res.data), 2)
+        self.assertEqual(res.data[0]['name'], 'Park 0')
+
+    def test_nearby_invalid_params(self):
+        """Test missing or out of range coordinates are rejected."""
+        res = self.client.get(NEARBY_URL, {'lat': 91, 'lon': 0})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(NEARBY_URL, {'lat': 10})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ViewportParkApiTests(TestCase):
+    """Tests for the viewport park API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password1234',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_precision_for_zoom(self):
+        """Test cluster cells shrink as the map zooms in."""
+        precisions = [precision_for_zoom(zoom) for zoom in range(25)]
+
+        self.assertEqual(precisions, sorted(precisions))
+        self.assertEqual(precisions[0], 1)
+        self.assertLessEqual(precisions[-1], geo.MAX_PRECISION)
+        for zoom, precision in enumerate(precisions[3:], 3):
+            tile_width = 360 / 2 ** zoom
+            self.assertLessEqual(geo.cell_size(precision)[1], tile_width)
+
+    def test_viewport_clusters(self):
+        """Test low zoom levels return one cluster per grid cell."""
+        first = create_park(self.user, 'A', *ORIGIN)
+        create_park(self.user, 'B', ORIGIN[0] + 0.01, ORIGIN[1] + 0.01)
+        create_park(self.user, 'Los Angeles', 34.0522, -118.2437)
+        create_park(self.user, 'Outside', 40.7128, -74.0060)
+        create_park(self.user, 'Nowhere', None, None)
+
+        res = self.client.get(VIEWPORT_URL, {
+            'bbox': '-125,30,-110,36',
+            'zoom': 8,
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['parks'], [])
+        clusters = sorted(res.data['clusters'], key=lambda c: c['count'])
+        self.assertEqual([c['count'] for c in clusters], [1, 2])
+        san_diego = clusters[1]
+        self.assertEqual(san_diego['park'], first.id)
+        self.assertAlmostEqual(san_diego['latitude'], ORIGIN[0] + 0.005)
+        self.assertAlmostEqual(san_diego['longitude'], ORIGIN[1] + 0.005)
+        self.assertEqual(len(san_diego['cell']), precision_for_zoom(8))
+
+    def test_viewport_parks_at_high_zoom(self):
+        """Test high zoom levels return the parks themselves."""
+        park = create_park(self.user, 'A', *ORIGIN)
+        create_park(self.user, 'Los Angeles', 34.0522, -118.2437)
+
+        res = self.client.get(VIEWPORT_URL, {
+            'bbox': '-117.15,32.73,-117.14,32.74',
+            'zoom': 18,
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['clusters'], [])
+        self.assertEqual(res.data['parks'], [{
+            'id': park.id,
+            'name': 'A',
+            'latitude': ORIGIN[0],
+            'longitude': ORIGIN[1],
+        }])
+
+    def test_viewport_across_antimeridian(self):
+        """Test a viewport wrapping past 180 degrees covers both sides."""
+        east = create_park(self.user, 'East', -17.7, 179.9)
+        west = create_park(self.user, 'West', -17.7, -179.9)
+        create_park(self.user, 'Greenwich', -17.7, 0)
+
+        res = self.client.get(VIEWPORT_URL, {
+            'bbox': '179,-18,-179,-17',
+            'zoom': 20,
+        })
+
+        self.assertEqual(
+            [p['id'] for p in res.data['parks']], [east.id, west.id])
+
+    def test_viewport_invalid_bbox(self):
+        """Test malformed bounding boxes are rejected."""
+        for bbox in ('1,2,3', 'a,b,c,d', '0,10,1,5', '0,0,200,1'):
+            res = self.client.get(VIEWPORT_URL, {'bbox': bbox, 'zoom': 3})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
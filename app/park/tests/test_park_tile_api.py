@@ -0,0 +1,295 @@
+"""
+Tests for the park vector tile API.
+"""
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    override_settings,
+    TestCase,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.geo import cell_box
+from core.models import Park
+from park import tiles
+from park.viewport import precision_for_zoom
+
+
+PARKS_URL = reverse('park:park-list')
+
+# Balboa Park, San Diego
+ORIGIN = (32.7341, -117.1446)
+
+
+def tile_url(zoom, x, y):
+    """Create and return a tile URL."""
+    return reverse('park:park-tile', args=[zoom, x, y])
+
+
+def detail_url(park_id):
+    """Create and return a park detail URL."""
+    return reverse('park:park-detail', args=[park_id])
+
+
+def origin_tile(zoom):
+    """Return the (zoom, x, y) of the tile holding the origin."""
+    x, y = tiles._mercator(*ORIGIN, zoom)
+    return zoom, int(x), int(y)
+
+
+def create_park(user, name, latitude, longitude):
+    """Create and return a park at a location."""
+    return Park.objects.create(
+        user=user,
+        name=name,
+        street_number=1,
+        street_name='Park',
+        city='San Diego',
+        state='California',
+        postal_code=92101,
+        country='United States',
+        latitude=latitude,
+        longitude=longitude,
+    )
+
+
+def read_varint(data, offset):
+    """Decode a varint, returning it and the offset after it."""
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, offset
+
+
+def decode_message(data):
+    """Decode a protobuf message into {field number: [raw values]}."""
+    fields = {}
+    offset = 0
+    while offset < len(data):
+        key, offset = read_varint(data, offset)
+        number, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, offset = read_varint(data, offset)
+        elif wire_type == 1:
+            value, offset = data[offset:offset + 8], offset + 8
+        else:
+            length, offset = read_varint(data, offset)
+            value, offset = data[offset:offset + length], offset + length
+        fields.setdefault(number, []).append(value)
+
+    return fields
+
+
+def decode_packed(data):
+    """Decode a packed repeated varint field."""
+    values = []
+    offset = 0
+    while offset < len(data):
+        value, offset = read_varint(data, offset)
+        values.append(value)
+
+    return values
+
+
+class TileEncodingTests(TestCase):
+    """Tests for the vector tile encoder."""
+
+    def test_encode_layer(self):
+        """Test points and their properties are encoded per the spec."""
+        data = tiles.encode_layer('parks', [
+            (7, (10, 4000), {'name': 'A'}),
+            (8, (-3, 20), {'name': 'A', 'count': 2}),
+        ])
+
+        [layer] = decode_message(data)[3]
+        layer = decode_message(layer)
+        self.assertEqual(layer[15], [2])
+        self.assertEqual(layer[1], [b'parks'])
+        self.assertEqual(layer[5], [tiles.EXTENT])
+        self.assertEqual(layer[3], [b'name', b'count'])
+        self.assertEqual(
+            [decode_message(value) for value in layer[4]],
+            [{1: [b'A']}, {5: [2]}],
+        )
+        first, second = [decode_message(f) for f in layer[2]]
+        self.assertEqual(first[1], [7])
+        self.assertEqual(first[3], [1])
+        self.assertEqual(decode_packed(first[2][0]), [0, 0])
+        self.assertEqual(decode_packed(first[4][0]), [9, 20, 8000])
+        self.assertEqual(decode_packed(second[2][0]), [0, 0, 1, 1])
+        self.assertEqual(decode_packed(second[4][0]), [9, 5, 40])
+
+    def test_tiles_for_point_include_buffer(self):
+        """Test points near a tile edge also invalidate the neighbour."""
+        zoom, x, y = origin_tile(10)
+        self.assertIn((x, y), tiles.tiles_for_point(*ORIGIN, zoom))
+
+        west_edge = tiles._unmercator(x, y + 0.5, zoom)
+        self.assertEqual(
+            tiles.tiles_for_point(*west_edge, zoom),
+            {(x - 1, y), (x, y)},
+        )
+
+
+class ParkTileApiTests(TestCase):
+    """Tests for the park vector tile API."""
+
+    def setUp(self):
+        self.tile_root = tempfile.mkdtemp()
+        self.override = override_settings(PARK_TILE_ROOT=self.tile_root)
+        self.override.enable()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password1234',
+        )
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.tile_root)
+
+    def get_layer(self, res):
+        """Return the single layer of a tile response."""
+        [layer] = decode_message(res.content)[3]
+        return decode_message(layer)
+
+    def test_tile_parks(self):
+        """Test high zoom tiles hold the parks inside them."""
+        park = create_park(self.user, 'Balboa', *ORIGIN)
+        create_park(self.user, 'Los Angeles', 34.0522, -118.2437)
+
+        res = self.client.get(tile_url(*origin_tile(16)))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], tiles.MEDIA_TYPE)
+        self.assertIn('private', res['Cache-Control'])
+        layer = self.get_layer(res)
+        self.assertEqual(layer[1], [b'parks'])
+        [feature] = [decode_message(f) for f in layer[2]]
+        self.assertEqual(feature[1], [park.id])
+        self.assertEqual(layer[4], [tiles._message(1, b'Balboa')])
+
+    def test_tile_clusters(self):
+        """Test low zoom tiles hold clusters with park counts."""
+        create_park(self.user, 'A', *ORIGIN)
+        create_park(self.user, 'B', ORIGIN[0] + 0.001, ORIGIN[1])
+
+        res = self.client.get(tile_url(*origin_tile(5)))
+
+        layer = self.get_layer(res)
+        self.assertEqual(layer[1], [b'clusters'])
+        self.assertEqual(layer[3], [b'count'])
+        self.assertEqual(layer[4], [tiles._key(5, tiles.VARINT) + b'\x02'])
+
+    def test_tile_cached(self):
+        """Test rendered tiles are served from the disk cache."""
+        create_park(self.user, 'A', *ORIGIN)
+        tile = origin_tile(16)
+        self.client.get(tile_url(*tile))
+        self.assertTrue(os.path.exists(tiles.tile_path(*tile)))
+
+        with self.assertNumQueries(0):
+            res = self.client.get(tile_url(*tile))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_auth_required(self):
+        """Test tiles are not sent to anonymous clients."""
+        self.client.force_authenticate(None)
+
+        res = self.client.get(tile_url(*origin_tile(16)))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_tile_out_of_range(self):
+        """Test tiles outside the zoom level grid are not found."""
+        res = self.client.get(tile_url(2, 4, 0))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        res = self.client.get(tile_url(40, 0, 0))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_create_park_invalidates_tiles(self):
+        """Test creating a park removes the cached tiles around it."""
+        tile = origin_tile(16)
+        self.client.get(tile_url(*tile))
+        self.client.force_authenticate(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(PARKS_URL, {
+                'name': 'Balboa',
+                'street_number': 1,
+                'street_name': 'Park',
+                'city': 'San Diego',
+                'state': 'California',
+                'postal_code': 92101,
+                'country': 'United States',
+                'description': '',
+                'latitude': ORIGIN[0],
+                'longitude': ORIGIN[1],
+            })
+
+        self.assertFalse(os.path.exists(tiles.tile_path(*tile)))
+
+    def test_move_park_invalidates_old_and_new_tiles(self):
+        """Test moving a park removes the tiles at both locations."""
+        park = create_park(self.user, 'A', *ORIGIN)
+        old_tile = origin_tile(16)
+        new_tile = (16, old_tile[1] + 100, old_tile[2])
+        far_tile = (16, old_tile[1] + 200, old_tile[2])
+        for tile in (old_tile, new_tile, far_tile):
+            self.client.get(tile_url(*tile))
+        new_location = tiles._unmercator(new_tile[1] + 0.5, new_tile[2], 16)
+        self.client.force_authenticate(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(detail_url(park.id), {
+                'latitude': new_location[0] - 0.0001,
+                'longitude': new_location[1],
+            })
+
+        self.assertFalse(os.path.exists(tiles.tile_path(*old_tile)))
+        self.assertFalse(os.path.exists(tiles.tile_path(*new_tile)))
+        self.assertTrue(os.path.exists(tiles.tile_path(*far_tile)))
+
+    def test_delete_park_invalidates_tiles(self):
+        """Test deleting a park removes the cached tiles around it."""
+        park = create_park(self.user, 'A', *ORIGIN)
+        tile = origin_tile(12)
+        self.client.get(tile_url(*tile))
+        self.client.force_authenticate(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(detail_url(park.id))
+
+        self.assertFalse(os.path.exists(tiles.tile_path(*tile)))
+
+    def test_park_invalidates_cluster_cell_tiles(self):
+        """Test a park removes every tile its cluster may be drawn in, past
+        the tiles around the park itself."""
+        zoom = 10
+        cell = cell_box(*ORIGIN, precision_for_zoom(zoom))
+        neighbours = tiles.tiles_for_box(*cell, zoom) - tiles.tiles_for_point(
+            *ORIGIN, zoom)
+        self.assertTrue(neighbours)
+        for x, y in neighbours:
+            self.client.get(tile_url(zoom, x, y))
+            self.assertTrue(os.path.exists(tiles.tile_path(zoom, x, y)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_park(self.user, 'A', *ORIGIN)
+            tiles.invalidate_tiles_on_commit(ORIGIN)
+
+        for x, y in neighbours:
+            self.assertFalse(os.path.exists(tiles.tile_path(zoom, x, y)))
@@ -0,0 +1,313 @@
+"""
+Mapbox Vector Tiles of parks, and their cache on disk.
+"""
+import math
+import os
+import struct
+import tempfile
+import time
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+
+from core.geo import cell_box
+from core.models import Park
+from park.viewport import (
+    precision_for_zoom,
+    viewport_clusters,
+    viewport_parks,
+)
+
+MEDIA_TYPE = 'application/vnd.mapbox-vector-tile'
+
+# Tile coordinates run from 0 to EXTENT; points within BUFFER of an edge
+# are also drawn in the neighbouring tile so their symbols are not cut.
+EXTENT = 4096
+BUFFER = 64
+
+# Web Mercator stops short of the poles.
+MAX_LATITUDE = 85.0511287798
+
+# Protobuf wire types
+VARINT = 0
+FIXED64 = 1
+LENGTH_DELIMITED = 2
+
+POINT = 1
+MOVE_TO = 1
+
+# Touched before tiles are deleted, so renders that raced an invalidation
+# can tell their tile may be stale.
+INVALIDATED_MARKER = '.invalidated'
+
+
+def _varint(value):
+    """Encode an unsigned integer as a protobuf varint."""
+    out = bytearray()
+    while value > 0x7f:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+    return bytes(out)
+
+
+def _zigzag(value):
+    """Map a signed integer onto an unsigned one, keeping small values
+    small."""
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def _key(number, wire_type):
+    """Encode a field key."""
+    return _varint(number << 3 | wire_type)
+
+
+def _message(number, payload):
+    """Encode a length delimited field."""
+    return _key(number, LENGTH_DELIMITED) + _varint(len(payload)) + payload
+
+
+def _packed(number, values):
+    """Encode a packed repeated unsigned integer field."""
+    return _message(number, b''.join(_varint(value) for value in values))
+
+
+def _value(value):
+    """Encode a feature property value."""
+    if isinstance(value, str):
+        return _message(1, value.encode())
+    if isinstance(value, float):
+        return _key(3, FIXED64) + struct.pack('<d', value)
+    if value >= 0:
+        return _key(5, VARINT) + _varint(value)
+
+    return _key(6, VARINT) + _varint(_zigzag(value))
+
+
+def encode_layer(name, features):
+    """
+    Encode a vector tile layer of point features.
+
+    Each feature is an (id, (x, y), properties) tuple with tile coordinates
+    in [0, EXTENT]. Property keys and values are deduplicated into the
+    layer tables as the specification requires.
+    """
+    keys = {}
+    values = {}
+    encoded = []
+    for feature_id, (x, y), properties in features:
+        tags = []
+        for key, value in properties.items():
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value), value), len(values)))
+        encoded.append(_message(2, b''.join([
+            _key(1, VARINT) + _varint(feature_id),
+            _packed(2, tags),
+            _key(3, VARINT) + _varint(POINT),
+            _packed(4, [
+                MOVE_TO | 1 << 3, _zigzag(x), _zigzag(y)
+            ]),
+        ])))
+
+    return _message(3, b''.join([
+        _key(15, VARINT) + _varint(2),
+        _message(1, name.encode()),
+        *encoded,
+        *(_message(3, key.encode()) for key in keys),
+        *(_message(4, _value(value)) for _, value in values),
+        _key(5, VARINT) + _varint(EXTENT),
+    ]))
+
+
+def _mercator(latitude, longitude, zoom):
+    """Return the position of a point in tile units at a zoom level."""
+    latitude = max(-MAX_LATITUDE, min(latitude, MAX_LATITUDE))
+    scale = 2 ** zoom
+    x = (longitude + 180) / 360 * scale
+    y = (1 - math.asinh(math.tan(math.radians(latitude))) / math.pi) / 2
+
+    return x, y * scale
+
+
+def _unmercator(x, y, zoom):
+    """Return the (latitude, longitude) of a position in tile units."""
+    scale = 2 ** zoom
+    longitude = x / scale * 360 - 180
+    latitude = math.degrees(
+        math.atan(math.sinh(math.pi * (1 - 2 * y / scale))))
+
+    return latitude, longitude
+
+
+def tile_bbox(zoom, x, y):
+    """
+    Return the (min_lat, min_lon, max_lat, max_lon) box covered by a tile,
+    including its buffer.
+    """
+    margin = BUFFER / EXTENT
+    max_lat, min_lon = _unmercator(x - margin, y - margin, zoom)
+    min_lat, max_lon = _unmercator(x + 1 + margin, y + 1 + margin, zoom)
+
+    return (
+        min_lat,
+        max(min_lon, -180.0),
+        max_lat,
+        min(max_lon, 180.0),
+    )
+
+
+def tiles_for_box(min_lat, min_lon, max_lat, max_lon, zoom):
+    """Return the (x, y) of the tiles drawing any point of a box at a zoom
+    level."""
+    min_x, min_y = _mercator(max_lat, min_lon, zoom)
+    max_x, max_y = _mercator(min_lat, max_lon, zoom)
+    margin = BUFFER / EXTENT
+    last = 2 ** zoom - 1
+
+    def span(low, high):
+        first = min(max(math.floor(low - margin), 0), last)
+
+        return range(first, min(max(math.floor(high + margin), 0), last) + 1)
+
+    return {(x, y) for x in span(min_x, max_x) for y in span(min_y, max_y)}
+
+
+def tiles_for_point(latitude, longitude, zoom):
+    """Return the (x, y) of the tiles drawing a point at a zoom level."""
+    return tiles_for_box(latitude, longitude, latitude, longitude, zoom)
+
+
+def _tile_position(latitude, longitude, zoom, x, y):
+    """Return the coordinates of a point inside a tile."""
+    position_x, position_y = _mercator(latitude, longitude, zoom)
+
+    return (
+        round((position_x - x) * EXTENT),
+        round((position_y - y) * EXTENT),
+    )
+
+
+def render_tile(zoom, x, y):
+    """
+    Encode the parks in a tile. Below the clustering zoom level the tile
+    holds a `clusters` layer, with the park count and a representative park
+    of each grid cell, and from it up a `parks` layer with every park. Both
+    read the parks of the tile through the geohash index.
+    """
+    bbox = tile_bbox(zoom, x, y)
+    if zoom < settings.PARK_CLUSTER_MAX_ZOOM:
+        features = [
+            (
+                cluster['park'],
+                _tile_position(
+                    cluster['latitude'], cluster['longitude'], zoom, x, y),
+                {'count': cluster['count']},
+            )
+            for cluster in viewport_clusters(bbox, zoom)
+        ]
+        return encode_layer('clusters', features)
+
+    features = [
+        (
+            park.id,
+            _tile_position(park.latitude, park.longitude, zoom, x, y),
+            {'name': park.name},
+        )
+        for park in viewport_parks(
+            bbox,
+            settings.PARK_VIEWPORT_MAX_PARKS,
+            queryset=Park.objects.only('id', 'name', 'latitude', 'longitude'),
+        )
+    ]
+
+    return encode_layer('parks', features)
+
+
+def tile_path(zoom, x, y):
+    """Return the cache file of a tile."""
+    return os.path.join(
+        settings.PARK_TILE_ROOT, str(zoom), str(x), f'{y}.mvt')
+
+
+def _invalidated_at():
+    """Return when tiles were last invalidated, in nanoseconds."""
+    marker = os.path.join(settings.PARK_TILE_ROOT, INVALIDATED_MARKER)
+    try:
+        return os.stat(marker).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def get_tile(zoom, x, y):
+    """
+    Return the encoded tile, from the cache when it was rendered before.
+
+    Tiles are written to a temporary file and renamed into place so nginx
+    never serves a partial tile. A tile rendered while parks were being
+    invalidated is removed again, since it may predate the change.
+    """
+    path = tile_path(zoom, x, y)
+    try:
+        with open(path, 'rb') as tile:
+            return tile.read()
+    except FileNotFoundError:
+        pass
+
+    started = time.time_ns()
+    data = render_tile(zoom, x, y)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as tile:
+        tile.write(data)
+    os.chmod(tile.name, 0o644)
+    os.replace(tile.name, path)
+    if _invalidated_at() >= started:
+        _unlink(path)
+
+    return data
+
+
+def _unlink(path):
+    """Remove a file if it exists."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def invalidate_tiles(points):
+    """
+    Remove the cached tiles drawing any of the (latitude, longitude)
+    points, at every zoom level.
+
+    Below the clustering zoom level a point moves the centroid of its
+    whole cluster, which may be drawn anywhere in the grid cell, so every
+    tile covering that cell goes.
+    """
+    points = [
+        (latitude, longitude) for latitude, longitude in points
+        if latitude is not None and longitude is not None
+    ]
+    if not points:
+        return
+
+    os.makedirs(settings.PARK_TILE_ROOT, exist_ok=True)
+    marker = os.path.join(settings.PARK_TILE_ROOT, INVALIDATED_MARKER)
+    with open(marker, 'a'):
+        os.utime(marker)
+    for zoom in range(settings.PARK_TILE_MAX_ZOOM + 1):
+        for latitude, longitude in points:
+            if zoom < settings.PARK_CLUSTER_MAX_ZOOM:
+                box = cell_box(latitude, longitude, precision_for_zoom(zoom))
+                stale = tiles_for_box(*box, zoom)
+            else:
+                stale = tiles_for_point(latitude, longitude, zoom)
+            for x, y in stale:
+                _unlink(tile_path(zoom, x, y))
+
+
+def invalidate_tiles_on_commit(*points):
+    """Invalidate the tiles of the points once the transaction commits."""
+    transaction.on_commit(partial(invalidate_tiles, points))
@@ -16,5 +16,10 @@ router.register('parks', views.ParkViewSet)
 app_name = 'park'
 
 urlpatterns = [
+    path(
+        'tiles/<int:zoom>/<int:x>/<int:y>.mvt',
+        views.ParkTileView.as_view(),
+        name='park-tile',
+    ),
     path('', include(router.urls))
 ]
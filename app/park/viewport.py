@@ -0,0 +1,97 @@
+"""
+Viewport park queries with server-side clustering.
+"""
+from functools import reduce
+from operator import or_
+
+from django.db.models import (
+    Avg,
+    Count,
+    Min,
+    Q,
+)
+from django.db.models.functions import Substr
+
+from core.geo import (
+    box_cells,
+    MAX_PRECISION,
+)
+from core.models import Park
+
+# Clusters are about 2 ** CLUSTER_BITS times narrower than a map tile.
+CLUSTER_BITS = 2
+
+# Most geohash prefix ranges a viewport query scans.
+MAX_VIEWPORT_CELLS = 32
+
+
+def precision_for_zoom(zoom):
+    """
+    Return the geohash precision used to cluster parks at a zoom level.
+
+    A map tile spans 360 / 2 ** zoom degrees of longitude and a geohash of
+    precision p is 360 / 2 ** ceil(5p / 2) wide, so this picks the longest
+    precision whose cells still cover a quarter of a tile.
+    """
+    lon_bits = zoom + CLUSTER_BITS
+    precision = (2 * lon_bits) // 5
+
+    return max(1, min(precision, MAX_PRECISION))
+
+
+def viewport_filter(min_lat, min_lon, max_lat, max_lon,
+                    precision=MAX_PRECISION):
+    """
+    Build a filter selecting located parks inside a bounding box. Boxes
+    with min_lon greater than max_lon cross the antimeridian.
+
+    The geohash cells covering the box, at most `precision` long, become
+    prefix range scans on the indexed geohash column, and the coordinates
+    then trim the parts of the cells outside the box.
+    """
+    cells = box_cells(
+        min_lat, min_lon, max_lat, max_lon, precision, MAX_VIEWPORT_CELLS)
+    condition = reduce(or_, (
+        Q(geohash__startswith=cell) for cell in sorted(cells)
+    ))
+    condition &= Q(latitude__gte=min_lat, latitude__lte=max_lat)
+    if min_lon <= max_lon:
+        return condition & Q(longitude__gte=min_lon, longitude__lte=max_lon)
+
+    return condition & (Q(longitude__gte=min_lon) | Q(longitude__lte=max_lon))
+
+
+def viewport_clusters(bbox, zoom, queryset=None):
+    """
+    Return the clusters of parks inside a bounding box at a zoom level.
+
+    Parks are read through the geohash index, with prefixes no longer than
+    the cluster cells, and grouped by the prefix of their geohash, so each
+    cluster is one grid cell holding its park count, the centroid of its
+    parks and the lowest park id as a representative.
+    """
+    if queryset is None:
+        queryset = Park.objects.all()
+    precision = precision_for_zoom(zoom)
+
+    return list(
+        queryset.filter(viewport_filter(*bbox, precision=precision))
+        .order_by()
+        .annotate(cell=Substr('geohash', 1, precision))
+        .values('cell')
+        .annotate(
+            count=Count('id'),
+            latitude=Avg('latitude'),
+            longitude=Avg('longitude'),
+            park=Min('id'),
+        )
+        .order_by('cell')
+    )
+
+
+def viewport_parks(bbox, limit, queryset=None):
+    """Return up to `limit` parks inside a bounding box."""
+    if queryset is None:
+        queryset = Park.objects.all()
+
+    return queryset.filter(viewport_filter(*bbox)).order_by('id')[:limit]
@@ -1,27 +1,59 @@
 """ 
 Views for the park APIs.
 """
+from django.conf import settings
+
+from drf_spectacular.utils import (
+    extend_schema,
+    OpenApiParameter,
+    OpenApiTypes,
+)
+
 from rest_framework import (
     viewsets,
-    mixins
+    mixins,
+    status,
 )
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.renderers import BaseRenderer
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 
 from core.models import (
     Park,
 )
+from media.images import process_upload
 
 from park import serializers
+from park import tiles
+from park.nearby import nearby_parks
+from park.viewport import (
+    viewport_clusters,
+    viewport_parks,
+)
+from user.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
+
+from utils.AutoPrefetchMixin import AutoPrefetchMixin
+from utils.ResponseCacheMixin import ResponseCacheMixin
 
 
-class ParkViewSet(viewsets.ModelViewSet):
+class ParkViewSet(
+    ResponseCacheMixin,
+    AutoPrefetchMixin,
+    viewsets.ModelViewSet,
+):
     """View for managing park APIs."""
     serializer_class = serializers.ParkDetailSerializer
     queryset = Park.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
     permission_classes = [IsAuthenticated]
 
     # def get_queryset(self):
@@ -34,12 +66,30 @@ class ParkViewSet(viewsets.ModelViewSet):
             return serializers.ParkSerializer
         elif self.action == 'upload_image':
             return serializers.ParkImageSerializer
+        elif self.action == 'nearby':
+            return serializers.ParkNearbySerializer
+        elif self.action == 'viewport':
+            return serializers.ParkViewportSerializer
 
         return self.serializer_class
 
     def perform_create(self, serializer):
         """Create new park."""
-        serializer.save(user=self.request.user)
+        park = serializer.save(user=self.request.user)
+        tiles.invalidate_tiles_on_commit((park.latitude, park.longitude))
+
+    def perform_update(self, serializer):
+        """Update a park, redrawing the tiles at its old and new place."""
+        old = (serializer.instance.latitude, serializer.instance.longitude)
+        park = serializer.save()
+        tiles.invalidate_tiles_on_commit(
+            old, (park.latitude, park.longitude))
+
+    def perform_destroy(self, instance):
+        """Delete a park."""
+        tiles.invalidate_tiles_on_commit(
+            (instance.latitude, instance.longitude))
+        instance.delete()
 
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
@@ -48,6 +98,134 @@ class ParkViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer_class()(park, data=request.data)
         if serializer.is_valid():
             serializer.save()
+            process_upload(park)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'lat',
+                OpenApiTypes.FLOAT,
+                required=True,
+                description='Latitude of the point.',
+            ),
+            OpenApiParameter(
+                'lon',
+                OpenApiTypes.FLOAT,
+                required=True,
+                description='Longitude of the point.',
+            ),
+            OpenApiParameter(
+                'radius',
+                OpenApiTypes.FLOAT,
+                description='Search radius in meters.',
+            ),
+            OpenApiParameter(
+                'limit',
+                OpenApiTypes.INT,
+                description='Maximum number of parks returned.',
+            ),
+        ],
+    )
+    @action(methods=['GET'], detail=False, url_path='nearby')
+    def nearby(self, request):
+        """List parks around a point, nearest first."""
+        query = serializers.ParkNearbyQuerySerializer(
+            data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        parks = nearby_parks(
+            params['lat'],
+            params['lon'],
+            params.get('radius', settings.PARK_NEARBY_RADIUS),
+            params.get('limit', settings.PARK_NEARBY_MAX_RESULTS),
+            queryset=self.filter_queryset(self.get_queryset()),
+        )
+        serializer = self.get_serializer(parks, many=True)
+
+        return Response(serializer.data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'bbox',
+                OpenApiTypes.STR,
+                required=True,
+                description='min_lon,min_lat,max_lon,max_lat of the viewport.',
+            ),
+            OpenApiParameter(
+                'zoom',
+                OpenApiTypes.INT,
+                required=True,
+                description='Map zoom level.',
+            ),
+        ],
+    )
+    @action(methods=['GET'], detail=False, url_path='viewport')
+    def viewport(self, request):
+        """
+        List the parks inside a map viewport, grouped into grid cell
+        clusters below the clustering zoom level and one by one above it.
+        """
+        query = serializers.ParkViewportQuerySerializer(
+            data=request.query_params)
+        query.is_valid(raise_exception=True)
+        bbox = query.validated_data['bbox']
+        zoom = query.validated_data['zoom']
+        queryset = self.get_queryset()
+
+        clusters = []
+        parks = []
+        if zoom < settings.PARK_CLUSTER_MAX_ZOOM:
+            clusters = viewport_clusters(bbox, zoom, queryset=queryset)
+        else:
+            parks = viewport_parks(
+                bbox, settings.PARK_VIEWPORT_MAX_PARKS, queryset=queryset)
+        serializer = self.get_serializer({
+            'zoom': zoom,
+            'clusters': clusters,
+            'parks': parks,
+        })
+
+        return Response(serializer.data)
+
+
+class MVTRenderer(BaseRenderer):
+    """Renderer passing encoded vector tiles through."""
+    media_type = tiles.MEDIA_TYPE
+    format = 'mvt'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+
+class ParkTileView(APIView):
+    """Parks as Mapbox Vector Tiles, for signed in users like the park
+    API."""
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [MVTRenderer]
+
+    def perform_content_negotiation(self, request, force=False):
+        """Always answer with a tile, whatever the client accepts."""
+        return super().perform_content_negotiation(request, force=True)
+
+    @extend_schema(responses={
+        (200, tiles.MEDIA_TYPE): OpenApiTypes.BINARY,
+    })
+    def get(self, request, zoom, x, y):
+        """Return the vector tile at zoom/x/y."""
+        if zoom > settings.PARK_TILE_MAX_ZOOM or max(x, y) >= 2 ** zoom:
+            raise NotFound('Tile out of range.')
+
+        return Response(tiles.get_tile(zoom, x, y), headers={
+            'Cache-Control': f'private, max-age={settings.PARK_TILE_MAX_AGE}',
+        })
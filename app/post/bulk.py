@@ -0,0 +1,131 @@
+"""
+Bulk creation of posts.
+"""
+from django.db import (
+    connection,
+    transaction,
+)
+from django.db.models import prefetch_related_objects
+
+from rest_framework import status
+
+from core.models import (
+    Park,
+    Post,
+    Tag,
+)
+from feed.fanout import fan_out_posts
+from post.serializers import (
+    PostBulkItemSerializer,
+    PostSerializer,
+)
+from search.backends import get_backend
+
+from utils.bulk_get_or_create import bulk_get_or_create
+from utils.ResponseCacheMixin import invalidate
+
+
+def _insert_posts(posts):
+    """Insert the posts, setting their primary keys."""
+    if connection.features.can_return_rows_from_bulk_insert:
+        Post.objects.bulk_create(posts)
+        fan_out_posts(posts)
+        # Bulk inserts send no signals, so index the posts the way
+        # search.signals would.
+        backend = get_backend()
+        for post in posts:
+            backend.update('posts', post)
+    else:
+        # Without RETURNING the new ids are unknown, so save one at a time
+        # and let the post_save signals fan them out and index them.
+        for post in posts:
+            post.save()
+
+
+def bulk_create_posts(items, context):
+    """
+    Validate and create a list of posts for the authenticated user.
+
+    Valid items are inserted together, their tags resolved with one batched
+    upsert and their tag links written with one insert. Returns one result
+    per item, in order, holding either the created post or its errors.
+    """
+    user = context['request'].user
+    results = [None] * len(items)
+    item_serializers = [
+        PostBulkItemSerializer(data=item, context=context) for item in items
+    ]
+
+    park_ids = {
+        serializer.validated_data.get('park')
+        for serializer in item_serializers
+        if serializer.is_valid()
+    }
+    known_park_ids = set(Park.objects.filter(
+        id__in=park_ids - {None}
+    ).values_list('id', flat=True))
+
+    valid = []
+    for index, serializer in enumerate(item_serializers):
+        if not serializer.is_valid():
+            results[index] = {
+                'status': status.HTTP_400_BAD_REQUEST,
+                'errors': serializer.errors,
+            }
+            continue
+        park_id = serializer.validated_data.get('park')
+        if park_id is not None and park_id not in known_park_ids:
+            results[index] = {
+                'status': status.HTTP_400_BAD_REQUEST,
+                'errors': {'park': [
+                    f'Invalid pk "{park_id}" - object does not exist.'
+                ]},
+            }
+            continue
+        valid.append((index, serializer.validated_data))
+
+    if not valid:
+        return results
+
+    with transaction.atomic():
+        posts = [
+            Post(
+                user=user,
+                title=data['title'],
+                description=data.get('description', ''),
+                park_id=data.get('park'),
+            )
+            for index, data in valid
+        ]
+        _insert_posts(posts)
+
+        names = [
+            tag['name']
+            for index, data in valid
+            for tag in data.get('tags', [])
+        ]
+        tags = {
+            tag.name: tag for tag in bulk_get_or_create(Tag, user, names)
+        }
+        Post.tags.through.objects.bulk_create(
+            [
+                Post.tags.through(
+                    post_id=post.id, tag_id=tags[tag['name']].id)
+                for post, (index, data) in zip(posts, valid)
+                for tag in data.get('tags', [])
+            ],
+            ignore_conflicts=True,
+        )
+        # Bulk inserts send no signals.
+        invalidate(Post, [post.pk for post in posts])
+        invalidate(Tag)
+
+    prefetch_related_objects(posts, 'tags')
+    data = PostSerializer(posts, many=True, context=context).data
+    for (index, validated_data), post_data in zip(valid, data):
+        results[index] = {
+            'status': status.HTTP_201_CREATED,
+            'post': post_data,
+        }
+
+    return results
@@ -4,11 +4,18 @@ Serializers for post APIs
 
 from rest_framework import serializers
 
+from media.serializers import (
+    ImageVariantsField,
+    SafeImageFieldsMixin,
+)
+
 from core.models import (
     Post,
     Tag,
 )
 
+from utils.bulk_get_or_create import bulk_get_or_create
+
 
 class TagSerializer(serializers.ModelSerializer):
     """Serializer for tags."""
@@ -19,10 +26,11 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(SafeImageFieldsMixin, serializers.ModelSerializer):
     """Serializer for posts."""
 
     tags = TagSerializer(many=True, required=False)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Post
@@ -34,6 +42,8 @@ class PostSerializer(serializers.ModelSerializer):
             'description',
             'park',
             'image',
+            'image_variants',
+            'image_placeholder',
             'tags'
         ]
         read_only_fields = ['id', 'user', 'account']
@@ -41,18 +51,14 @@ class PostSerializer(serializers.ModelSerializer):
     def _get_or_create_tags(self, tags, post):
         """Handle getting or creating tags as needed."""
         auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-            )
-            post.tags.add(tag_obj)
+        tag_objs = bulk_get_or_create(
+            Tag, auth_user, [tag['name'] for tag in tags])
+        post.tags.add(*tag_objs)
 
     def create(self, validated_data):
         """Create a post."""
         tags = validated_data.pop('tags', [])
         post = Post.objects.create(**validated_data)
-        account = self.account.id
         self._get_or_create_tags(tags, post)
 
         return post
@@ -71,6 +77,15 @@ class PostSerializer(serializers.ModelSerializer):
         return instance
 
 
+class PostBulkItemSerializer(PostSerializer):
+    """Serializer for one post in a bulk upload."""
+
+    park = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta(PostSerializer.Meta):
+        fields = ['title', 'description', 'park', 'tags']
+
+
 class PostDetailSerializer(PostSerializer):
     """Serializer for post detail view."""
 
@@ -79,10 +94,13 @@ class PostDetailSerializer(PostSerializer):
             ['account', 'description', 'image']
 
 
-class PostImageSerializer(serializers.ModelSerializer):
+class PostImageSerializer(SafeImageFieldsMixin, serializers.ModelSerializer):
     """Serializer for uploading image to posts."""
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Post
-        fields = ['id', 'image']
+        fields = [
+            'id', 'image', 'image_variants', 'image_placeholder',
+        ]
         read_only_fields = ['id']
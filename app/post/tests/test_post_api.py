@@ -9,7 +9,12 @@ import os
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import (
+    TestCase,
+    skipUnlessDBFeature,
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
@@ -18,11 +23,14 @@ from rest_framework.test import APIClient
 from core.models import (
     Post,
     Park,
+    Tag,
 )
 
 from post.serializers import PostSerializer
 
 POSTS_URL = reverse('post:post-list')
+BULK_URL = reverse('post:post-bulk')
+SEARCH_URL = reverse('search:search')
 
 
 def image_upload_url(post_id):
@@ -94,7 +102,7 @@ class PrivatePostAPITests(TestCase):
         all_posts = Post.objects.all().order_by('-id')
         serializer = PostSerializer(all_posts, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_post_list_limited_to_user(self):
         """Test list of posts is limited to authenticated user."""
@@ -110,7 +118,7 @@ class PrivatePostAPITests(TestCase):
         all_posts = Post.objects.filter(user=self.user)
         serializer = PostSerializer(all_posts, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
 
 class ImageUploadTests(TestCase):
@@ -149,3 +157,92 @@ class ImageUploadTests(TestCase):
         payload = {'image': 'notanimage'}
         res = self.client.post(url, payload, format='multipart')
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BulkPostAPITests(TestCase):
+    """Tests for the bulk post API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.park = Park.objects.create(user=self.user, name='Sample park')
+
+    def test_bulk_create_posts(self):
+        """Test creating several posts with tags in one request."""
+        payload = [
+            {
+                'title': f'Post {i}',
+                'park': self.park.id,
+                'tags': [{'name': 'Kickflip'}, {'name': f'Trick {i}'}],
+            }
+            for i in range(3)
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 3)
+        for item, result in zip(payload, res.data):
+            self.assertEqual(result['status'], status.HTTP_201_CREATED)
+            post = Post.objects.get(id=result['post']['id'])
+            self.assertEqual(post.title, item['title'])
+            self.assertEqual(post.user, self.user)
+            self.assertEqual(post.park, self.park)
+            self.assertEqual(
+                sorted(post.tags.values_list('name', flat=True)),
+                sorted(tag['name'] for tag in item['tags']),
+            )
+        self.assertEqual(Tag.objects.filter(name='Kickflip').count(), 1)
+
+    def test_bulk_create_reports_invalid_items(self):
+        """Test invalid items are reported without blocking valid ones."""
+        payload = [
+            {'title': 'Good post'},
+            {'description': 'Missing title'},
+            {'title': 'Unknown park', 'park': self.park.id + 100},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        statuses = [result['status'] for result in res.data]
+        self.assertEqual(statuses, [201, 400, 400])
+        self.assertIn('title', res.data[1]['errors'])
+        self.assertIn('park', res.data[2]['errors'])
+        self.assertEqual(Post.objects.count(), 1)
+
+    @skipUnlessDBFeature('can_return_rows_from_bulk_insert')
+    def test_bulk_create_query_count_is_constant(self):
+        """Test the number of queries does not grow with the batch."""
+
+        def count_queries(size, offset):
+            payload = [
+                {'title': 'Post', 'tags': [{'name': f'Tag {offset + i}'}]}
+                for i in range(size)
+            ]
+            with CaptureQueriesContext(connection) as context:
+                self.client.post(BULK_URL, payload, format='json')
+            return len(context.captured_queries)
+
+        self.assertEqual(count_queries(2, 0), count_queries(20, 2))
+
+    def test_bulk_created_posts_searchable(self):
+        """Test bulk created posts are found by search."""
+        self.client.get(SEARCH_URL, {'q': 'grind'})
+        payload = [{'title': 'Frontside grind'}, {'title': 'Kickflip'}]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+        post_id = res.data[0]['post']['id']
+        res = self.client.get(SEARCH_URL, {'q': 'grind', 'type': 'posts'})
+
+        self.assertEqual([p['id'] for p in res.data['posts']], [post_id])
+
+    def test_bulk_create_rejects_non_list(self):
+        """Test the payload must be a list of posts."""
+        res = self.client.post(BULK_URL, {'title': 'Post'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
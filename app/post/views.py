@@ -1,11 +1,12 @@
 """
 Views for the post APIs.
 """
+from django.conf import settings
+
 from rest_framework import (
     viewsets,
     status,
 )
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
@@ -14,14 +15,25 @@ from django_filters.rest_framework import DjangoFilterBackend
 
 
 from core.models import Post
+from media.images import process_upload
 from post import serializers
+from post.bulk import bulk_create_posts
+from user.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
+
+from utils.AutoPrefetchMixin import AutoPrefetchMixin
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(AutoPrefetchMixin, viewsets.ModelViewSet):
     """View for managing post APIs."""
     serializer_class = serializers.PostDetailSerializer
     queryset = Post.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['account']
@@ -36,6 +48,8 @@ class PostViewSet(viewsets.ModelViewSet):
             return serializers.PostSerializer
         elif self.action == 'upload_image':
             return serializers.PostImageSerializer
+        elif self.action == 'bulk':
+            return serializers.PostBulkItemSerializer
 
         return self.serializer_class
 
@@ -43,6 +57,32 @@ class PostViewSet(viewsets.ModelViewSet):
         """Create new post."""
         serializer.save(user=self.request.user)
 
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Create a batch of posts and return a result for each one."""
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'detail': 'Expected a non-empty list of posts.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > settings.POST_BULK_MAX_ITEMS:
+            return Response(
+                {'detail': (
+                    f'At most {settings.POST_BULK_MAX_ITEMS} posts can be '
+                    'created per request.'
+                )},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        results = bulk_create_posts(items, self.get_serializer_context())
+        if all(
+            result['status'] == status.HTTP_201_CREATED for result in results
+        ):
+            return Response(results, status=status.HTTP_201_CREATED)
+
+        return Response(results, status=status.HTTP_207_MULTI_STATUS)
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """Upload image to post"""
@@ -50,6 +90,7 @@ class PostViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer_class()(post, data=request.data)
         if serializer.is_valid():
             serializer.save()
+            process_upload(post)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
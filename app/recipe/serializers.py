@@ -4,12 +4,19 @@ Serializers for recipe APIs
 
 from rest_framework import serializers
 
+from media.serializers import (
+    ImageVariantsField,
+    SafeImageFieldsMixin,
+)
+
 from core.models import (
     Recipe,
     Tag,
     Ingredient
 )
 
+from utils.bulk_get_or_create import bulk_get_or_create
+
 
 class IngredientSerializer(serializers.ModelSerializer):
     """Serializer for ingredients."""
@@ -28,10 +35,11 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(SafeImageFieldsMixin, serializers.ModelSerializer):
     """Serializer for recipes."""
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -41,6 +49,8 @@ class RecipeSerializer(serializers.ModelSerializer):
             'time_minutes',
             'price',
             'link',
+            'image_variants',
+            'image_placeholder',
             'tags',
             'ingredients']
         read_only_fields = ['id']
@@ -48,22 +58,19 @@ class RecipeSerializer(serializers.ModelSerializer):
     def _get_or_create_tags(self, tags, recipe):
         """Handle getting or creating tags as needed."""
         auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-            )
-            recipe.tags.add(tag_obj)
+        tag_objs = bulk_get_or_create(
+            Tag, auth_user, [tag['name'] for tag in tags])
+        recipe.tags.add(*tag_objs)
 
     def _get_or_create_ingredients(self, ingredients, recipe):
         """Handle getting or creating ingredients as needed."""
         auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, create = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient,
-            )
-            recipe.ingredients.add(ingredient_obj)
+        ingredient_objs = bulk_get_or_create(
+            Ingredient,
+            auth_user,
+            [ingredient['name'] for ingredient in ingredients],
+        )
+        recipe.ingredients.add(*ingredient_objs)
 
     def create(self, validated_data):
         """Create a recipe."""
@@ -100,10 +107,13 @@ class RecipeDetailSerializer(RecipeSerializer):
         fields = RecipeSerializer.Meta.fields + ['description', 'image']
 
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeImageSerializer(SafeImageFieldsMixin, serializers.ModelSerializer):
     """Serializer for uploading image to recipes."""
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ['id', 'image']
+        fields = [
+            'id', 'image', 'image_variants', 'image_placeholder',
+        ]
         read_only_fields = ['id']
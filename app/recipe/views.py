@@ -14,7 +14,6 @@ from rest_framework import (
 )
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
 from core.models import (
@@ -22,7 +21,15 @@ from core.models import (
     Tag,
     Ingredient
 )
+from media.images import process_upload
 from recipe import serializers
+from user.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
+
+from utils.AutoPrefetchMixin import AutoPrefetchMixin
+from utils.ResponseCacheMixin import ResponseCacheMixin
 
 
 @extend_schema_view(
@@ -41,11 +48,18 @@ from recipe import serializers
         ],
     )
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    ResponseCacheMixin,
+    AutoPrefetchMixin,
+    viewsets.ModelViewSet,
+):
     """View for managing recipe APIs."""
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
     permission_classes = [IsAuthenticated]
 
     def _params_to_ints(self, qs):
@@ -89,6 +103,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         if serializer.is_valid():
             serializer.save()
+            process_upload(recipe)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -112,8 +127,12 @@ class BaseRecipeAttrViewSet(
     viewsets.GenericViewSet
 ):
     """Base viewset for recipe attributes"""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
     permission_classes = [IsAuthenticated]
+    ordering = ['-name', '-id']
 
     def get_queryset(self):
         """Filter queryset to authenticated user."""
@@ -0,0 +1,202 @@
+"""
+Full-text search backends.
+"""
+import math
+import re
+import threading
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+)
+from django.db import connection
+from django.db.models import F
+
+from core.models import (
+    Account,
+    Park,
+    Post,
+)
+
+
+# Searchable fields of each entity type, with their PostgreSQL weights.
+# Keep in sync with the triggers in core/migrations/0007_search_vector.py.
+SEARCH_FIELDS = {
+    'posts': (Post, {'title': 'A', 'description': 'B'}),
+    'parks': (Park, {'name': 'A', 'city': 'B', 'description': 'C'}),
+    'accounts': (Account, {'name': 'A', 'bio': 'B'}),
+}
+
+# PostgreSQL's default ts_rank weights.
+WEIGHTS = {'A': 1.0, 'B': 0.4, 'C': 0.2, 'D': 0.1}
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens."""
+    return TOKEN_RE.findall((text or '').lower())
+
+
+class PostgresSearchBackend:
+    """Search ranked against the GIN-indexed search_vector columns."""
+
+    def search(self, entity, query, limit):
+        """Return a queryset of the best matches for query."""
+        model, fields = SEARCH_FIELDS[entity]
+        search_query = SearchQuery(
+            query, config='english', search_type='websearch')
+
+        return model.objects.filter(
+            search_vector=search_query
+        ).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-rank', '-id')[:limit]
+
+    def update(self, entity, instance):
+        """Search vectors are maintained by database triggers."""
+
+    def remove(self, entity, pk):
+        """Search vectors are removed with their rows."""
+
+
+class InvertedIndex:
+    """In-process inverted index over the searchable fields of a model."""
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = fields
+        self.postings = {}
+        self.documents = {}
+        self.lock = threading.Lock()
+        self.built = False
+
+    def _terms(self, values):
+        """Return {token: weighted term frequency} for a row's values."""
+        terms = {}
+        for field, weight in self.fields.items():
+            for token in tokenize(values.get(field)):
+                terms[token] = terms.get(token, 0.0) + WEIGHTS[weight]
+
+        return terms
+
+    def _add(self, pk, values):
+        self._remove(pk)
+        terms = self._terms(values)
+        self.documents[pk] = terms
+        for token, score in terms.items():
+            self.postings.setdefault(token, {})[pk] = score
+
+    def _remove(self, pk):
+        for token in self.documents.pop(pk, {}):
+            postings = self.postings[token]
+            postings.pop(pk, None)
+            if not postings:
+                del self.postings[token]
+
+    def build(self):
+        """Load every row of the model into the index."""
+        rows = self.model.objects.values('pk', *self.fields).iterator()
+        with self.lock:
+            self.postings = {}
+            self.documents = {}
+            for row in rows:
+                self._add(row['pk'], row)
+            self.built = True
+
+    def update(self, instance):
+        with self.lock:
+            if self.built:
+                values = {
+                    field: getattr(instance, field) for field in self.fields
+                }
+                self._add(instance.pk, values)
+
+    def remove(self, pk):
+        with self.lock:
+            if self.built:
+                self._remove(pk)
+
+    def matches(self, instance, tokens):
+        """Return True if the instance holds every token."""
+        values = {field: getattr(instance, field) for field in self.fields}
+
+        return set(tokens) <= set(self._terms(values))
+
+    def search(self, tokens):
+        """Return [(pk, score)] of rows holding every token, best first."""
+        if not self.built:
+            self.build()
+
+        with self.lock:
+            postings = [self.postings.get(token, {}) for token in tokens]
+            if not postings or not all(postings):
+                return []
+            total = len(self.documents)
+            scores = {}
+            for pk in set.intersection(*(set(p) for p in postings)):
+                scores[pk] = sum(
+                    posting[pk] * math.log(1 + total / len(posting))
+                    for posting in postings
+                )
+
+        return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+
+
+class InvertedIndexSearchBackend:
+    """
+    Search against per-process inverted indexes.
+
+    Used where PostgreSQL full-text search is unavailable, such as the
+    SQLite test database. Indexes are built on first use and kept up to date
+    from model signals in this process.
+    """
+
+    def __init__(self):
+        self.indexes = {
+            entity: InvertedIndex(model, fields)
+            for entity, (model, fields) in SEARCH_FIELDS.items()
+        }
+
+    def search(self, entity, query, limit):
+        """Return a list of the best matches for query."""
+        model, fields = SEARCH_FIELDS[entity]
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        index = self.indexes[entity]
+        ranked = index.search(tokens)[:limit]
+        objs = model.objects.in_bulk([pk for pk, score in ranked])
+        results = []
+        for pk, score in ranked:
+            obj = objs.get(pk)
+            # Rows changed outside this process may have left stale
+            # postings behind, so confirm each match against the row.
+            if obj is None or not index.matches(obj, tokens):
+                continue
+            obj.rank = score
+            results.append(obj)
+
+        return results
+
+    def update(self, entity, instance):
+        self.indexes[entity].update(instance)
+
+    def remove(self, entity, pk):
+        self.indexes[entity].remove(pk)
+
+
+_backends = {}
+
+
+def get_backend():
+    """Return the search backend for the default database."""
+    vendor = connection.vendor
+    if vendor not in _backends:
+        if vendor == 'postgresql':
+            _backends[vendor] = PostgresSearchBackend()
+        else:
+            _backends[vendor] = InvertedIndexSearchBackend()
+
+    return _backends[vendor]
@@ -0,0 +1,35 @@
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+)
+
+from django.dispatch import receiver
+
+from core.models import (
+    Account,
+    Park,
+    Post,
+)
+
+from search.backends import (
+    SEARCH_FIELDS,
+    get_backend,
+)
+
+ENTITIES = {model: entity for entity, (model, fields) in SEARCH_FIELDS.items()}
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Park)
+@receiver(post_save, sender=Account)
+def index_saved_instance(sender, instance, **kwargs):
+
+    get_backend().update(ENTITIES[sender], instance)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Park)
+@receiver(post_delete, sender=Account)
+def unindex_deleted_instance(sender, instance, **kwargs):
+
+    get_backend().remove(ENTITIES[sender], instance.pk)
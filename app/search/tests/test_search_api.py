@@ -0,0 +1,112 @@
+"""
+Tests for search API.
+"""
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from utils.create_test_user import create_user
+
+from core.models import (
+    Account,
+    Park,
+    Post,
+)
+
+SEARCH_URL = reverse('search:search')
+
+
+class PublicSearchAPITests(TestCase):
+    """Test unauthenticated API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test auth is required to call API."""
+        res = self.client.get(SEARCH_URL, {'q': 'bowl'})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateSearchAPITests(TestCase):
+    """Test authenticated API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def test_query_required(self):
+        """Test a blank query returns an error."""
+        res = self.client.get(SEARCH_URL, {'q': ' '})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_each_type(self):
+        """Test matches are returned per entity type."""
+        post = Post.objects.create(
+            user=self.user,
+            title='Frontside grind',
+            description='Long grind on the ledge',
+        )
+        Post.objects.create(user=self.user, title='Kickflip')
+        park = Park.objects.create(
+            user=self.user,
+            name='Pershing Park',
+            city='San Diego',
+            description='Ledge heaven',
+        )
+        account = Account.objects.get(user=self.user)
+        account.name = 'Ledge Lover'
+        account.save()
+
+        res = self.client.get(SEARCH_URL, {'q': 'ledge'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in res.data['posts']], [post.id])
+        self.assertEqual([p['id'] for p in res.data['parks']], [park.id])
+        self.assertEqual(
+            [a['id'] for a in res.data['accounts']], [account.id])
+
+    def test_search_ranks_weighted_fields_first(self):
+        """Test title matches rank above description matches."""
+        in_description = Post.objects.create(
+            user=self.user,
+            title='Session',
+            description='Big bowl session',
+        )
+        in_title = Post.objects.create(user=self.user, title='Bowl day')
+
+        res = self.client.get(SEARCH_URL, {'q': 'bowl', 'type': 'posts'})
+
+        self.assertEqual(
+            [p['id'] for p in res.data['posts']],
+            [in_title.id, in_description.id],
+        )
+        self.assertNotIn('parks', res.data)
+
+    def test_search_reflects_updates_and_deletes(self):
+        """Test edited and deleted rows leave the results."""
+        post = Post.objects.create(user=self.user, title='Rail slide')
+        self.client.get(SEARCH_URL, {'q': 'rail'})
+
+        post.title = 'Stair set'
+        post.save()
+        res = self.client.get(SEARCH_URL, {'q': 'rail'})
+        self.assertEqual(res.data['posts'], [])
+
+        res = self.client.get(SEARCH_URL, {'q': 'stair'})
+        self.assertEqual([p['id'] for p in res.data['posts']], [post.id])
+
+        post.delete()
+        res = self.client.get(SEARCH_URL, {'q': 'stair'})
+        self.assertEqual(res.data['posts'], [])
+
+    def test_unknown_type(self):
+        """Test an unknown entity type returns an error."""
+        res = self.client.get(SEARCH_URL, {'q': 'bowl', 'type': 'videos'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,118 @@
+"""
+Views for the search APIs.
+"""
+from django.conf import settings
+from django.db.models import prefetch_related_objects
+
+from drf_spectacular.utils import (
+    extend_schema,
+    OpenApiParameter,
+    OpenApiTypes,
+)
+
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from account.serializers import AccountSerializer
+from park.serializers import ParkSerializer
+from post.serializers import PostSerializer
+from search.backends import (
+    SEARCH_FIELDS,
+    get_backend,
+)
+from user.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
+
+from utils.AutoPrefetchMixin import get_related_lookups
+
+
+class SearchView(APIView):
+    """Full-text search over posts, parks and accounts."""
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
+    permission_classes = [IsAuthenticated]
+    serializer_classes = {
+        'posts': PostSerializer,
+        'parks': ParkSerializer,
+        'accounts': AccountSerializer,
+    }
+
+    def _get_limit(self):
+        """Return the requested number of results per type, capped."""
+        limit = settings.SEARCH_RESULTS_PER_TYPE
+        try:
+            limit = int(self.request.query_params['limit'])
+        except (KeyError, ValueError):
+            pass
+
+        return max(1, min(limit, settings.SEARCH_MAX_RESULTS_PER_TYPE))
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR,
+                required=True,
+                description='Search terms.',
+            ),
+            OpenApiParameter(
+                'type',
+                OpenApiTypes.STR,
+                description=(
+                    'Comma separated list of types to search: '
+                    'posts, parks, accounts.'
+                ),
+            ),
+            OpenApiParameter(
+                'limit',
+                OpenApiTypes.INT,
+                description='Maximum number of results per type.',
+            ),
+        ],
+        responses=OpenApiTypes.OBJECT,
+    )
+    def get(self, request):
+        """Return ranked matches for each entity type."""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'q': ['This query parameter is required.']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        entities = list(SEARCH_FIELDS)
+        types = request.query_params.get('type')
+        if types:
+            entities = types.split(',')
+            unknown = set(entities) - set(SEARCH_FIELDS)
+            if unknown:
+                return Response(
+                    {'type': [f'Unknown type: {", ".join(sorted(unknown))}.']},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        backend = get_backend()
+        limit = self._get_limit()
+        data = {}
+        for entity in entities:
+            serializer_class = self.serializer_classes[entity]
+            results = list(backend.search(entity, query, limit))
+            select, prefetch = get_related_lookups(serializer_class)
+            prefetch_related_objects(results, *select, *prefetch)
+            serializer = serializer_class(
+                results,
+                many=True,
+                context={'request': request},
+            )
+            data[entity] = [
+                dict(item, rank=obj.rank)
+                for item, obj in zip(serializer.data, results)
+            ]
+
+        return Response(data)
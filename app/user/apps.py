@@ -7,4 +7,5 @@ class UserConfig(AppConfig):
 
     def ready(self):
 
+        import user.schema  # noqa: F401
         import user.signals
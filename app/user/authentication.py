@@ -0,0 +1,202 @@
+"""
+Token authentication with cached lookups, and signed access tokens.
+
+TokenAuthentication reads the token and its user from the database on
+every request. CachedTokenAuthentication keeps them in a bounded LRU cache
+of the process for AUTH_TOKEN_CACHE_TTL seconds, backed by the shared
+AUTH_TOKEN_SHARED_CACHE when one is configured, so authenticating a
+returning client takes no query.
+
+The signals in user.signals evict a token when it is deleted and when its
+user is saved, which covers deactivation and edits through the API or the
+admin. Queryset updates send no signals and are only picked up once the
+entries expire.
+
+SignedTokenAuthentication checks the signed access tokens of user.tokens,
+then the token version and active flag of their user. Those are cached the
+same way, in the LRU cache of the process and in AUTH_TOKEN_SHARED_CACHE
+when one is configured, so checking a token takes no query, and evicted
+when the user is saved, deleted or has their tokens revoked. Other
+processes keep them for at most AUTH_TOKEN_CACHE_TTL seconds.
+"""
+import copy
+import hashlib
+import itertools
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    transaction,
+)
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from user.tokens import (
+    InvalidToken,
+    read_access_token,
+)
+from utils.LRUCache import LRUCache
+
+_local_caches = {}
+_lock = threading.Lock()
+# Bumped by every eviction, so a lookup racing one is not cached.
+_evictions = itertools.count()
+_generation = 0
+
+
+def get_local_cache():
+    """Return the token cache of this process."""
+    key = (settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TTL)
+    with _lock:
+        if key not in _local_caches:
+            _local_caches[key] = LRUCache(*key)
+
+    return _local_caches[key]
+
+
+def get_shared_cache():
+    """Return the token cache shared between processes, if any."""
+    alias = settings.AUTH_TOKEN_SHARED_CACHE
+
+    return caches[alias] if alias else None
+
+
+def shared_key(key):
+    """Return the shared cache key of a token, which keeps it secret."""
+    return 'auth-token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def evict_token(key):
+    """Evict a token from the local and shared caches."""
+    global _generation
+    _generation = next(_evictions)
+    get_local_cache().delete(key)
+    shared = get_shared_cache()
+    if shared is not None:
+        shared.delete(shared_key(key))
+
+
+def invalidate_token(key):
+    """Evict a token, now and once the transaction commits, so lookups
+    racing the transaction cannot keep the old entry."""
+    evict_token(key)
+    transaction.on_commit(partial(evict_token, key))
+
+
+def invalidate_user(user):
+    """Evict the tokens of a user."""
+    keys = Token.objects.filter(user=user).values_list('key', flat=True)
+    for key in keys:
+        invalidate_token(key)
+
+
+def state_key(user_id):
+    """Return the shared cache key of the token state of a user."""
+    return f'auth-token-state:{user_id}'
+
+
+def evict_token_state(user_id):
+    """Evict the token state of a user from the local and shared caches."""
+    global _generation
+    _generation = next(_evictions)
+    get_local_cache().delete(state_key(user_id))
+    shared = get_shared_cache()
+    if shared is not None:
+        shared.delete(state_key(user_id))
+
+
+def invalidate_token_state(user_id):
+    """Evict the token state of a user, now and once the transaction
+    commits."""
+    evict_token_state(user_id)
+    transaction.on_commit(partial(evict_token_state, user_id))
+
+
+def get_token_state(user_id):
+    """Return the token version and active flag of a user, or None when
+    the user was deleted."""
+    key = state_key(user_id)
+    local = get_local_cache()
+    state = local.get(key)
+    if state is None:
+        generation = _generation
+        shared = get_shared_cache()
+        if shared is not None:
+            state = shared.get(key)
+        if state is None:
+            state = get_user_model().objects.filter(pk=user_id).values_list(
+                'token_version', 'is_active').first() or ()
+            if shared is not None and generation == _generation:
+                shared.set(key, state, settings.AUTH_TOKEN_CACHE_TTL)
+        if generation == _generation:
+            local.set(key, state)
+
+    return tuple(state) or None
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication reading tokens from a cache first."""
+
+    def authenticate_credentials(self, key):
+        local = get_local_cache()
+        entry = local.get(key)
+        if entry is None:
+            generation = _generation
+            shared = get_shared_cache()
+            if shared is not None:
+                entry = shared.get(shared_key(key))
+            if entry is None:
+                entry = super().authenticate_credentials(key)
+                if shared is not None and generation == _generation:
+                    shared.set(
+                        shared_key(key),
+                        entry,
+                        settings.AUTH_TOKEN_SHARED_CACHE_TTL,
+                    )
+            if generation == _generation:
+                local.set(key, entry)
+
+        user, token = entry
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+
+        # Views may change request.user, so each request gets its own copy.
+        return copy.copy(user), token
+
+
+class SignedTokenAuthentication(TokenAuthentication):
+    """
+    Authenticates signed access tokens sent as `Bearer <token>`.
+
+    Tokens of deleted or inactive users, and tokens issued before the last
+    revocation, are refused. request.user only has its id loaded, which is
+    all that filtering by it takes; its other fields are read from the
+    database when first used.
+    """
+    keyword = 'Bearer'
+
+    def authenticate_credentials(self, key):
+        try:
+            user_id, version = read_access_token(key)
+        except InvalidToken:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid or expired token.'))
+        state = get_token_state(user_id)
+        if state is None or not state[1]:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+        if state[0] != version:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid or expired token.'))
+
+        user = get_user_model().from_db(DEFAULT_DB_ALIAS, ['id'], [user_id])
+
+        return user, key
@@ -0,0 +1,206 @@
+"""
+Password hashing on a bounded pool of threads.
+
+PBKDF2 takes a few hundred milliseconds of CPU per password, and a burst
+of sign-ins and sign-ups would otherwise tie up every request thread with
+it. BoundedPBKDF2PasswordHasher runs each hash on the threads of a pool of
+PASSWORD_HASHING_WORKERS per process, which hashlib runs without the GIL.
+A request thread only waits for a free worker, never in a queue, and is
+refused with HashingBusy when every worker is busy, so at most that many
+request threads hash at once and the others keep serving the other
+endpoints. Async views await the pool with run_async instead, holding no
+thread, and may queue PASSWORD_HASHING_MAX_PENDING more hashes.
+
+Hashes made inside reserved_hashing(), which HashingBusyMiddleware uses for
+the Django admin login, may also run on PASSWORD_HASHING_RESERVED_WORKERS
+more threads the others never get, so a flood of sign-ins on the public
+endpoints does not lock staff out.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+from rest_framework import (
+    exceptions,
+    status,
+)
+
+_pool = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+
+class HashingBusy(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many sign-ins at once, try again shortly.'
+    default_code = 'hashing_busy'
+
+
+def _mark_worker():
+    _local.worker = True
+
+
+@contextmanager
+def reserved_hashing():
+    """Let the hashes made in this thread use the reserved workers."""
+    _local.reserved = True
+    try:
+        yield
+    finally:
+        _local.reserved = False
+
+
+class HashingPool:
+    """
+    A pool of `workers` threads, with counters of the jobs that went
+    through it. Blocking callers only get a free worker, while async ones
+    may queue `max_pending` more jobs. Blocking callers inside
+    reserved_hashing() fall back on `reserved` more threads.
+    """
+
+    def __init__(self, workers, max_pending, reserved=0):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.reserved = reserved
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='password-hashing',
+            initializer=_mark_worker,
+        )
+        self._reserved_executor = ThreadPoolExecutor(
+            max_workers=reserved,
+            thread_name_prefix='password-hashing-reserved',
+            initializer=_mark_worker,
+        ) if reserved > 0 else None
+        self._lock = threading.Lock()
+        self._stats = {
+            'running': 0,
+            'queued': 0,
+            'max_queued': 0,
+            'reserved_running': 0,
+            'completed': 0,
+            'rejected': 0,
+            'wait_seconds': 0.0,
+        }
+
+    def metrics(self):
+        """Return the current counters."""
+        with self._lock:
+            return dict(
+                self._stats, workers=self.workers, reserved=self.reserved)
+
+    def _run(self, queued_at, fn, args):
+        with self._lock:
+            self._stats['queued'] -= 1
+            self._stats['running'] += 1
+            self._stats['wait_seconds'] += time.monotonic() - queued_at
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._stats['running'] -= 1
+                self._stats['completed'] += 1
+
+    def _run_reserved(self, fn, args):
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._stats['reserved_running'] -= 1
+                self._stats['completed'] += 1
+
+    def _take(self, limit):
+        """Count a job in, unless `limit` jobs are running or queued."""
+        with self._lock:
+            if self._stats['running'] + self._stats['queued'] >= limit:
+                return False
+            self._stats['queued'] += 1
+            self._stats['max_queued'] = max(
+                self._stats['max_queued'], self._stats['queued'])
+
+        return True
+
+    def _take_reserved(self):
+        """Count a job in on a reserved worker, unless all are busy."""
+        with self._lock:
+            if self._stats['reserved_running'] >= self.reserved:
+                return False
+            self._stats['reserved_running'] += 1
+
+        return True
+
+    def _reject(self):
+        with self._lock:
+            self._stats['rejected'] += 1
+        raise HashingBusy()
+
+    def submit(self, fn, *args, queue=True):
+        """Queue `fn(*args)` and return its future, or raise HashingBusy
+        when the queue is full, or when every worker is busy unless
+        `queue`."""
+        if not self._take(self.workers + (self.max_pending if queue else 0)):
+            self._reject()
+
+        return self._executor.submit(self._run, time.monotonic(), fn, args)
+
+    def run(self, fn, *args):
+        """Return `fn(*args)` computed on a free worker, holding the
+        calling thread. Calls made from the pool itself run right away."""
+        if getattr(_local, 'worker', False):
+            return fn(*args)
+
+        if self._take(self.workers):
+            future = self._executor.submit(
+                self._run, time.monotonic(), fn, args)
+        elif getattr(_local, 'reserved', False) and self._take_reserved():
+            future = self._reserved_executor.submit(
+                self._run_reserved, fn, args)
+        else:
+            self._reject()
+
+        return future.result()
+
+    async def run_async(self, fn, *args):
+        """Await `fn(*args)` computed on the pool."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+
+def get_pool():
+    """Return the hashing pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = HashingPool(
+                settings.PASSWORD_HASHING_WORKERS,
+                settings.PASSWORD_HASHING_MAX_PENDING,
+                settings.PASSWORD_HASHING_RESERVED_WORKERS,
+            )
+
+    return _pool
+
+
+async def run_async(fn, *args):
+    """Await `fn(*args)`, a function hashing passwords, without blocking
+    the event loop."""
+    if settings.PASSWORD_HASHING_WORKERS <= 0:
+        return await sync_to_async(fn, thread_sensitive=False)(*args)
+
+    return await get_pool().run_async(fn, *args)
+
+
+class BoundedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2PasswordHasher hashing on the bounded pool, compatible with
+    the hashes it stored before."""
+
+    def encode(self, password, salt, iterations=None):
+        if settings.PASSWORD_HASHING_WORKERS <= 0:
+            return super().encode(password, salt, iterations)
+
+        return get_pool().run(super().encode, password, salt, iterations)
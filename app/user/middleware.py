@@ -0,0 +1,36 @@
+"""
+Middleware for sign-ins outside the API.
+"""
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.deprecation import MiddlewareMixin
+
+from user.hashers import (
+    HashingBusy,
+    reserved_hashing,
+)
+
+
+class HashingBusyMiddleware(MiddlewareMixin):
+    """
+    Let the Django admin login hash on the reserved workers, and answer
+    HashingBusy raised outside DRF views with a 503 rather than a server
+    error.
+    """
+
+    def __call__(self, request):
+        if request.path_info != reverse('admin:login'):
+            return super().__call__(request)
+
+        with reserved_hashing():
+            return super().__call__(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, HashingBusy):
+            return None
+
+        return JsonResponse(
+            {'detail': str(exception.detail)},
+            status=exception.status_code,
+            headers={'Retry-After': '1'},
+        )
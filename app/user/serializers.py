@@ -10,6 +10,8 @@ from django.utils.translation import gettext as _
 
 from rest_framework import serializers
 
+from user.tokens import revoke_tokens
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the user object."""
@@ -31,6 +33,7 @@ class UserSerializer(serializers.ModelSerializer):
         if password:
             user.set_password(password)
             user.save()
+            revoke_tokens(user)
 
         return user
 
@@ -58,3 +61,15 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs['user'] = user
         return attrs
+
+
+class AccessTokenSerializer(serializers.Serializer):
+    """Serializer for a signed access token and its refresh token."""
+    access = serializers.CharField()
+    refresh = serializers.CharField()
+    expires_in = serializers.IntegerField()
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    """Serializer for trading a refresh token."""
+    refresh = serializers.CharField(trim_whitespace=False)
@@ -1,8 +1,18 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+)
 
 from django.dispatch import receiver
 
+from rest_framework.authtoken.models import Token
+
 from core.models import (User, Account, Friend)
+from user.authentication import (
+    invalidate_token,
+    invalidate_token_state,
+    invalidate_user,
+)
 
 
 @receiver(post_save, sender=User)
@@ -16,3 +26,23 @@ def create_account(sender, instance, created, **kwargs):
         self_friend.save()
         user_account.friends.add(self_friend)
         user_account.save()
+
+
+@receiver(post_save, sender=User)
+def evict_user_tokens(sender, instance, created, **kwargs):
+
+    if not created:
+        invalidate_user(instance)
+        invalidate_token_state(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def evict_user_token_state(sender, instance, **kwargs):
+
+    invalidate_token_state(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def evict_token(sender, instance, **kwargs):
+
+    invalidate_token(instance.key)
@@ -0,0 +1,118 @@
+"""
+Tests for cached token authentication.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import (
+    override_settings,
+    TestCase,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user import authentication
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Tests for CachedTokenAuthentication."""
+
+    def setUp(self):
+        authentication.get_local_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password1234',
+            name='Test Name',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_cached_lookup_takes_no_query(self):
+        """Test authenticating a returning client runs no query."""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_invalid_token(self):
+        """Test unknown tokens are refused."""
+        self.client.credentials(HTTP_AUTHORIZATION='Token nope')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_evicted(self):
+        """Test deleted tokens stop authenticating."""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_evicted(self):
+        """Test deactivating a user stops their token authenticating."""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_edits_evicted(self):
+        """Test edits to the user are seen by the next request."""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {'name': 'New Name'})
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New Name')
+
+    @override_settings(AUTH_TOKEN_SHARED_CACHE='default')
+    def test_shared_cache(self):
+        """Test lookups missing the local cache are read from the shared
+        one, and evictions reach it."""
+        cache.clear()
+        self.client.get(ME_URL)
+        authentication.get_local_cache().clear()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        key = authentication.shared_key(self.token.key)
+        self.assertIsNotNone(cache.get(key))
+        self.token.delete()
+        self.assertIsNone(cache.get(key))
+
+    @override_settings(AUTH_TOKEN_SHARED_CACHE='default')
+    def test_evicted_again_on_commit(self):
+        """Test entries cached by lookups racing the transaction of a
+        user edit are evicted once it commits."""
+        cache.clear()
+        self.client.get(ME_URL)
+        key = authentication.shared_key(self.token.key)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+            # A lookup reading the user before the commit.
+            stale = get_user_model().objects.get(pk=self.user.pk)
+            stale.is_active = True
+            cache.set(key, (stale, self.token))
+            authentication.get_local_cache().set(
+                self.token.key, (stale, self.token))
+
+        self.assertIsNone(cache.get(key))
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
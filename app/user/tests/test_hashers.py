@@ -0,0 +1,212 @@
+"""
+Tests for password hashing on the bounded pool.
+"""
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import (
+    check_password,
+    make_password,
+    PBKDF2PasswordHasher,
+)
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user.hashers import (
+    BoundedPBKDF2PasswordHasher,
+    HashingBusy,
+    HashingPool,
+    reserved_hashing,
+)
+
+TOKEN_URL = reverse('user:token')
+TOKEN_ASYNC_URL = reverse('user:token-async')
+ADMIN_LOGIN_URL = reverse('admin:login')
+
+
+def full_pool(reserved=0):
+    """Return a pool with no room for another job, but `reserved` workers,
+    and the event that releases it."""
+    pool = HashingPool(workers=1, max_pending=0, reserved=reserved)
+    release = threading.Event()
+    pool.submit(release.wait)
+
+    return pool, release
+
+
+class HashingPoolTests(SimpleTestCase):
+    """Tests for HashingPool."""
+
+    def test_run(self):
+        """Test jobs run on the pool and are counted."""
+        pool = HashingPool(workers=2, max_pending=2)
+
+        self.assertEqual(pool.run(sum, [1, 2]), 3)
+        metrics = pool.metrics()
+        self.assertEqual(metrics['completed'], 1)
+        self.assertEqual(metrics['running'], 0)
+        self.assertEqual(metrics['workers'], 2)
+
+    def test_full_pool_refuses(self):
+        """Test jobs beyond the queue bound are refused."""
+        pool, release = full_pool()
+
+        with self.assertRaises(HashingBusy):
+            pool.run(sum, [1, 2])
+
+        metrics = pool.metrics()
+        self.assertEqual(metrics['rejected'], 1)
+        self.assertEqual(metrics['running'] + metrics['queued'], 1)
+        release.set()
+
+    def test_run_does_not_queue(self):
+        """Test blocking jobs are refused while every worker is busy, even
+        with room in the queue, and async ones still queue."""
+        pool = HashingPool(workers=1, max_pending=1)
+        release = threading.Event()
+        pool.submit(release.wait)
+
+        with self.assertRaises(HashingBusy):
+            pool.run(sum, [1, 2])
+        queued = pool.submit(sum, [1, 2])
+        release.set()
+
+        self.assertEqual(queued.result(), 3)
+        self.assertEqual(pool.metrics()['rejected'], 1)
+
+    def test_reserved_workers(self):
+        """Test reserved callers run on the reserved workers once the
+        others are busy, and the others are still refused."""
+        pool, release = full_pool(reserved=1)
+
+        with self.assertRaises(HashingBusy):
+            pool.run(sum, [1, 2])
+        with reserved_hashing():
+            self.assertEqual(pool.run(sum, [1, 2]), 3)
+        release.set()
+
+        metrics = pool.metrics()
+        self.assertEqual(metrics['rejected'], 1)
+        self.assertEqual(metrics['reserved_running'], 0)
+
+    def test_nested_run_inline(self):
+        """Test jobs started from the pool do not wait for a slot."""
+        pool = HashingPool(workers=1, max_pending=0)
+
+        self.assertEqual(pool.run(pool.run, sum, [1, 2]), 3)
+
+    def test_hashes_compatible(self):
+        """Test hashes are stored as and checked like PBKDF2 ones."""
+        hasher = BoundedPBKDF2PasswordHasher()
+        encoded = make_password('password1234', hasher='pbkdf2_sha256')
+
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$'))
+        self.assertTrue(hasher.verify('password1234', encoded))
+        self.assertTrue(PBKDF2PasswordHasher().verify(
+            'password1234', encoded))
+        self.assertTrue(check_password(
+            'password1234', PBKDF2PasswordHasher().encode(
+                'password1234', 'salt')))
+
+
+class SignInTests(TestCase):
+    """Tests for signing in while hashing is busy."""
+
+    def setUp(self):
+        self.client = APIClient()
+        get_user_model().objects.create_user(
+            'user@example.com',
+            'password1234',
+        )
+        self.credentials = {
+            'email': 'user@example.com',
+            'password': 'password1234',
+        }
+
+    def test_busy_sign_in_refused(self):
+        """Test sign-ins are refused with a 503 when the queue is full."""
+        pool, release = full_pool()
+
+        with mock.patch('user.hashers.get_pool', return_value=pool):
+            res = self.client.post(TOKEN_URL, self.credentials)
+        release.set()
+
+        self.assertEqual(
+            res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_async_sign_in(self):
+        """Test the async sign-in returns a token."""
+        res = self.client.post(
+            TOKEN_ASYNC_URL, self.credentials, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('token', res.json())
+
+    def test_async_sign_in_bad_credentials(self):
+        """Test the async sign-in refuses wrong passwords and emails."""
+        for credentials in (
+            {'email': 'user@example.com', 'password': 'wrong'},
+            {'email': 'other@example.com', 'password': 'password1234'},
+            {'email': 'user@example.com'},
+        ):
+            res = self.client.post(TOKEN_ASYNC_URL, credentials)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertNotIn('token', res.json())
+
+    def test_async_sign_in_busy(self):
+        """Test the async sign-in is refused when the queue is full."""
+        pool, release = full_pool()
+
+        with mock.patch('user.hashers.get_pool', return_value=pool):
+            res = self.client.post(
+                TOKEN_ASYNC_URL, self.credentials, format='json')
+        release.set()
+
+        self.assertEqual(
+            res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '1')
+
+    def test_busy_admin_login_refused(self):
+        """Test admin logins are refused with a 503 when hashing is
+        busy."""
+        pool, release = full_pool()
+
+        with mock.patch('user.hashers.get_pool', return_value=pool):
+            res = self.client.post(ADMIN_LOGIN_URL, {
+                'username': 'user@example.com',
+                'password': 'password1234',
+            })
+        release.set()
+
+        self.assertEqual(
+            res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '1')
+
+    def test_admin_login_uses_reserved_workers(self):
+        """Test admin logins still hash while the public sign-ins have
+        every worker busy."""
+        pool, release = full_pool(reserved=1)
+        get_user_model().objects.create_superuser(
+            'admin@example.com',
+            'password1234',
+        )
+
+        with mock.patch('user.hashers.get_pool', return_value=pool):
+            res = self.client.post(TOKEN_URL, self.credentials)
+            self.assertEqual(
+                res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            res = self.client.post(ADMIN_LOGIN_URL, {
+                'username': 'admin@example.com',
+                'password': 'password1234',
+            })
+        release.set()
+
+        self.assertEqual(res.status_code, status.HTTP_302_FOUND)
@@ -0,0 +1,211 @@
+"""
+Tests for signed access tokens and refresh tokens.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import (
+    override_settings,
+    TestCase,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from core.models import RefreshToken
+from user import authentication
+from user.authentication import SignedTokenAuthentication
+
+ACCESS_URL = reverse('user:token-access')
+REFRESH_URL = reverse('user:token-refresh')
+REVOKE_URL = reverse('user:token-revoke')
+ME_URL = reverse('user:me')
+
+
+class SignedTokenApiTests(TestCase):
+    """Tests for the signed token API."""
+
+    def setUp(self):
+        cache.clear()
+        authentication.get_local_cache().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password1234',
+            name='Test Name',
+        )
+
+    def obtain(self):
+        """Return tokens obtained with the user's credentials."""
+        res = self.client.post(ACCESS_URL, {
+            'email': 'user@example.com',
+            'password': 'password1234',
+        })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res.data
+
+    def test_obtain_tokens(self):
+        """Test credentials are traded for an access and refresh token."""
+        tokens = self.obtain()
+
+        self.assertIn('access', tokens)
+        self.assertIn('refresh', tokens)
+        self.assertEqual(tokens['expires_in'], 300)
+        stored = RefreshToken.objects.get(user=self.user)
+        self.assertNotEqual(stored.key_hash, tokens['refresh'])
+
+    def test_bad_credentials(self):
+        """Test no tokens are issued for wrong credentials."""
+        res = self.client.post(ACCESS_URL, {
+            'email': 'user@example.com',
+            'password': 'wrong',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_access_token_checked_without_query(self):
+        """Test access tokens authenticate without any query once the
+        state of their user is cached, even with no shared cache."""
+        access = self.obtain()['access']
+        SignedTokenAuthentication().authenticate_credentials(access)
+
+        with self.assertNumQueries(0):
+            user, _ = SignedTokenAuthentication().authenticate_credentials(
+                access)
+
+        self.assertEqual(user.pk, self.user.pk)
+
+    @override_settings(AUTH_TOKEN_SHARED_CACHE='default')
+    def test_access_token_state_shared(self):
+        """Test the state of a user missing the local cache is read from
+        the shared one."""
+        access = self.obtain()['access']
+        SignedTokenAuthentication().authenticate_credentials(access)
+        authentication.get_local_cache().clear()
+
+        with self.assertNumQueries(0):
+            SignedTokenAuthentication().authenticate_credentials(access)
+
+    def test_access_token_authenticates(self):
+        """Test Bearer access tokens authenticate requests."""
+        access = self.obtain()['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['name'], 'Test Name')
+
+    def test_tampered_access_token(self):
+        """Test access tokens whose signature does not match are refused."""
+        access = self.obtain()['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}x')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_access_token(self):
+        """Test access tokens are refused once their lifetime passed."""
+        access = self.obtain()['access']
+
+        with self.settings(AUTH_ACCESS_TOKEN_LIFETIME=-1):
+            with self.assertRaises(AuthenticationFailed):
+                SignedTokenAuthentication().authenticate_credentials(access)
+
+    def test_refresh(self):
+        """Test refresh tokens are traded once for a new pair."""
+        refresh = self.obtain()['refresh']
+
+        res = self.client.post(REFRESH_URL, {'refresh': refresh})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['refresh'], refresh)
+        res = self.client.post(REFRESH_URL, {'refresh': refresh})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(AUTH_REFRESH_TOKEN_LIFETIME=-1)
+    def test_expired_refresh_token(self):
+        """Test refresh tokens are refused once their lifetime passed."""
+        refresh = self.obtain()['refresh']
+
+        res = self.client.post(REFRESH_URL, {'refresh': refresh})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_inactive_user_refused(self):
+        """Test refresh tokens of deactivated users are refused."""
+        refresh = self.obtain()['refresh']
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.post(REFRESH_URL, {'refresh': refresh})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_revoke(self):
+        """Test revoking refuses the refresh tokens issued so far."""
+        first = self.obtain()
+        second = self.obtain()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {first["access"]}')
+
+        res = self.client.post(REVOKE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.token_version, 1)
+        for tokens in (first, second):
+            res = self.client.post(REFRESH_URL, {'refresh': tokens['refresh']})
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(AUTH_TOKEN_SHARED_CACHE='default')
+    def test_revoke_refuses_access_tokens(self):
+        """Test access tokens issued before a revocation are refused, even
+        with the state of their user cached."""
+        access = self.obtain()['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(REVOKE_URL)
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        access = self.obtain()['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+
+    @override_settings(AUTH_TOKEN_SHARED_CACHE='default')
+    def test_inactive_or_deleted_user_access_refused(self):
+        """Test access tokens of deactivated and deleted users are
+        refused."""
+        access = self.obtain()['access']
+        SignedTokenAuthentication().authenticate_credentials(access)
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            SignedTokenAuthentication().authenticate_credentials(access)
+
+        self.user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            SignedTokenAuthentication().authenticate_credentials(access)
+
+    def test_password_change_revokes_tokens(self):
+        """Test changing the password revokes the tokens issued so far."""
+        tokens = self.obtain()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+
+        res = self.client.patch(ME_URL, {'password': 'newpassword123'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.client.get(ME_URL).status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+        res = self.client.post(REFRESH_URL, {'refresh': tokens['refresh']})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
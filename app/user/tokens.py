@@ -0,0 +1,103 @@
+"""
+Signed access tokens and refresh tokens.
+
+An access token is the id and token version of a user, timestamped and
+signed with an HMAC of SECRET_KEY, so checking one takes no query. It is
+valid for AUTH_ACCESS_TOKEN_LIFETIME seconds. Clients then trade their
+refresh token, stored hashed in the database, for a new pair; each refresh
+token is used once.
+
+Revoking the tokens of a user bumps their token version, so refresh and
+access tokens issued before are refused. Changing the password revokes
+them too.
+"""
+import hashlib
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import (
+    RefreshToken,
+    User,
+)
+
+ACCESS_SALT = 'user.tokens.access'
+
+
+class InvalidToken(Exception):
+    """A token that is malformed, tampered with, expired or revoked."""
+
+
+def hash_key(key):
+    """Return the stored form of a refresh token."""
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def issue_tokens(user):
+    """Return a new access token and refresh token for `user`."""
+    access = signing.dumps(
+        {'u': user.pk, 'v': user.token_version}, salt=ACCESS_SALT)
+    refresh = secrets.token_urlsafe(32)
+    now = timezone.now()
+    RefreshToken.objects.filter(user=user, expires_at__lte=now).delete()
+    RefreshToken.objects.create(
+        key_hash=hash_key(refresh),
+        user=user,
+        version=user.token_version,
+        expires_at=now + timedelta(
+            seconds=settings.AUTH_REFRESH_TOKEN_LIFETIME),
+    )
+
+    return {
+        'access': access,
+        'refresh': refresh,
+        'expires_in': settings.AUTH_ACCESS_TOKEN_LIFETIME,
+    }
+
+
+def read_access_token(token):
+    """Return the id of the user an access token was issued to and the
+    token version it was issued at."""
+    try:
+        payload = signing.loads(
+            token,
+            salt=ACCESS_SALT,
+            max_age=settings.AUTH_ACCESS_TOKEN_LIFETIME,
+        )
+    except signing.BadSignature:
+        raise InvalidToken()
+
+    return payload['u'], payload['v']
+
+
+def refresh_tokens(key):
+    """Trade a refresh token for a new access token and refresh token."""
+    with transaction.atomic():
+        token = RefreshToken.objects.select_for_update().select_related(
+            'user',
+        ).filter(
+            key_hash=hash_key(key),
+            expires_at__gt=timezone.now(),
+        ).first()
+        if token is None or not token.user.is_active or (
+            token.version != token.user.token_version
+        ):
+            raise InvalidToken()
+        token.delete()
+
+        return issue_tokens(token.user)
+
+
+def revoke_tokens(user):
+    """Revoke every token issued to `user`. Saving the user sends the
+    signal evicting its cached token state."""
+    with transaction.atomic():
+        locked = User.objects.select_for_update().get(pk=user.pk)
+        locked.token_version += 1
+        locked.save(update_fields=['token_version'])
+        RefreshToken.objects.filter(user=user).delete()
+    user.token_version = locked.token_version
@@ -12,6 +12,26 @@ app_name = 'user'
 urlpatterns = [
     path('create/', views.CreateUserView.as_view(), name='create'),
     path('token/', views.CreateTokenView.as_view(), name='token'),
+    path(
+        'token/async/',
+        views.create_token_async,
+        name='token-async',
+    ),
+    path(
+        'token/access/',
+        views.CreateAccessTokenView.as_view(),
+        name='token-access',
+    ),
+    path(
+        'token/refresh/',
+        views.RefreshAccessTokenView.as_view(),
+        name='token-refresh',
+    ),
+    path(
+        'token/revoke/',
+        views.RevokeTokensView.as_view(),
+        name='token-revoke',
+    ),
     path('me/', views.ManageUserView.as_view(), name='me'),
 
 ]
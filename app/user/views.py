@@ -1,15 +1,49 @@
 """
 Views for the user API.
 """
+import json
 
-from rest_framework import generics, authentication, permissions
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import (
+    check_password,
+    make_password,
+)
+from django.http import (
+    HttpResponseNotAllowed,
+    JsonResponse,
+)
+
+from drf_spectacular.utils import extend_schema
+
+from rest_framework import generics, permissions, status
+from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
 
 from user.serializers import (
     UserSerializer,
     AuthTokenSerializer,
+    AccessTokenSerializer,
+    RefreshTokenSerializer,
+)
+from user.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
+from user.hashers import (
+    HashingBusy,
+    run_async,
+)
+from user.tokens import (
+    InvalidToken,
+    issue_tokens,
+    refresh_tokens,
+    revoke_tokens,
 )
 
 from core.models import User
@@ -26,13 +60,130 @@ class CreateTokenView(ObtainAuthToken):
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
 
+def _get_user(email):
+    """Return the user signing in as `email`, or None."""
+    try:
+        return get_user_model()._default_manager.get_by_natural_key(email)
+    except get_user_model().DoesNotExist:
+        return None
+
+
+async def create_token_async(request):
+    """
+    Create a new auth token for user, like CreateTokenView, without
+    holding a thread while the password is hashed. Meant for servers
+    running app/asgi.py.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            data = {}
+    else:
+        data = request.POST
+    if not isinstance(data, dict):
+        data = {}
+    email, password = data.get('email'), data.get('password')
+    if not email or not password:
+        return JsonResponse(
+            {'non_field_errors': ['Email and password are required.']},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    user = await sync_to_async(_get_user)(email)
+    try:
+        if user is None:
+            # Hash anyway so unknown emails take as long as wrong passwords.
+            await run_async(make_password, password)
+            valid = False
+        else:
+            valid = user.is_active and await run_async(
+                check_password, password, user.password)
+    except HashingBusy as exc:
+        return JsonResponse(
+            {'detail': str(exc.detail)},
+            status=exc.status_code,
+            headers={'Retry-After': '1'},
+        )
+    if not valid:
+        return JsonResponse(
+            {'non_field_errors': [
+                'Unable to authenticate with provided credentials.']},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    token, _ = await sync_to_async(Token.objects.get_or_create)(user=user)
+
+    return JsonResponse({'token': token.key})
+
+
+# csrf_exempt wraps views in a sync function, which would hide that this
+# one is async.
+create_token_async.csrf_exempt = True
+
+
+class CreateAccessTokenView(generics.GenericAPIView):
+    """Create a signed access token and a refresh token for user."""
+    serializer_class = AuthTokenSerializer
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+
+    @extend_schema(responses=AccessTokenSerializer)
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        return Response(issue_tokens(serializer.validated_data['user']))
+
+
+class RefreshAccessTokenView(generics.GenericAPIView):
+    """Trade a refresh token for a new access token and refresh token."""
+    serializer_class = RefreshTokenSerializer
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+
+    @extend_schema(responses=AccessTokenSerializer)
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            tokens = refresh_tokens(serializer.validated_data['refresh'])
+        except InvalidToken:
+            raise ValidationError({'refresh': 'Invalid or expired.'})
+
+        return Response(tokens)
+
+
+class RevokeTokensView(generics.GenericAPIView):
+    """Revoke every signed access token and refresh token of the user."""
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(request=None, responses={204: None})
+    def post(self, request):
+        revoke_tokens(request.user)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user."""
     serializer_class = UserSerializer
     queryset = User.objects.all()
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         """Retrieve and return the authenticated user."""
-        return self.request.user
+        user = self.request.user
+        if user.get_deferred_fields():
+            # Signed access tokens only carry the id of the user.
+            user = User.objects.get(pk=user.pk)
+
+        return user
@@ -0,0 +1,105 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+
+from rest_framework import serializers
+from rest_framework.relations import (
+    ManyRelatedField,
+    RelatedField,
+)
+
+
+def _collect_lookups(serializer, prefix=''):
+    """Return the select_related and prefetch_related lookups of a tree."""
+    select = []
+    prefetch = []
+    model = serializer.Meta.model
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*' or '.' in field.source:
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.is_relation:
+            continue
+        lookup = prefix + field.source
+
+        if isinstance(field, serializers.ListSerializer):
+            child = field.child
+            if not isinstance(child, serializers.ModelSerializer):
+                prefetch.append(lookup)
+                continue
+            child_select, child_prefetch = _collect_lookups(child)
+            queryset = child.Meta.model._default_manager.select_related(
+                *child_select
+            ).prefetch_related(*child_prefetch)
+            prefetch.append(Prefetch(lookup, queryset=queryset))
+        elif isinstance(field, serializers.ModelSerializer):
+            if model_field.many_to_many or model_field.one_to_many:
+                continue
+            select.append(lookup)
+            nested_select, nested_prefetch = _collect_lookups(
+                field, prefix=f'{lookup}__'
+            )
+            select.extend(nested_select)
+            prefetch.extend(nested_prefetch)
+        elif isinstance(field, ManyRelatedField):
+            prefetch.append(lookup)
+        elif isinstance(field, RelatedField):
+            if not field.use_pk_only_optimization():
+                select.append(lookup)
+
+    return select, prefetch
+
+
+@lru_cache(maxsize=None)
+def get_related_lookups(serializer_class):
+    """
+    Return (select_related, prefetch_related) lookups for a serializer.
+
+    Nested serializers on forward foreign keys become select_related joins,
+    nested many serializers become Prefetch objects carrying their own
+    lookups, and many related fields become plain prefetches.
+    """
+    if not issubclass(serializer_class, serializers.ModelSerializer):
+        return (), ()
+    select, prefetch = _collect_lookups(serializer_class())
+
+    return tuple(select), tuple(prefetch)
+
+
+def prefetch_for_serializer(queryset, serializer_class):
+    """Apply the related lookups a serializer needs to a queryset."""
+    select, prefetch = get_related_lookups(serializer_class)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+
+    return queryset
+
+
+class AutoPrefetchMixin:
+    """
+    Apply this mixin to any view or viewset to load the relations its
+    serializer renders up front, so listing N objects runs a constant number
+    of queries instead of one or more per object.
+
+    The serializer field tree is inspected once per serializer class, when
+    the view class is created for `serializer_class` and on first use for
+    any other class returned by `get_serializer_class`.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        serializer_class = getattr(cls, 'serializer_class', None)
+        if serializer_class is not None:
+            get_related_lookups(serializer_class)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+
+        return prefetch_for_serializer(queryset, self.get_serializer_class())
@@ -0,0 +1,150 @@
+import fcntl
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+
+class DiskLRUCache:
+    """
+    A size bounded cache of files on disk, shared by every process using
+    the same root.
+
+    Entries are files named by key, sharded into directories by the first
+    two characters of the key. Their modification time doubles as the last
+    use time, refreshed at most every `touch_interval` seconds on reads,
+    and once the cache grows past `max_bytes` the least recently used files
+    are removed until it is back under `low_water` of it.
+
+    Creating an entry holds an exclusive lock on one of `lock_stripes` lock
+    files chosen by key, so concurrent misses on the same key, in any
+    process, create it once.
+    """
+
+    def __init__(
+        self, root, max_bytes, low_water=0.9, touch_interval=3600,
+        lock_stripes=256,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self.touch_interval = touch_interval
+        self.lock_stripes = lock_stripes
+        self._size = None
+        self._size_lock = threading.Lock()
+
+    def path(self, key, ext=''):
+        """Return the file of an entry."""
+        return os.path.join(self.root, key[:2], f'{key}{ext}')
+
+    def open(self, key, ext=''):
+        """Return the entry opened for reading, or None on a miss."""
+        path = self.path(key, ext)
+        try:
+            entry = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        if time.time() - os.fstat(entry.fileno()).st_mtime > (
+            self.touch_interval
+        ):
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+
+        return entry
+
+    def _lock_path(self, key):
+        """Return the lock file guarding the creation of an entry."""
+        stripe = int(hashlib.md5(key.encode()).hexdigest(), 16) % (
+            self.lock_stripes
+        )
+
+        return os.path.join(self.root, 'locks', f'{stripe}.lock')
+
+    def get_or_create(self, key, create, ext=''):
+        """
+        Return the entry opened for reading, calling `create(path)` to write
+        it to a temporary path first on a miss.
+        """
+        entry = self.open(key, ext)
+        if entry is not None:
+            return entry
+
+        lock_path = self._lock_path(key)
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        with open(lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                entry = self.open(key, ext)
+                if entry is not None:
+                    return entry
+                path = self.path(key, ext)
+                directory = os.path.dirname(path)
+                os.makedirs(directory, exist_ok=True)
+                descriptor, temp_path = tempfile.mkstemp(
+                    dir=directory, suffix=ext)
+                os.close(descriptor)
+                try:
+                    create(temp_path)
+                    os.chmod(temp_path, 0o644)
+                    size = os.path.getsize(temp_path)
+                    os.replace(temp_path, path)
+                except BaseException:
+                    os.remove(temp_path)
+                    raise
+                entry = open(path, 'rb')
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+        self._added(size)
+        return entry
+
+    def _entries(self):
+        """Yield (mtime, size, path) for every entry."""
+        with os.scandir(self.root) as shards:
+            for shard in shards:
+                if not shard.is_dir() or shard.name == 'locks':
+                    continue
+                with os.scandir(shard.path) as files:
+                    for entry in files:
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        yield stat.st_mtime, stat.st_size, entry.path
+
+    def _added(self, size):
+        """Account for a new entry, evicting when over budget."""
+        with self._size_lock:
+            if self._size is not None:
+                self._size += size
+            if self._size is None or self._size > self.max_bytes:
+                self._size = self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache is under its
+        low water mark, and return its size.
+
+        Sizes are counted per process between scans, so the real total can
+        run past `max_bytes` by what other processes wrote before the next
+        scan here catches it.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return total
+
+        target = self.max_bytes * self.low_water
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+        return total
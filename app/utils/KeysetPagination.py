@@ -0,0 +1,220 @@
+import base64
+import binascii
+import datetime
+import json
+from collections import OrderedDict
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """JSON encoder keeping full microsecond precision for datetimes."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def keyset_filter(ordering, position):
+    """
+    Build a filter selecting rows that sort after `position` in `ordering`.
+
+    For an ordering (a, b, id) this is the row comparison
+    (a, b, id) > (x, y, z), expanded into OR'd prefixes, plus a redundant
+    bound on the leading column so the database can range scan its index.
+    """
+    clauses = []
+    for index, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        equal = {
+            prefix.lstrip('-'): value
+            for prefix, value in zip(ordering[:index], position)
+        }
+        clauses.append(Q(**equal, **{f'{name}__{lookup}': position[index]}))
+
+    leading = ordering[0].lstrip('-')
+    lookup = 'lte' if ordering[0].startswith('-') else 'gte'
+
+    return Q(**{f'{leading}__{lookup}': position[0]}) & reduce(or_, clauses)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opaque-cursor pagination over a stable (sort key, id) ordering.
+
+    Views choose the sort key with an `ordering` attribute, and the unique
+    field breaking its ties with `cursor_unique_field`, appended when the
+    ordering does not end with it. Every page is a range scan starting at
+    the previous page's last row, so deep pages cost the same as the first
+    one.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = ('-id',)
+    cursor_unique_field = 'id'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, view):
+        """Return the ordering of the view, ending in a unique field."""
+        ordering = tuple(getattr(view, 'ordering', None) or self.ordering)
+        unique = getattr(
+            view, 'cursor_unique_field', self.cursor_unique_field)
+        if ordering[-1].lstrip('-') not in (unique, 'pk'):
+            direction = '-' if ordering[0].startswith('-') else ''
+            ordering += (f'{direction}{unique}',)
+
+        return ordering
+
+    def get_page_size(self, request):
+        """Return the requested page size, capped to the maximum."""
+        page_size = api_settings.PAGE_SIZE
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            pass
+
+        return max(1, min(page_size, settings.PAGINATION_MAX_PAGE_SIZE))
+
+    def get_ordering_fields(self, model):
+        """Return the model fields of the ordering, following relations."""
+        fields = []
+        for name in self.ordering:
+            field = None
+            current = model
+            for part in name.lstrip('-').split('__'):
+                if part == 'pk':
+                    field = current._meta.pk
+                else:
+                    field = current._meta.get_field(part)
+                if field.is_relation:
+                    current = field.related_model
+            fields.append(field)
+
+        return fields
+
+    def clean_position(self, position, model):
+        """Convert the values of a position to the ordering fields."""
+        cleaned = []
+        for field, value in zip(self.get_ordering_fields(model), position):
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                cleaned.append(field.to_python(value))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        return cleaned
+
+    def decode_cursor(self, request, model=None):
+        """Return the position encoded in the request cursor, if any, with
+        its values checked against the fields of `model`."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (binascii.Error, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if (
+            not isinstance(position, list) or
+            len(position) != len(self.ordering)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        if model is not None:
+            position = self.clean_position(position, model)
+
+        return position
+
+    def encode_cursor(self, position):
+        """Return an opaque cursor for the position."""
+        data = json.dumps(position, cls=CursorEncoder)
+
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def get_position(self, obj):
+        """Return the values of the ordering fields for an object."""
+        position = []
+        for field in self.ordering:
+            value = obj
+            for attr in field.lstrip('-').split('__'):
+                value = getattr(value, attr)
+            position.append(value)
+
+        return position
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return a single page of the queryset."""
+
+        def fetch(position, limit):
+            ordered = queryset.order_by(*self.ordering)
+            if position is not None:
+                ordered = ordered.filter(
+                    keyset_filter(self.ordering, position)
+                )
+            return ordered[:limit]
+
+        self.ordering = self.get_ordering(view)
+        return self.paginate_fetch(fetch, request, model=queryset.model)
+
+    def paginate_fetch(self, fetch, request, view=None, model=None):
+        """
+        Return a single page from `fetch(position, limit)`, which must yield
+        at most `limit` objects sorted by `self.ordering` after `position`.
+        Cursor values are checked against the fields of `model`, if given.
+        """
+        if view is not None:
+            self.ordering = self.get_ordering(view)
+        self.request = request
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request, model)
+
+        results = list(fetch(position, page_size + 1))
+        self.page = results[:page_size]
+        self.next_position = None
+        if len(results) > page_size:
+            self.next_position = self.get_position(self.page[-1])
+
+        return self.page
+
+    def get_next_link(self):
+        """Return the URL of the next page, if there is one."""
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+
+        return replace_query_param(
+            url,
+            self.cursor_query_param,
+            self.encode_cursor(self.next_position),
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                },
+                'results': schema,
+            },
+        }
@@ -0,0 +1,196 @@
+import hashlib
+import threading
+import uuid
+from functools import (
+    lru_cache,
+    partial,
+)
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from rest_framework import serializers
+from rest_framework.relations import (
+    ManyRelatedField,
+    RelatedField,
+)
+from rest_framework.response import Response
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the cache holding responses, or None when disabled."""
+    alias = settings.RESPONSE_CACHE
+
+    return caches[alias] if alias else None
+
+
+def model_tag(model):
+    """Return the tag of every cached response holding rows of `model`."""
+    return f'response-tag:{model._meta.concrete_model._meta.label_lower}'
+
+
+def instance_tag(model, pk):
+    """Return the tag of the cached responses of one row."""
+    return f'{model_tag(model)}:{pk}'
+
+
+def _bump(tags):
+    cache = get_cache()
+    if cache is not None:
+        cache.set_many({tag: uuid.uuid4().hex for tag in tags}, None)
+
+
+def invalidate(model, pks=()):
+    """
+    Drop the cached responses holding rows of `model`, and those of the
+    rows `pks`. Writes sending no signals, like queryset updates and bulk
+    inserts, must call this themselves.
+    """
+    if get_cache() is None:
+        return
+    tags = [model_tag(model)] + [instance_tag(model, pk) for pk in pks]
+    _bump(tags)
+    # Responses computed until the transaction commits may still read the
+    # old rows, so they are dropped again once it does.
+    transaction.on_commit(partial(_bump, tags))
+
+
+def _versions(cache, tags):
+    """Return the current version of each tag, starting missing ones."""
+    versions = cache.get_many(tags)
+    missing = [tag for tag in tags if tag not in versions]
+    for tag in missing:
+        cache.add(tag, uuid.uuid4().hex, None)
+    if missing:
+        versions.update(cache.get_many(missing))
+
+    return versions
+
+
+def _count(name, outcome):
+    with _stats_lock:
+        counts = _stats.setdefault(name, {'hits': 0, 'misses': 0})
+        counts[outcome] += 1
+
+
+def response_cache_stats():
+    """Return the hits and misses of each cached view of this process."""
+    with _stats_lock:
+        return {name: dict(counts) for name, counts in _stats.items()}
+
+
+def _collect_models(serializer):
+    """Return the models a serializer tree renders rows of, past its own."""
+    models = set()
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.ListSerializer):
+            field = field.child
+        if isinstance(field, serializers.ModelSerializer):
+            models.add(field.Meta.model)
+            models |= _collect_models(field)
+        elif isinstance(field, ManyRelatedField):
+            if not field.child_relation.use_pk_only_optimization():
+                models.add(field.child_relation.get_queryset().model)
+        elif isinstance(field, RelatedField):
+            if not field.use_pk_only_optimization():
+                models.add(field.get_queryset().model)
+
+    return models
+
+
+@lru_cache(maxsize=None)
+def get_related_models(serializer_class):
+    """Return the models rendered by a serializer besides its own."""
+    if not issubclass(serializer_class, serializers.ModelSerializer):
+        return frozenset()
+
+    return frozenset(_collect_models(serializer_class()))
+
+
+class ResponseCacheMixin:
+    """
+    Apply this mixin to a viewset to cache the responses of its list and
+    retrieve actions in the RESPONSE_CACHE cache, per user and query.
+
+    Entries are tagged with the models they render, found from the
+    serializer plus `cache_dependencies`, or with the row itself for a
+    retrieve by primary key. Every tag has a version, bumped by the signals
+    in core.signals or by `invalidate`, and an entry is only served while
+    the versions it was computed at are current. Versions are read before
+    the response is computed and bumped again once a write commits, so a
+    response never outlives the rows it was computed from.
+    """
+    cache_dependencies = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
+
+    def get_cache_tags(self):
+        """Return the tags of the response to the current request."""
+        model = self.queryset.model
+        models = get_related_models(self.get_serializer_class()) | set(
+            self.cache_dependencies)
+        tags = [model_tag(related) for related in models - {model}]
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if self.action == 'retrieve' and self.lookup_field in (
+            'pk', model._meta.pk.name,
+        ):
+            tags.append(instance_tag(model, self.kwargs[lookup_url_kwarg]))
+        else:
+            tags.append(model_tag(model))
+
+        return tags
+
+    def get_cache_key(self, request):
+        """Return the key of the response to a request."""
+        query = sorted(request.query_params.lists())
+        key = repr((
+            request.user.pk,
+            request.get_host(),
+            request.path,
+            query,
+            request.accepted_media_type,
+        ))
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        view = f'{type(self).__module__}.{type(self).__name__}'
+
+        return f'response:{view}:{self.action}:{digest}'
+
+    def cached_response(self, compute, request, *args, **kwargs):
+        """Return the cached response to a request, or compute and cache
+        it."""
+        cache = get_cache()
+        if cache is None:
+            return compute(request, *args, **kwargs)
+
+        name = f'{type(self).__name__}.{self.action}'
+        key = self.get_cache_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            data, versions = entry
+            if cache.get_many(list(versions)) == versions:
+                _count(name, 'hits')
+                return Response(data, headers={'X-Cache': 'HIT'})
+
+        _count(name, 'misses')
+        tags = self.get_cache_tags()
+        versions = _versions(cache, tags)
+        response = compute(request, *args, **kwargs)
+        if response.status_code == 200 and len(versions) == len(tags):
+            cache.set(
+                key, (response.data, versions),
+                settings.RESPONSE_CACHE_TIMEOUT,
+            )
+        response['X-Cache'] = 'MISS'
+
+        return response
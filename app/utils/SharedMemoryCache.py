@@ -0,0 +1,349 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import (
+    BaseCache,
+    DEFAULT_TIMEOUT,
+)
+
+MAGIC = b'SHMCACH1'
+# Magic, number of buckets and bucket size, padded to FILE_HEADER_SIZE.
+FILE_HEADER = struct.Struct('<8sII')
+FILE_HEADER_SIZE = 64
+# Bytes of entries, entries, hits, misses and evictions of a bucket.
+BUCKET_HEADER = struct.Struct('<IIQQQ')
+# Key length, value length, expiry time or 0 and last use time of an entry,
+# followed by the key and the value.
+ENTRY = struct.Struct('<IIdd')
+
+
+class _Bucket:
+    """The entries of one bucket, packed one after the other."""
+
+    def __init__(self, mapping, offset, size):
+        self.map = mapping
+        self.offset = offset
+        self.start = offset + BUCKET_HEADER.size
+        self.capacity = size - BUCKET_HEADER.size
+        (
+            self.used, self.count, self.hits, self.misses, self.evictions,
+        ) = BUCKET_HEADER.unpack_from(mapping, offset)
+
+    def save(self):
+        """Write the header back."""
+        BUCKET_HEADER.pack_into(
+            self.map, self.offset,
+            self.used, self.count, self.hits, self.misses, self.evictions,
+        )
+
+    def entries(self):
+        """Yield the position, key length, value length, expiry and last
+        use of each entry."""
+        pos = self.start
+        end = self.start + self.used
+        while pos < end:
+            key_length, value_length, expires, used_at = ENTRY.unpack_from(
+                self.map, pos)
+            yield pos, key_length, value_length, expires, used_at
+            pos += ENTRY.size + key_length + value_length
+
+    def find(self, key):
+        """Return the position, value length and expiry of an entry, or
+        None."""
+        for pos, key_length, value_length, expires, _ in self.entries():
+            key_start = pos + ENTRY.size
+            if key_length == len(key) and (
+                self.map[key_start:key_start + key_length] == key
+            ):
+                return pos, value_length, expires
+
+        return None
+
+    def value(self, pos):
+        """Return the value of the entry at `pos`."""
+        key_length, value_length, _, _ = ENTRY.unpack_from(self.map, pos)
+        start = pos + ENTRY.size + key_length
+
+        return self.map[start:start + value_length]
+
+    def touch(self, pos, expires=None, used_at=None):
+        """Update the expiry or last use of the entry at `pos`."""
+        key_length, value_length, old_expires, old_used_at = (
+            ENTRY.unpack_from(self.map, pos))
+        ENTRY.pack_into(
+            self.map, pos, key_length, value_length,
+            old_expires if expires is None else expires,
+            old_used_at if used_at is None else used_at,
+        )
+
+    def remove(self, pos):
+        """Remove the entry at `pos`, moving the following ones up."""
+        key_length, value_length, _, _ = ENTRY.unpack_from(self.map, pos)
+        length = ENTRY.size + key_length + value_length
+        end = self.start + self.used
+        self.map[pos:end - length] = self.map[pos + length:end]
+        self.used -= length
+        self.count -= 1
+
+    def make_room(self, length, now):
+        """Remove expired entries, then the least recently used ones, until
+        `length` bytes are free."""
+        expired = [
+            pos for pos, _, _, expires, _ in self.entries()
+            if expires and expires <= now
+        ]
+        for pos in reversed(expired):
+            self.remove(pos)
+        while self.capacity - self.used < length:
+            oldest = min(self.entries(), key=lambda entry: entry[4])
+            self.remove(oldest[0])
+            self.evictions += 1
+
+    def append(self, key, value, expires, now):
+        """Add an entry, which must fit."""
+        pos = self.start + self.used
+        ENTRY.pack_into(self.map, pos, len(key), len(value), expires, now)
+        pos += ENTRY.size
+        self.map[pos:pos + len(key)] = key
+        pos += len(key)
+        self.map[pos:pos + len(value)] = value
+        self.used += ENTRY.size + len(key) + len(value)
+        self.count += 1
+
+
+_segments = {}
+_segments_lock = threading.Lock()
+
+
+class _Segment:
+    """The mapping of a cache file in this process, with a lock per bucket
+    between its threads."""
+
+    def __init__(self, path, buckets, bucket_size):
+        self.bucket_size = bucket_size
+        self.size = FILE_HEADER_SIZE + buckets * bucket_size
+        self.locks = [threading.Lock() for _ in range(buckets)]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        header = FILE_HEADER.pack(MAGIC, buckets, bucket_size)
+        fcntl.lockf(self.fd, fcntl.LOCK_EX)
+        try:
+            if os.pread(self.fd, FILE_HEADER.size, 0) != header or (
+                os.fstat(self.fd).st_size != self.size
+            ):
+                os.ftruncate(self.fd, 0)
+                os.ftruncate(self.fd, self.size)
+                os.pwrite(self.fd, header, 0)
+        finally:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN)
+        self.map = mmap.mmap(self.fd, self.size)
+        self.pid = os.getpid()
+
+    def offset(self, index):
+        return FILE_HEADER_SIZE + index * self.bucket_size
+
+    @contextmanager
+    def bucket(self, index):
+        """Lock bucket `index` and return it."""
+        offset = self.offset(index)
+        with self.locks[index]:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, self.bucket_size, offset)
+            try:
+                bucket = _Bucket(self.map, offset, self.bucket_size)
+                try:
+                    yield bucket
+                finally:
+                    bucket.save()
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, self.bucket_size, offset)
+
+
+def _get_segment(path, buckets, bucket_size):
+    """Return the mapping of a cache file in this process.
+
+    Django gives each thread its own backend instance, while the locks on
+    the file belong to the whole process, so every instance shares one
+    mapping. Forked workers map the file again rather than use the one of
+    their parent."""
+    key = (path, buckets, bucket_size)
+    pid = os.getpid()
+    with _segments_lock:
+        segment = _segments.get(key)
+        if segment is None or segment.pid != pid:
+            segment = _segments[key] = _Segment(path, buckets, bucket_size)
+
+    return segment
+
+
+class SharedMemoryCache(BaseCache):
+    """
+    A cache backend kept in a memory mapped file, shared by every process
+    of a node mapping the same LOCATION and kept across their restarts.
+
+    The file is split into OPTIONS['BUCKETS'] buckets of
+    OPTIONS['BUCKET_SIZE'] bytes, and a key lives in the bucket its hash
+    picks. Each bucket is locked on its own, with a thread lock within a
+    process and a lock on its byte range of the file across processes, so
+    only keys sharing a bucket wait for each other. A full bucket evicts
+    its expired entries, then its least recently used ones, so the cache
+    never grows past the size of the file. Values larger than a bucket are
+    not cached.
+
+    Each bucket counts its hits, misses and evictions, summed by stats().
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._buckets = int(options.get('BUCKETS', 512))
+        self._bucket_size = int(options.get('BUCKET_SIZE', 64 * 1024))
+
+    def _bucket(self, index):
+        segment = _get_segment(self._path, self._buckets, self._bucket_size)
+
+        return segment.bucket(index)
+
+    def _key(self, key, version):
+        """Return the stored form of a key and the index of its bucket."""
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        key = key.encode()
+        digest = hashlib.blake2b(key, digest_size=8).digest()
+
+        return key, int.from_bytes(digest, 'little') % self._buckets
+
+    def _live(self, bucket, key, now):
+        """Return the live entry of `key` in a locked bucket, dropping it
+        if it expired."""
+        found = bucket.find(key)
+        if found is not None and found[2] and found[2] <= now:
+            bucket.remove(found[0])
+            return None
+
+        return found
+
+    def _store(self, bucket, key, value, expires, now):
+        length = ENTRY.size + len(key) + len(value)
+        if length > bucket.capacity:
+            return False
+        bucket.make_room(length, now)
+        bucket.append(key, value, expires or 0.0, now)
+
+        return True
+
+    def _write(self, key, value, timeout, version, only_new):
+        key, index = self._key(key, version)
+        value = pickle.dumps(value, self.pickle_protocol)
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        with self._bucket(index) as bucket:
+            found = self._live(bucket, key, now)
+            if found is not None:
+                if only_new:
+                    return False
+                bucket.remove(found[0])
+            if expires is not None and expires <= now:
+                return not only_new
+
+            return self._store(bucket, key, value, expires, now)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._write(key, value, timeout, version, only_new=True)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._write(key, value, timeout, version, only_new=False)
+
+    def get(self, key, default=None, version=None):
+        key, index = self._key(key, version)
+        now = time.time()
+        with self._bucket(index) as bucket:
+            found = self._live(bucket, key, now)
+            if found is None:
+                bucket.misses += 1
+                return default
+            bucket.hits += 1
+            bucket.touch(found[0], used_at=now)
+            value = bucket.value(found[0])
+
+        return pickle.loads(value)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key, index = self._key(key, version)
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        with self._bucket(index) as bucket:
+            found = self._live(bucket, key, now)
+            if found is None:
+                return False
+            if expires is not None and expires <= now:
+                bucket.remove(found[0])
+            else:
+                bucket.touch(found[0], expires=expires or 0.0)
+
+            return True
+
+    def delete(self, key, version=None):
+        key, index = self._key(key, version)
+        with self._bucket(index) as bucket:
+            found = bucket.find(key)
+            if found is None:
+                return False
+            bucket.remove(found[0])
+
+            return True
+
+    def incr(self, key, delta=1, version=None):
+        """Add `delta` to a value atomically, across processes too."""
+        stored_key, index = self._key(key, version)
+        now = time.time()
+        with self._bucket(index) as bucket:
+            found = self._live(bucket, stored_key, now)
+            if found is None:
+                raise ValueError("Key '%s' not found" % key)
+            pos, _, expires = found
+            value = pickle.loads(bucket.value(pos)) + delta
+            bucket.remove(pos)
+            self._store(
+                bucket, stored_key, pickle.dumps(value, self.pickle_protocol),
+                expires, now,
+            )
+
+        return value
+
+    def clear(self):
+        for index in range(self._buckets):
+            with self._bucket(index) as bucket:
+                bucket.used = bucket.count = 0
+
+    def stats(self):
+        """Return the entries, bytes, hits, misses and evictions of every
+        bucket summed, read without locking."""
+        segment = _get_segment(self._path, self._buckets, self._bucket_size)
+        totals = {
+            'entries': 0,
+            'bytes': 0,
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+        }
+        for index in range(self._buckets):
+            used, count, hits, misses, evictions = BUCKET_HEADER.unpack_from(
+                segment.map, segment.offset(index))
+            totals['entries'] += count
+            totals['bytes'] += used
+            totals['hits'] += hits
+            totals['misses'] += misses
+            totals['evictions'] += evictions
+
+        return totals
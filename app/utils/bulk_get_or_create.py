@@ -0,0 +1,29 @@
+def bulk_get_or_create(model, user, names):
+    """
+    Return the `model` objects owned by user for each name, in order.
+
+    Existing rows are fetched with one query and missing ones are inserted
+    with one bulk insert. Rows created concurrently by another request are
+    skipped by the unique (user, name) constraint and picked up by the
+    final lookup.
+    """
+    names = list(dict.fromkeys(names))
+    if not names:
+        return []
+
+    objs = {
+        obj.name: obj
+        for obj in model.objects.filter(user=user, name__in=names)
+    }
+    missing = [name for name in names if name not in objs]
+    if missing:
+        model.objects.bulk_create(
+            [model(user=user, name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        objs.update({
+            obj.name: obj
+            for obj in model.objects.filter(user=user, name__in=missing)
+        })
+
+    return [objs[name] for name in names]
@@ -1,8 +1,17 @@
 server {
     listen ${LISTEN_PORT};
 
-    location /static {
-        alias /vol/static;
+    location /static/static {
+        alias /vol/static/static;
+    }
+
+    # Media goes through the app, which checks access and hands the file
+    # back with X-Accel-Redirect. nginx then sends it, Range and If-Range
+    # requests included. Resized images and derivatives are sent to signed
+    # in users only, so they are not kept in a cache shared between them.
+    location /protected-media/ {
+        internal;
+        alias /vol/static/media/;
     }
 
     location / {